@@ -1 +1,11 @@
-__all__ = ["io", "portfolio"]
+__all__ = [
+    "holdings",
+    "io",
+    "ledger",
+    "lots",
+    "portfolio",
+    "replay",
+    "report",
+    "snapshot",
+    "timeseries",
+]
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+# running totals kept per ticker
+HOLDING_FIELDS = (
+    "Quantity",
+    "Bought",
+    "Sold",
+    "Invested",
+    "Devested",
+    "Dividends",
+    "Trades",
+)
+
+
+def _is_ticker(ticker):
+    return not (ticker is None or ticker != ticker or ticker == "")
+
+
+class PositionIndex(object):
+    """
+       Class that keeps running per-ticker quantities, trade values, dividends
+       and the cash balance of a portfolio, updated in constant time per event
+    """
+
+    def __init__(self):
+        self.holdings = {}
+        self.cash = 0.0
+
+    def __contains__(self, ticker):
+        return ticker in self.holdings
+
+    def _holding(self, ticker):
+        try:
+            return self.holdings[ticker]
+        except KeyError:
+            self.holdings[ticker] = dict.fromkeys(HOLDING_FIELDS, 0.0)
+            return self.holdings[ticker]
+
+    def record_cash(self, change):
+        self.cash = self.cash + change
+
+    def record_buy(self, ticker, quantity, value):
+        _holding = self._holding(ticker)
+        _holding["Quantity"] = _holding["Quantity"] + quantity
+        _holding["Bought"] = _holding["Bought"] + quantity
+        _holding["Invested"] = _holding["Invested"] + value
+        _holding["Trades"] = _holding["Trades"] + 1
+
+    def record_sell(self, ticker, quantity, value):
+        _holding = self._holding(ticker)
+        _holding["Quantity"] = _holding["Quantity"] - quantity
+        _holding["Sold"] = _holding["Sold"] + quantity
+        _holding["Devested"] = _holding["Devested"] + value
+        _holding["Trades"] = _holding["Trades"] + 1
+
+    def record_dividend(self, ticker, amount):
+        # interest payments without ticker only change the cash balance
+        if _is_ticker(ticker):
+            _holding = self._holding(ticker)
+            _holding["Dividends"] = _holding["Dividends"] + amount
+
+    def quantity(self, ticker):
+        try:
+            return self.holdings[ticker]["Quantity"]
+        except KeyError:
+            return 0.0
+
+    def to_frame(self, traded=False):
+        """
+        Return the running totals as dataframe indexed by ticker
+
+        Parameters
+        ==========
+        traded : restrict to tickers that were bought or sold (not only paid dividends)
+
+        Returns
+        =======
+        df : dataframe with one row per ticker, sorted by ticker
+
+        """
+        _df = pd.DataFrame.from_dict(
+            self.holdings, orient="index", columns=list(HOLDING_FIELDS)
+        ).astype(np.float64)
+        _df.index.name = "Ticker"
+        if traded:
+            _df = _df.loc[_df.Trades > 0]
+
+        return _df.sort_index()
+
+    @classmethod
+    def from_ledger(cls, ledger):
+        """
+        Recompute the index from scratch from the tables of a ledger
+        """
+        index = cls()
+
+        _df = ledger.frame("transactions")
+        _df = _df.loc[_df.Transaction.isin(("buy", "sell"))]
+        _sums = _df.groupby(by=["Ticker", "Transaction"])[
+            ["Quantity", "TradeValue"]
+        ].sum()
+        _counts = _df.groupby(by=["Ticker", "Transaction"]).size()
+        for (ticker, transaction), row in _sums.iterrows():
+            _holding = index._holding(ticker)
+            if transaction == "buy":
+                _holding["Quantity"] = _holding["Quantity"] + row["Quantity"]
+                _holding["Bought"] = row["Quantity"]
+                _holding["Invested"] = row["TradeValue"]
+            else:
+                _holding["Quantity"] = _holding["Quantity"] - row["Quantity"]
+                _holding["Sold"] = row["Quantity"]
+                _holding["Devested"] = row["TradeValue"]
+            _holding["Trades"] = _holding["Trades"] + _counts[(ticker, transaction)]
+
+        _dividends = ledger.frame("dividends").groupby(by="Ticker")["Amount"].sum()
+        for ticker, amount in _dividends.items():
+            index.record_dividend(ticker, amount)
+
+        index.cash = ledger.total("wallet", "Change")
+
+        return index
+
+    def equals(self, other, tolerance=1e-6):
+        """
+        Compare running totals and cash balance with another index
+        """
+        if abs(self.cash - other.cash) > tolerance * max(1.0, abs(other.cash)):
+            return False
+
+        _df = self.to_frame()
+        _other = other.to_frame()
+        if list(_df.index) != list(_other.index):
+            return False
+
+        return np.allclose(_df.values, _other.values, rtol=tolerance, atol=tolerance)
@@ -13,10 +13,58 @@ import pandas as pd
 import robin_stocks as r
 
 from portfolios.portfolio.portfolio import Portfolio
-from portfolios.utils.helpers import last_trading_day
+from portfolios.portfolio.replay import (
+    TRANSACTION_TYPES,
+    TRANSACTION_TYPES_VANGUARD,
+    assign_priorities,
+    replay_transactions,
+)
+from portfolios.security.security import shared_securities
+from portfolios.utils.helpers import last_trading_day, standard_date_array
 
 
-def parse_portfolio(df=None, p=None):
+# number of securities loaded at the same time and per second (None for no limit)
+PREFETCH_WORKERS = 8
+PREFETCH_RATE = None
+
+
+def load_securities(dfs, p, workers=None, rate=None):
+    """
+    Loads data for all securities in a list of transaction dataframes
+    into the archive of a portfolio, starting at the first transaction date,
+    the securities are loaded concurrently (see SecurityRegistry.prefetch)
+    """
+
+    if workers is None:
+        workers = PREFETCH_WORKERS
+    if rate is None:
+        rate = PREFETCH_RATE
+
+    # use a lower bound on the minimum number of days pulled
+    minimum_date_for_data = last_trading_day() - timedelta(weeks=1)
+
+    # first transaction date of each ticker over all dataframes
+    _df = pd.concat([df[["Ticker", "Date"]] for df in dfs], axis=0)
+    first_dates = _df.groupby(by="Ticker")["Date"].min()
+
+    min_dates = {}
+    for ticker, first_date in first_dates.items():
+        if ticker:
+            if ticker not in p.securities_archive:
+                if str(ticker).isalnum() & (str(ticker) != "nan"):
+                    min_dates[ticker] = min(
+                        pd.Timestamp(first_date), minimum_date_for_data
+                    )
+
+    # tickers that fail here are loaded again below and raise as before
+    shared_securities.prefetch(min_dates, end=p.date, workers=workers, rate=rate)
+
+    for ticker, min_date in min_dates.items():
+        print("Adding ", ticker)
+        p.add_security_archive(ticker, min_date)
+
+
+def parse_portfolio(df=None, p=None, batch=True):
     """
     Takes a dataframe with transactions and performs those
     on a given portfolio
@@ -25,6 +73,7 @@ def parse_portfolio(df=None, p=None):
     ==========
     df : input dataframe
     p : portfolio (Portfolio class object) 
+    batch : load all transactions at once instead of row by row
 
     Returns
     =======
@@ -32,9 +81,6 @@ def parse_portfolio(df=None, p=None):
 
     """
 
-    # use a lower bound on the minimum number of days pulled
-    minimum_date_for_data = last_trading_day() - timedelta(weeks=1)
-
     # put input dataframe(s) in list
     dfs = []
     if type(df) == pd.core.frame.DataFrame:
@@ -42,42 +88,17 @@ def parse_portfolio(df=None, p=None):
     else:
         dfs.extend(df)
 
-    # loop through list of dataframes
-    Tickers_all = []
-    for df in dfs:
-        Tickers_all = Tickers_all + list(df.Ticker.values)
-
     # load data for all securities
-    for ticker in list(set(Tickers_all)):
-        if ticker:
-            if ticker not in p.securities_archive:
-                if str(ticker).isalnum() & (str(ticker) != "nan"):
-                    print("Adding ", ticker)
-                    min_date = minimum_date_for_data
-                    for df in dfs:
-                        if ticker in list(set(df.Ticker)):
-                            first_date = min(df.loc[df.Ticker == ticker, "Date"].values)
-                            min_date = min(first_date, min_date)
-                    p.add_security_archive(ticker, min_date)
+    load_securities(dfs, p)
 
+    # define a priority for transaction types so ordering makes sense
     for df in dfs:
-        # define a priority for transaction types so ordering makes sense
-        df.loc[df.Transaction == "deposit", "Priority"] = 1
-        df.loc[df.Transaction == "Contribution", "Priority"] = 1
-        df.loc[df.Transaction == "Funds Received", "Priority"] = 1
-        df.loc[df.Transaction == "Conversion (incoming)", "Priority"] = 1
-        df.loc[df.Transaction == "buy", "Priority"] = 2
-        df.loc[df.Transaction == "Buy", "Priority"] = 2
-        df.loc[df.Transaction == "Reinvestment", "Priority"] = 2
-        df.loc[df.Transaction == "dividend", "Priority"] = 3
-        df.loc[df.Transaction == "Dividend", "Priority"] = 3
-        df.loc[df.Transaction == "sell", "Priority"] = 4
-        df.loc[df.Transaction == "Sell", "Priority"] = 4
-        df.loc[df.Transaction == "withdraw", "Priority"] = 5
-        df.loc[df.Transaction == "Distribution", "Priority"] = 5
-
-        df.sort_values(by=["Date", "Priority"], inplace=True)
+        assign_priorities(df, TRANSACTION_TYPES)
+
+    if batch:
+        return replay_transactions(dfs, p, TRANSACTION_TYPES, lowercase=True)
 
+    for df in dfs:
         for index, row in df.iterrows():
             if row.notnull()["Date"]:
                 # print(row['Date'], row['Transaction'], row['Ticker'], row['Currency'], row['Price'], row['Quantity'])
@@ -157,7 +178,7 @@ def parse_portfolio(df=None, p=None):
     return p
 
 
-def parse_portfolio_vanguard(df=None, p=None):
+def parse_portfolio_vanguard(df=None, p=None, batch=True):
     """
     Takes a dataframe with transactions in Vanguard format
     and performs those on a given portfolio
@@ -166,6 +187,7 @@ def parse_portfolio_vanguard(df=None, p=None):
     ==========
     df : input dataframe
     p : portfolio (Portfolio class object) 
+    batch : load all transactions at once instead of row by row
 
     Returns
     =======
@@ -173,9 +195,6 @@ def parse_portfolio_vanguard(df=None, p=None):
 
     """
 
-    # use a lower bound on the minimum number of days pulled
-    minimum_date_for_data = last_trading_day() - timedelta(weeks=1)
-
     # put input dataframe(s) in list
     dfs = []
     if type(df) == pd.core.frame.DataFrame:
@@ -183,47 +202,17 @@ def parse_portfolio_vanguard(df=None, p=None):
     else:
         dfs.extend(df)
 
-    # loop through list of dataframes
-    Tickers_all = []
-    for df in dfs:
-        Tickers_all = Tickers_all + list(df.Ticker.values)
-
     # load data for all securities
-    for ticker in list(set(Tickers_all)):
-        if ticker:
-            if ticker not in p.securities_archive:
-                if str(ticker).isalnum() & (str(ticker) != "nan"):
-                    print("Adding ", ticker)
-                    min_date = minimum_date_for_data
-                    for df in dfs:
-                        if ticker in list(set(df.Ticker)):
-                            first_date = min(df.loc[df.Ticker == ticker, "Date"].values)
-                            min_date = min(first_date, min_date)
-                    p.add_security_archive(ticker, min_date)
+    load_securities(dfs, p)
 
+    # define a priority for transaction types so ordering makes sense
     for df in dfs:
-        # define a priority for transaction types so ordering makes sense
-        df.loc[df.Transaction == "deposit", "Priority"] = 1
-        df.loc[df.Transaction == "Contribution", "Priority"] = 1
-        df.loc[df.Transaction == "Funds Received", "Priority"] = 1
-        df.loc[df.Transaction == "Conversion (incoming)", "Priority"] = 1
-        df.loc[df.Transaction == "buy", "Priority"] = 2
-        df.loc[df.Transaction == "Buy", "Priority"] = 2
-        df.loc[df.Transaction == "Reinvestment", "Priority"] = 2
-        df.loc[df.Transaction == "Reinvestment (LT)", "Priority"] = 2
-        df.loc[df.Transaction == "Reinvestment (ST)", "Priority"] = 2
-        df.loc[df.Transaction == "dividend", "Priority"] = 3
-        df.loc[df.Transaction == "Dividend", "Priority"] = 3
-        df.loc[df.Transaction == "Capital gain (LT)", "Priority"] = 3
-        df.loc[df.Transaction == "Capital gain (ST)", "Priority"] = 3
-        df.loc[df.Transaction == "sell", "Priority"] = 4
-        df.loc[df.Transaction == "Sell", "Priority"] = 4
-        df.loc[df.Transaction == "Withdrawal", "Priority"] = 5
-        df.loc[df.Transaction == "withdraw", "Priority"] = 5
-        df.loc[df.Transaction == "Distribution", "Priority"] = 5
-
-        df.sort_values(by=["Date", "Priority"], inplace=True)
+        assign_priorities(df, TRANSACTION_TYPES_VANGUARD)
 
+    if batch:
+        return replay_transactions(dfs, p, TRANSACTION_TYPES_VANGUARD)
+
+    for df in dfs:
         for index, row in df.iterrows():
             if row.notnull()["Date"]:
                 # print(row['Date'], row['Transaction'], row['Ticker'], row['Currency'], row['Price'], row['Quantity'], row['Dollars'])
@@ -337,13 +326,14 @@ def import_portfolio(path="", name="RobinHood"):
         print("Reading in {}".format(file))
 
         # read in transaction list
-        df = pd.read_csv(file, parse_dates=[0])
+        df = pd.read_csv(file)
 
         # collect all dfs before concatenating them
         all_dfs.append(df)
 
     # final portfolio df to parse
     df = pd.concat(all_dfs, axis=0, ignore_index=True)
+    df["Date"] = standard_date_array(df["Date"])
 
     # create a new portfolio object
     p = Portfolio(name=name)
@@ -397,7 +387,6 @@ def import_portfolio_vanguard(path="", name="Vanguard"):
                 "Share Price",
                 "Principal Amount",
             ],
-            parse_dates=["Trade Date"],
             skip_blank_lines=False,
         )
 
@@ -412,6 +401,7 @@ def import_portfolio_vanguard(path="", name="Vanguard"):
 
     # final portfolio df to parse
     df = pd.concat(all_dfs, axis=0, ignore_index=True)
+    df["Date"] = standard_date_array(df["Date"])
 
     # create a new portfolio object
     p = Portfolio(name=name)
@@ -546,8 +536,7 @@ def import_portfolio_robinhood(
     df = pd.DataFrame(data=d)
 
     # strip time of day information
-    df.Date = df.Date.map(lambda x: x.strftime("%m-%d-%Y"))
-    df.Date = pd.to_datetime(df.Date)
+    df.Date = standard_date_array(df.Date)
 
     # create a new portfolio object
     p = Portfolio(name=name)
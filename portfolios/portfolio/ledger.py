@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+# column layout of the tables kept by a portfolio ledger
+# kinds: "date" (int64 nanoseconds), "code" (int32 symbol code), "float" (float64)
+LEDGER_TABLES = {
+    "transactions": [
+        ("Date", "date"),
+        ("Transaction", "code"),
+        ("Ticker", "code"),
+        ("Currency", "code"),
+        ("Price", "float"),
+        ("Quantity", "float"),
+        ("TradeValue", "float"),
+    ],
+    "wallet": [("Date", "date"), ("Change", "float")],
+    "payments": [("Date", "date"), ("In", "float"), ("Out", "float")],
+    "dividends": [("Date", "date"), ("Ticker", "code"), ("Amount", "float")],
+}
+
+_DTYPES = {"date": np.int64, "code": np.int32, "float": np.float64}
+
+
+def to_datetime_int(date):
+    """
+    Convert a date (string, datetime, pandas timestamp) to int64 nanoseconds
+    """
+    return pd.Timestamp(date).value
+
+
+class SymbolTable(object):
+    """
+       Class that maps strings (tickers, transaction types, currencies) to integer codes
+    """
+
+    def __init__(self):
+        self.symbols = []
+        self.codes = {}
+        self._lookup = None
+
+    def code(self, value):
+        # missing values (None, NaN) are stored as -1
+        if value is None or value != value:
+            return -1
+        try:
+            return self.codes[value]
+        except KeyError:
+            self.codes[value] = len(self.symbols)
+            self.symbols.append(value)
+            self._lookup = None
+            return self.codes[value]
+
+    def encode(self, values):
+        """
+        Encode an array of values, factorizing once instead of per element
+        """
+        _codes, _uniques = pd.factorize(np.asarray(values, dtype=object))
+        mapping = np.array([self.code(u) for u in _uniques] + [-1], dtype=np.int32)
+
+        # missing values are factorized to -1 and map to the trailing -1
+        return mapping[_codes]
+
+    def decode(self, codes):
+        # the trailing NaN makes code -1 decode to a missing value
+        if self._lookup is None or len(self._lookup) != len(self.symbols) + 1:
+            self._lookup = np.array(self.symbols + [np.nan], dtype=object)
+        return self._lookup[codes]
+
+
+class ColumnBuffer(object):
+    """
+       Class that accumulates rows in growable typed numpy column buffers
+    """
+
+    def __init__(self, layout, symbols, capacity=64):
+        self.layout = layout
+        self.columns = [name for name, _ in layout]
+        self.kinds = dict(layout)
+        self.symbols = symbols
+        self.size = 0
+        self.last_date = None
+        self.buffers = {
+            name: np.empty(capacity, dtype=_DTYPES[kind]) for name, kind in layout
+        }
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, n):
+        capacity = len(self.buffers[self.columns[0]])
+        if self.size + n <= capacity:
+            return
+        capacity = max(2 * capacity, self.size + n)
+        for name in self.columns:
+            _buffer = np.empty(capacity, dtype=self.buffers[name].dtype)
+            _buffer[: self.size] = self.buffers[name][: self.size]
+            self.buffers[name] = _buffer
+
+    def _convert(self, name, value):
+        kind = self.kinds[name]
+        if kind == "date":
+            return to_datetime_int(value)
+        elif kind == "code":
+            return self.symbols.code(value)
+        elif value is None:
+            return np.nan
+        else:
+            return value
+
+    def append(self, row):
+        """
+        Append a single row given as dict; missing columns are stored as missing values
+        """
+        self._reserve(1)
+        for name in self.columns:
+            self.buffers[name][self.size] = self._convert(name, row.get(name))
+        self._update_last_date(self.buffers["Date"][self.size : self.size + 1])
+        self.size = self.size + 1
+
+    def extend(self, columns):
+        """
+        Append many rows at once from a dict (or dataframe) of equally long columns
+        """
+        n = len(columns[self.columns[0]])
+        self._reserve(n)
+        for name in self.columns:
+            kind = self.kinds[name]
+            if name not in columns:
+                if kind == "date":
+                    raise ValueError("Column {} is required".format(name))
+                values = np.full(n, -1 if kind == "code" else np.nan)
+            elif kind == "date":
+                values = pd.to_datetime(np.asarray(columns[name])).values.astype(
+                    "datetime64[ns]"
+                ).view(np.int64)
+            elif kind == "code":
+                values = self.symbols.encode(np.asarray(columns[name], dtype=object))
+            else:
+                values = np.asarray(columns[name], dtype=np.float64)
+            self.buffers[name][self.size : self.size + n] = values
+        self._update_last_date(self.buffers["Date"][self.size : self.size + n])
+        self.size = self.size + n
+
+    def extend_encoded(self, columns):
+        """
+        Append many rows of already encoded values (int64 dates, symbol codes)
+        """
+        n = len(columns["Date"])
+        self._reserve(n)
+        for name in self.columns:
+            self.buffers[name][self.size : self.size + n] = columns[name]
+        self._update_last_date(self.buffers["Date"][self.size : self.size + n])
+        self.size = self.size + n
+
+    def _update_last_date(self, dates):
+        if len(dates):
+            if self.last_date is None or dates.max() > self.last_date:
+                self.last_date = dates.max()
+
+    def clear(self):
+        self.size = 0
+        self.last_date = None
+
+    def column(self, name):
+        """
+        Return a view of the filled part of a raw column buffer
+        """
+        return self.buffers[name][: self.size]
+
+    def to_frame(self):
+        """
+        Materialize the buffer as dataframe sorted by date
+        Rows with equal dates keep their insertion order
+        """
+        order = np.argsort(self.column("Date"), kind="mergesort")
+        data = {}
+        for name in self.columns:
+            values = self.column(name)[order]
+            kind = self.kinds[name]
+            if kind == "date":
+                values = values.view("datetime64[ns]")
+            elif kind == "code":
+                values = self.symbols.decode(values)
+            data[name] = values
+
+        return pd.DataFrame(data=data, columns=self.columns, index=order)
+
+
+class Ledger(object):
+    """
+       Class that holds the transactions, wallet, payments and dividends of a portfolio
+       in columnar append buffers, dataframes are only built when they are read
+    """
+
+    def __init__(self, capacity=64):
+        self.symbols = SymbolTable()
+        self.tables = {
+            table: ColumnBuffer(layout, self.symbols, capacity=capacity)
+            for table, layout in LEDGER_TABLES.items()
+        }
+        self._frames = {}
+        # earliest date (int64 nanoseconds) of the rows changed since mark_unchanged
+        self.changed_from = None
+
+    def __len__(self):
+        return len(self.tables["transactions"])
+
+    def _track_changes(self, table, start=0):
+        dates = self.column(table, "Date")[start:]
+        if len(dates):
+            if self.changed_from is None or dates.min() < self.changed_from:
+                self.changed_from = dates.min()
+
+    def mark_unchanged(self):
+        self.changed_from = None
+
+    def append(self, table, row):
+        _size = len(self.tables[table])
+        self.tables[table].append(row)
+        self._track_changes(table, _size)
+        self._frames.pop(table, None)
+
+    def extend(self, table, columns):
+        _size = len(self.tables[table])
+        self.tables[table].extend(columns)
+        self._track_changes(table, _size)
+        self._frames.pop(table, None)
+
+    def extend_encoded(self, table, columns):
+        _size = len(self.tables[table])
+        self.tables[table].extend_encoded(columns)
+        self._track_changes(table, _size)
+        self._frames.pop(table, None)
+
+    def replace(self, table, df):
+        """
+        Replace the content of a table with the rows of a dataframe
+        """
+        self._track_changes(table)
+        self.tables[table].clear()
+        self._frames.pop(table, None)
+        if len(df):
+            self.extend(table, {column: df[column].values for column in df.columns})
+
+    def column(self, table, name):
+        return self.tables[table].column(name)
+
+    def last_date(self, table):
+        """
+        Return the latest date in a table as int64 nanoseconds, None if empty
+        """
+        return self.tables[table].last_date
+
+    def total(self, table, name, until=None):
+        """
+        Sum a column over all rows with dates up to and including until
+        """
+        values = self.column(table, name)
+        if until is not None:
+            values = values[self.column(table, "Date") <= to_datetime_int(until)]
+
+        return values.sum()
+
+    def frame(self, table):
+        """
+        Return the (cached) dataframe view of a table
+        """
+        try:
+            return self._frames[table]
+        except KeyError:
+            self._frames[table] = self.tables[table].to_frame()
+            return self._frames[table]
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+import pandas as pd
+
+# accounting methods for which remaining lots are tracked side by side
+LOT_METHODS = ("fifo", "lifo", "specific")
+
+# quantities below this threshold are considered fully consumed
+_EPSILON = 1e-9
+
+
+class TaxLots(object):
+    """
+       Class that holds the tax lots (date, quantity, unit cost) of a single security
+
+       Remaining lots are tracked separately for first-in-first-out, last-in-first-out
+       and specific lot identification, all with constant-size running summaries
+
+       Lots are numbered in the order they are bought and consumed in the order
+       of their dates (lots of the same date in the order they are bought), so
+       purchases may be added out of date order
+    """
+
+    def __init__(self):
+        self.dates = []
+        self.quantities = []
+        self.costs = []
+
+        # lot numbers and dates in the order of the dates
+        self._order = []
+        self._order_dates = []
+
+        # running totals over all purchases
+        self.total_quantity = 0.0
+        self.total_cost = 0.0
+
+        # remaining quantity of each lot and running totals per method
+        self.remaining = {method: [] for method in LOT_METHODS}
+        self.quantity = {method: 0.0 for method in LOT_METHODS}
+        self.cost = {method: 0.0 for method in LOT_METHODS}
+
+        # position in _order of the first lot that is not yet consumed (fifo
+        # and default for specific)
+        self._head = {"fifo": 0, "specific": 0}
+        # stack of lots that are not yet consumed in the order of the dates (lifo)
+        self._stack = []
+
+    def __len__(self):
+        return len(self.dates)
+
+    def buy(self, date, quantity, price):
+        """
+        Add a lot of quantity securities bought at price (per unit) on date
+        """
+        date = pd.Timestamp(date).value
+        lot = len(self.dates)
+        self.dates.append(date)
+        self.quantities.append(1.0 * quantity)
+        self.costs.append(1.0 * price)
+
+        position = bisect_right(self._order_dates, date)
+        self._order.insert(position, lot)
+        self._order_dates.insert(position, date)
+        # an earlier lot is consumed before the ones after it
+        for method in self._head:
+            self._head[method] = min(self._head[method], position)
+
+        self.total_quantity = self.total_quantity + quantity
+        self.total_cost = self.total_cost + quantity * price
+        for method in LOT_METHODS:
+            self.remaining[method].append(1.0 * quantity)
+            self.quantity[method] = self.quantity[method] + quantity
+            self.cost[method] = self.cost[method] + quantity * price
+        if self._stack and date < self.dates[self._stack[-1]]:
+            _dates = [self.dates[i] for i in self._stack]
+            self._stack.insert(bisect_right(_dates, date), lot)
+        else:
+            self._stack.append(lot)
+
+        return lot
+
+    def _take(self, method, lot, quantity):
+        """
+        Take up to quantity from a lot, returns the quantity taken
+        """
+        remaining = self.remaining[method]
+        taken = min(remaining[lot], quantity)
+        remaining[lot] = remaining[lot] - taken
+        if remaining[lot] < _EPSILON:
+            remaining[lot] = 0.0
+        self.quantity[method] = self.quantity[method] - taken
+        self.cost[method] = self.cost[method] - taken * self.costs[lot]
+        if self.quantity[method] < _EPSILON:
+            self.quantity[method] = 0.0
+            self.cost[method] = 0.0
+
+        return taken
+
+    def _consume_from_head(self, method, quantity):
+        remaining = self.remaining[method]
+        head = self._head[method]
+        while quantity > _EPSILON and head < len(self._order):
+            lot = self._order[head]
+            quantity = quantity - self._take(method, lot, quantity)
+            if remaining[lot] == 0.0:
+                head = head + 1
+        self._head[method] = head
+
+    def _consume_from_stack(self, quantity):
+        remaining = self.remaining["lifo"]
+        while quantity > _EPSILON and self._stack:
+            lot = self._stack[-1]
+            quantity = quantity - self._take("lifo", lot, quantity)
+            if remaining[lot] == 0.0:
+                self._stack.pop()
+
+    def sell(self, quantity, lot=None):
+        """
+        Consume quantity from the remaining lots of every accounting method
+
+        Parameters
+        ==========
+        quantity : number of securities sold
+        lot : lot number or purchase date to sell from under specific identification,
+            defaults to the oldest remaining lot
+
+        """
+        self._consume_from_head("fifo", quantity)
+        self._consume_from_stack(quantity)
+
+        lot = self.resolve_lot(lot)
+        if lot is None:
+            self._consume_from_head("specific", quantity)
+        else:
+            taken = self._take("specific", lot, quantity)
+            # sell any excess from the oldest remaining lots
+            if quantity - taken > _EPSILON:
+                self._consume_from_head("specific", quantity - taken)
+
+    def resolve_lot(self, lot):
+        """
+        Return the lot number of a lot given by number or purchase date
+        """
+        if lot is None or isinstance(lot, (int, np.integer)):
+            return lot
+        else:
+            return self.find_lot(lot)
+
+    def find_lot(self, date):
+        """
+        Return the first lot bought on or after date, None if there is none
+        """
+        position = bisect_left(self._order_dates, pd.Timestamp(date).value)
+        if position < len(self._order):
+            return self._order[position]
+        else:
+            return None
+
+    def average_price(self, method=None):
+        """
+        Average unit cost of all purchases (method=None) or of the remaining lots
+        under a given accounting method, nan if there is nothing to average
+        """
+        if method is None:
+            quantity, cost = self.total_quantity, self.total_cost
+        else:
+            quantity, cost = self.quantity[method], self.cost[method]
+        if quantity > _EPSILON:
+            return cost / quantity
+        else:
+            return np.nan
+
+    def summary(self):
+        """
+        Return the average prices shown in portfolio overviews
+        """
+        return {
+            "AvgPriceAll": self.average_price(),
+            "AvgPriceFiFo": self.average_price("fifo"),
+            "AvgPriceLiFo": self.average_price("lifo"),
+        }
+
+    def to_frame(self, method="fifo"):
+        """
+        Return the lots with their remaining quantity under a given method
+        """
+        return pd.DataFrame(
+            {
+                "Date": pd.to_datetime(np.asarray(self.dates, dtype=np.int64)),
+                "Quantity": self.quantities,
+                "Price": self.costs,
+                "Remaining": self.remaining[method],
+            }
+        )
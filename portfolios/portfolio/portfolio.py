@@ -1,45 +1,70 @@
 # -*- coding: utf-8 -*-
 
 import datetime
-from collections import deque
+from os import path
 
 import numpy as np
 import pandas as pd
 
 from portfolios import Asset
-from portfolios.security.security import Security
+from portfolios.portfolio.holdings import PositionIndex
+from portfolios.portfolio.ledger import Ledger, to_datetime_int
+from portfolios.portfolio.lots import TaxLots
+from portfolios.portfolio.report import (
+    REPORT_SCALARS,
+    fill_numeric,
+    join_scalars,
+    report_scalars,
+    warn_negative,
+)
+from portfolios.portfolio.snapshot import (
+    Journal,
+    journal_path,
+    load_snapshot,
+    save_snapshot,
+)
+from portfolios.portfolio.timeseries import (
+    cumulative_series,
+    daily_index,
+    log_returns,
+    period_bounds,
+    price_panel,
+    quantity_panel,
+    value_panel,
+)
+from portfolios.security.security import shared_securities
 from portfolios.stats.basics import returns_column
 from portfolios.utils.helpers import standard_date_format, todays_date
 
+# column names of the periods reported by get_performance
+PERFORMANCE_PERIODS = {"A": "Year", "Q": "Quarter", "M": "Month"}
+
 
 class Portfolio(Asset):
     """
        Class that holds several securities
     """
 
-    def __init__(self, name):
+    def __init__(self, name, check_consistency=False):
         super().__init__(name)
         self.securities = {}
         self.securities_archive = {}
         self.tickers = []
         self.tickers_archive = []
-        self.dividends = pd.DataFrame(columns=["Date", "Ticker", "Amount"])
-        self.payments = pd.DataFrame(columns=["Date", "In", "Out"])
-        self.wallet = pd.DataFrame(columns=["Date", "Change"])
+        self.ledger = Ledger()
+        self.positions_index = PositionIndex()
+        self.check_consistency = check_consistency
         self.total_portfolio_value = 0.0
         self.total_security_value = 0.0
         self.cash = 0.0
         self.return_value = 0.0
         self.return_rate = 0.0
-        self.prices = {}
-        self.prices_fifo = {}
-        self.prices_lifo = {}
+        self.lots = {}
+        self.journal = None
         self.index = 0
+        self.returns_column = "Total"
         self.benchmark_ticker = "sp500"
         self.benchmark = None
-        self.transactions = pd.DataFrame(
-            columns=["Date", "Transaction", "Ticker", "Currency", "Price", "Quantity"]
-        )
         self.date = standard_date_format(todays_date())
 
     def __iter__(self):
@@ -56,22 +81,121 @@ class Portfolio(Asset):
             self.index = self.index + 1
             return self.tickers[self.index - 1]
 
+    # ledger tables are materialized as dataframes only when they are read
+    @property
+    def transactions(self):
+        return self.ledger.frame("transactions")
+
+    @transactions.setter
+    def transactions(self, df):
+        self.ledger.replace("transactions", df)
+        self._replay_ledger()
+
+    @property
+    def wallet(self):
+        return self.ledger.frame("wallet")
+
+    @wallet.setter
+    def wallet(self, df):
+        self.ledger.replace("wallet", df)
+        self._replay_ledger()
+
+    @property
+    def payments(self):
+        return self.ledger.frame("payments")
+
+    @payments.setter
+    def payments(self, df):
+        self.ledger.replace("payments", df)
+        self._replay_ledger()
+
+    @property
+    def dividends(self):
+        return self.ledger.frame("dividends")
+
+    @dividends.setter
+    def dividends(self, df):
+        self.ledger.replace("dividends", df)
+        self._replay_ledger()
+
+    def _replay_ledger(self):
+        """
+           Rebuilds the running positions, tax lots and cash from the ledger
+           after a table was replaced, sells are taken from the oldest lots as
+           the ledger does not record the lots sold from
+        """
+        self.positions_index = PositionIndex.from_ledger(self.ledger)
+
+        _lots = {ticker: TaxLots() for ticker in self.lots}
+        _df = self.transactions
+        _trades = _df.loc[_df["Transaction"].isin(["buy", "sell"])]
+        for date, action, ticker, price, quantity in zip(
+            _trades["Date"].values,
+            _trades["Transaction"].values,
+            _trades["Ticker"].values,
+            _trades["Price"].values.astype(float),
+            _trades["Quantity"].values.astype(float),
+        ):
+            if ticker not in _lots:
+                _lots[ticker] = TaxLots()
+            if action == "buy":
+                _lots[ticker].buy(date, quantity, price)
+            else:
+                _lots[ticker].sell(quantity)
+        self.lots = _lots
+
+        self._update_cash()
+
     def get_cash(self, date="2100-01-01"):
         date = standard_date_format(date)
 
-        return self.wallet.loc[(self.wallet.Date <= date), "Change"].sum()
+        # the running balance holds unless the wallet has entries after date
+        _last_date = self.ledger.last_date("wallet")
+        if _last_date is None or _last_date <= to_datetime_int(date):
+            return self.positions_index.cash
+        else:
+            return self.ledger.total("wallet", "Change", until=date)
+
+    def verify_positions(self):
+        """
+           Recomputes positions and cash from the ledger and compares them
+           with the running index, raises a RuntimeError if they differ
+        """
+        _index = PositionIndex.from_ledger(self.ledger)
+        if not self.positions_index.equals(_index):
+            raise RuntimeError(
+                "Running positions of portfolio {} differ from ledger".format(
+                    self.name
+                )
+            )
+
+        return True
+
+    def _record_wallet(self, date, change):
+        self.ledger.append("wallet", {"Date": date, "Change": change})
+        self.positions_index.record_cash(change)
+
+    def _journal_event(self, date, action, ticker, currency, price, quantity, lot=None):
+        # events after the last snapshot are journaled to be replayed on load
+        if self.journal is not None:
+            self.journal.append(date, action, ticker, currency, price, quantity, lot)
+
+    def _update_cash(self):
+        self.cash = self.get_cash(date=todays_date())
+        if self.check_consistency:
+            self.verify_positions()
 
     def deposit_cash(self, date, currency="USD", price=1.0, quantity=0):
         """
            Adds an amount of quantity*price to the wallet
            Price acts as exchange rate if currency is not USD
         """
-        self.wallet = self.wallet.append(
-            {"Date": date, "Change": 1.0 * price * quantity}, ignore_index=True
-        ).sort_values("Date")
+        self._record_wallet(date, 1.0 * price * quantity)
+        self._journal_event(date, "deposit", np.nan, currency, price, quantity)
 
         # store transaction in df
-        self.transactions = self.transactions.append(
+        self.ledger.append(
+            "transactions",
             {
                 "Date": date,
                 "Transaction": "deposit",
@@ -81,16 +205,14 @@ class Portfolio(Asset):
                 "Quantity": 1.0 * quantity,
                 "TradeValue": 1.0 * price * quantity,
             },
-            ignore_index=True,
-            sort=False,
-        ).sort_values("Date")
+        )
 
         # store payment in df
-        self.payments = self.payments.append(
-            {"Date": date, "In": 1.0 * price * quantity, "Out": 0.0}, ignore_index=True
-        ).sort_values("Date")
+        self.ledger.append(
+            "payments", {"Date": date, "In": 1.0 * price * quantity, "Out": 0.0}
+        )
 
-        self.cash = self.get_cash(date=todays_date())
+        self._update_cash()
 
         print(
             "depositing {0:.2f} {2} (new balance: {1:.2f} {2})".format(
@@ -102,12 +224,12 @@ class Portfolio(Asset):
         """
            Takes amount of quantity*price out of wallet
         """
-        self.wallet = self.wallet.append(
-            {"Date": date, "Change": -1.0 * price * quantity}, ignore_index=True
-        ).sort_values("Date")
+        self._record_wallet(date, -1.0 * price * quantity)
+        self._journal_event(date, "withdraw", np.nan, currency, price, quantity)
 
         # store transaction in df
-        self.transactions = self.transactions.append(
+        self.ledger.append(
+            "transactions",
             {
                 "Date": date,
                 "Transaction": "withdraw",
@@ -117,16 +239,14 @@ class Portfolio(Asset):
                 "Quantity": 1.0 * quantity,
                 "TradeValue": 1.0 * price * quantity,
             },
-            ignore_index=True,
-            sort=False,
-        ).sort_values("Date")
+        )
 
         # store payments in df
-        self.payments = self.payments.append(
-            {"Date": date, "In": 0.0, "Out": 1.0 * price * quantity}, ignore_index=True
-        ).sort_values("Date")
+        self.ledger.append(
+            "payments", {"Date": date, "In": 0.0, "Out": 1.0 * price * quantity}
+        )
 
-        self.cash = self.get_cash(date=todays_date())
+        self._update_cash()
 
         if self.cash < 0.0:
             print(
@@ -145,12 +265,12 @@ class Portfolio(Asset):
         """
 
         """
-        self.wallet = self.wallet.append(
-            {"Date": date, "Change": 1.0 * price * quantity}, ignore_index=True
-        ).sort_values("Date")
+        self._record_wallet(date, 1.0 * price * quantity)
+        self._journal_event(date, "dividend", ticker, currency, price, quantity)
 
         # store transaction in df
-        self.transactions = self.transactions.append(
+        self.ledger.append(
+            "transactions",
             {
                 "Date": date,
                 "Transaction": "dividend",
@@ -160,17 +280,16 @@ class Portfolio(Asset):
                 "Quantity": 1.0 * quantity,
                 "TradeValue": 1.0 * price * quantity,
             },
-            ignore_index=True,
-            sort=False,
-        ).sort_values("Date")
+        )
 
         # store dividends in df
-        self.dividends = self.dividends.append(
+        self.ledger.append(
+            "dividends",
             {"Date": date, "Ticker": ticker, "Amount": 1.0 * price * quantity},
-            ignore_index=True,
-        ).sort_values("Date")
+        )
+        self.positions_index.record_dividend(ticker, 1.0 * price * quantity)
 
-        self.cash = self.get_cash(date=todays_date())
+        self._update_cash()
 
         if ticker == "" or ticker != ticker:
             print(
@@ -190,24 +309,20 @@ class Portfolio(Asset):
             self.securities[ticker] = self.securities_archive[ticker]
             self.tickers.append(ticker)
         else:
-            _security = Security(ticker, start=min_date, end=self.date)
+            _security = shared_securities.get(ticker, start=min_date, end=self.date)
             self.securities[_security.ticker] = _security
             self.tickers.append(ticker)
-            self.prices[ticker] = deque()
-            self.prices_lifo[ticker] = deque()
-            self.prices_fifo[ticker] = deque()
+            self.lots[ticker] = TaxLots()
 
     def add_security_archive(self, ticker, min_date="2000-01-01"):
         if ticker in self.securities:
             self.securities_archive[ticker] = self.securities[ticker]
             self.tickers_archive.append(ticker)
         else:
-            _security = Security(ticker, start=min_date, end=self.date)
+            _security = shared_securities.get(ticker, start=min_date, end=self.date)
             self.securities_archive[_security.ticker] = _security
             self.tickers_archive.append(ticker)
-            self.prices[ticker] = deque()
-            self.prices_lifo[ticker] = deque()
-            self.prices_fifo[ticker] = deque()
+            self.lots[ticker] = TaxLots()
 
     def remove_security(self, ticker):
         # copy state of security to archive
@@ -243,20 +358,16 @@ class Portfolio(Asset):
             else:
                 price = price / modifier
 
-        # add number of securities to price deques
-        # multiply by 1000 to capture fractional shares
-        for i in range(np.int(np.ceil(quantity*1000))):
-            self.prices[ticker].append(price)
-            self.prices_lifo[ticker].append(price)
-            self.prices_fifo[ticker].append(price)
+        # add a tax lot for the purchase
+        self.lots[ticker].buy(date, quantity, price)
+        self._journal_event(date, "buy", ticker, currency, price, quantity)
 
         # store point in time value in wallet
-        self.wallet = self.wallet.append(
-            {"Date": date, "Change": -1.0 * price * quantity}, ignore_index=True
-        ).sort_values("Date")
+        self._record_wallet(date, -1.0 * price * quantity)
 
         # store transaction in df
-        self.transactions = self.transactions.append(
+        self.ledger.append(
+            "transactions",
             {
                 "Date": date,
                 "Transaction": "buy",
@@ -266,11 +377,10 @@ class Portfolio(Asset):
                 "Quantity": 1.0 * quantity,
                 "TradeValue": 1.0 * price * quantity,
             },
-            ignore_index=True,
-            sort=False,
-        ).sort_values("Date")
+        )
+        self.positions_index.record_buy(ticker, 1.0 * quantity, 1.0 * price * quantity)
 
-        self.cash = self.get_cash(date=todays_date())
+        self._update_cash()
 
         print(
             "buying {0:.2f} {1} (new balance: {2:.2f} {3})".format(
@@ -278,7 +388,13 @@ class Portfolio(Asset):
             )
         )
 
-    def sell_security(self, date, ticker, currency="USD", price=None, quantity=0):
+    def sell_security(
+        self, date, ticker, currency="USD", price=None, quantity=0, lot=None
+    ):
+        """
+           Sells quantity of a security, optionally from a specific tax lot
+           (lot number or purchase date), otherwise from the oldest lot
+        """
 
         # modify quantity for subsequent stock splits
         quantity, modifier = self.securities[ticker].modify_quantity(date, quantity)
@@ -296,31 +412,23 @@ class Portfolio(Asset):
             else:
                 price = price / modifier
 
-        # remove number of securities from price deques
-        # multiply by 1000 to capture fractional shares
-        for i in range(np.int(np.floor(quantity*1000))):
-            _ = self.prices_fifo[ticker].popleft()
-            _ = self.prices_lifo[ticker].pop()
+        # consume sold securities from tax lots
+        lot = self.lots[ticker].resolve_lot(lot)
+        self.lots[ticker].sell(quantity, lot=lot)
+        self._journal_event(date, "sell", ticker, currency, price, quantity, lot)
 
         # make sure security is fully removed, correct for rounding errors
-        _df = self.transactions.loc[
-            self.transactions.Transaction.isin(("buy", "sell")), :
-        ].copy()
-        _df.loc[_df.Transaction == "sell", "Quantity"] = _df.loc[
-            _df.Transaction == "sell", "Quantity"
-        ].apply(lambda x: -x)
-
         # set quantity to exactly match remaining quantity in portfolio
-        if _df.groupby(by=["Ticker"])["Quantity"].sum()[ticker] <= quantity * 1.0001:
-            quantity = _df.groupby(by=["Ticker"])["Quantity"].sum()[ticker]
+        _remaining = self.positions_index.quantity(ticker)
+        if _remaining <= quantity * 1.0001:
+            quantity = _remaining
 
         # store point in time value in wallet
-        self.wallet = self.wallet.append(
-            {"Date": date, "Change": 1.0 * price * quantity}, ignore_index=True
-        ).sort_values("Date")
+        self._record_wallet(date, 1.0 * price * quantity)
 
         # store transaction in df
-        self.transactions = self.transactions.append(
+        self.ledger.append(
+            "transactions",
             {
                 "Date": date,
                 "Transaction": "sell",
@@ -330,11 +438,10 @@ class Portfolio(Asset):
                 "Quantity": 1.0 * quantity,
                 "TradeValue": 1.0 * price * quantity,
             },
-            ignore_index=True,
-            sort=False,
-        ).sort_values("Date")
+        )
+        self.positions_index.record_sell(ticker, 1.0 * quantity, 1.0 * price * quantity)
 
-        self.cash = self.get_cash(date=todays_date())
+        self._update_cash()
 
         print(
             "selling {0:.2f} {1} (new balance: {2:.2f} {3})".format(
@@ -343,81 +450,182 @@ class Portfolio(Asset):
         )
 
         # potentially remove ticker from list
-        _df = self.transactions.loc[
-            self.transactions.Transaction.isin(("buy", "sell")), :
-        ].copy()
-        _df.loc[_df.Transaction == "sell", "Quantity"] = _df.loc[
-            _df.Transaction == "sell", "Quantity"
-        ].apply(lambda x: -x)
-        if _df.groupby(by=["Ticker"])["Quantity"].sum()[ticker] <= 0.0001:
+        if self.positions_index.quantity(ticker) <= 0.0001:
             self.remove_security(ticker)
             # print('removing', ticker)
 
+    def load_events(self, events):
+        """
+           Bulk loads events in the given order, equivalent to calling
+           buy_security, sell_security, deposit_cash, withdraw_cash and dividend
+           row by row, but the ledger is extended once for all events
+
+           events is a dataframe with columns Date, Transaction (buy, sell, deposit,
+           withdraw, dividend), Ticker, Currency, Price, Quantity where quantities
+           and prices of buys and sells are already adjusted for stock splits,
+           an optional column Lot holds lot numbers to sell from
+        """
+        dates = events["Date"].values
+        actions = events["Transaction"].values
+        tickers = events["Ticker"].values
+        prices = events["Price"].values.astype(float)
+        quantities = events["Quantity"].values.astype(float)
+        lots = events["Lot"].values if "Lot" in events.columns else None
+        changes = np.empty(len(events))
+
+        for i in range(len(events)):
+            action = actions[i]
+            ticker = tickers[i]
+
+            if action == "buy":
+                if ticker not in self.tickers:
+                    self.add_security(ticker)
+                if ticker not in self.tickers_archive:
+                    self.add_security_archive(ticker)
+                self.lots[ticker].buy(dates[i], quantities[i], prices[i])
+                self.positions_index.record_buy(
+                    ticker, quantities[i], prices[i] * quantities[i]
+                )
+                changes[i] = -1.0 * prices[i] * quantities[i]
+
+            elif action == "sell":
+                if lots is None or pd.isnull(lots[i]):
+                    self.lots[ticker].sell(quantities[i])
+                else:
+                    self.lots[ticker].sell(quantities[i], lot=int(lots[i]))
+                # set quantity to exactly match remaining quantity in portfolio
+                _remaining = self.positions_index.quantity(ticker)
+                if _remaining <= quantities[i] * 1.0001:
+                    quantities[i] = _remaining
+                self.positions_index.record_sell(
+                    ticker, quantities[i], prices[i] * quantities[i]
+                )
+                changes[i] = 1.0 * prices[i] * quantities[i]
+                if self.positions_index.quantity(ticker) <= 0.0001:
+                    self.remove_security(ticker)
+
+            elif action == "withdraw":
+                changes[i] = -1.0 * prices[i] * quantities[i]
+
+            else:
+                changes[i] = 1.0 * prices[i] * quantities[i]
+                if action == "dividend":
+                    self.positions_index.record_dividend(ticker, changes[i])
+
+            self.positions_index.record_cash(changes[i])
+
+        values = prices * quantities
+        cash_flows = np.isin(actions, ("deposit", "withdraw"))
+        self.ledger.extend("wallet", {"Date": dates, "Change": changes})
+        self.ledger.extend(
+            "transactions",
+            {
+                "Date": dates,
+                "Transaction": actions,
+                "Ticker": np.where(cash_flows, np.nan, tickers),
+                "Currency": events["Currency"].values,
+                "Price": prices,
+                "Quantity": quantities,
+                "TradeValue": values,
+            },
+        )
+        self.ledger.extend(
+            "payments",
+            {
+                "Date": dates[cash_flows],
+                "In": np.where(actions == "deposit", values, 0.0)[cash_flows],
+                "Out": np.where(actions == "withdraw", values, 0.0)[cash_flows],
+            },
+        )
+        _dividends = actions == "dividend"
+        self.ledger.extend(
+            "dividends",
+            {
+                "Date": dates[_dividends],
+                "Ticker": tickers[_dividends],
+                "Amount": values[_dividends],
+            },
+        )
+        if self.journal is not None:
+            self.journal.extend(events)
+
+        self._update_cash()
+
+        print(
+            "loading {0} transactions (new balance: {1:.2f})".format(
+                len(events), self.cash
+            )
+        )
+
+    def save_snapshot(self, filepath):
+        """
+           Stores the portfolio in a binary snapshot file and starts a journal
+           (filepath + ".journal") of all events added afterwards
+        """
+        # events of an earlier journal of filepath are included in the snapshot
+        _journal = journal_path(filepath)
+        _sequence = Journal(_journal).sequence if path.isfile(_journal) else 0
+        if self.journal is not None:
+            _sequence = max(_sequence, self.journal.sequence)
+
+        save_snapshot(self, filepath, sequence=_sequence)
+        self.journal = Journal(_journal, truncate=True, sequence=_sequence)
+
+    @classmethod
+    def load_snapshot(cls, filepath):
+        """
+           Restores a portfolio from a snapshot file and replays the events
+           journaled since the snapshot was taken
+        """
+        p, _sequence = load_snapshot(cls(""), filepath)
+
+        # a journal that was not truncated after the snapshot still holds
+        # events the snapshot includes, they are skipped
+        if path.isfile(journal_path(filepath)):
+            _journal = Journal(journal_path(filepath), sequence=_sequence)
+            _events = _journal.read(after=_sequence)
+            if len(_events):
+                p.load_events(_events)
+            p.journal = _journal
+
+        p._update_cash()
+
+        return p
+
     def overview(self):
 
         # you have to have one security in the portfolio for meaningful output
         if len(self.securities) > 0:
 
-            # sum up by ticker
-            _df = self.transactions.loc[
-                self.transactions.Transaction.isin(("buy", "sell", "dividend")), :
-            ].copy()
-            _df.loc[_df.Transaction == "sell", "Quantity"] = _df.loc[
-                _df.Transaction == "sell", "Quantity"
-            ].apply(lambda x: -x)
-            _df.loc[_df.Transaction == "sell", "TradeValue"] = _df.loc[
-                _df.Transaction == "sell", "TradeValue"
-            ].apply(lambda x: -x)
-            _df.loc[_df.Transaction == "dividend", "TradeValue"] = _df.loc[
-                _df.Transaction == "dividend", "TradeValue"
-            ].apply(lambda x: -x)
-            _df.loc[_df.Transaction == "dividend", "Quantity"] = 0
-            self.overview_df = _df.groupby(by=["Ticker"])[
-                "Quantity", "TradeValue"
-            ].sum()
+            # running totals by ticker, dividends reduce the trade value
+            _df = self.positions_index.to_frame()
+            _df["TradeValue"] = _df["Invested"] - _df["Devested"] - _df["Dividends"]
+            self.overview_df = _df[["Quantity", "TradeValue"]].copy()
 
             # check if sum over volume of a security is < 0
-            for index, row in self.overview_df.iterrows():
-                if row["Quantity"] < -0.0001:
-                    print(
-                        "Negative volume encountered: {0:5}\t{1}".format(
-                            index, row["Quantity"]
-                        )
-                    )
+            warn_negative(self.overview_df["Quantity"], threshold=-0.0001)
 
             # restrict to securities with volume > 0
             self.overview_df = self.overview_df.loc[self.overview_df.Quantity > 0.0001]
 
-            for ticker in self.tickers:
-                self.overview_df.loc[
-                    self.overview_df.index == ticker, "LastPrice"
-                ] = self.securities[ticker].get_last_price()
-                # calculate average security prices from deque of prices
-                self.overview_df.loc[
-                    self.overview_df.index == ticker, "AvgPriceAll"
-                ] = np.mean(self.prices[ticker])
-                # calculate average security prices from deque of prices
-                self.overview_df.loc[
-                    self.overview_df.index == ticker, "AvgPriceFiFo"
-                ] = np.mean(self.prices_fifo[ticker])
-                # calculate average security prices from deque of prices (last in first out)
-                self.overview_df.loc[
-                    self.overview_df.index == ticker, "AvgPriceLiFo"
-                ] = np.mean(self.prices_lifo[ticker])
+            # join in last prices, average prices and names of securities
+            self.overview_df = join_scalars(
+                self.overview_df,
+                report_scalars(self.securities, self.lots, self.tickers),
+                REPORT_SCALARS,
+            )
 
             self.overview_df["CurrentValue"] = (
                 self.overview_df["LastPrice"] * self.overview_df["Quantity"]
             )
 
             # sum up dividends by ticker
-            self.overview_df["Dividends"] = self.dividends.groupby(by="Ticker")[
-                "Amount"
-            ].sum()
+            self.overview_df["Dividends"] = _df["Dividends"]
 
             self.overview_df["AvgPrice"] = self.overview_df["TradeValue"] / (
                 1.0 * self.overview_df["Quantity"]
             )
-            self.overview_df.fillna(0.0, inplace=True)
+            self.overview_df = fill_numeric(self.overview_df)
             self.overview_df["Return"] = (
                 self.overview_df["CurrentValue"]
                 - self.overview_df["TradeValue"]
@@ -428,12 +636,7 @@ class Portfolio(Asset):
             self.overview_df["AvgPriceToValue"] = (
                 self.overview_df["TradeValue"] / (self.overview_df["CurrentValue"] + self.overview_df["Dividends"])
             )
-
-            # join in names of securities
-            for ticker in self.tickers:
-                self.overview_df.loc[
-                    self.overview_df.index == ticker, "Description"
-                ] = self.securities[ticker].name
+            self.overview_df["Description"] = self.overview_df.pop("Description")
 
         # make dummy df when no (more) securities in portfolio
         else:
@@ -504,28 +707,13 @@ class Portfolio(Asset):
         # you have to have one security historically in the portfolio for meaningful output
         if len(self.securities_archive) > 0:
 
-            # sum up by ticker
-            _df = self.transactions.loc[
-                self.transactions.Transaction.isin(("buy", "sell")), :
-            ].copy()
-            _df.loc[_df.Transaction == "sell", "Quantity"] = _df.loc[
-                _df.Transaction == "sell", "Quantity"
-            ].apply(lambda x: -x)
-            _df.loc[_df.Transaction == "sell", "TradeValue"] = _df.loc[
-                _df.Transaction == "sell", "TradeValue"
-            ].apply(lambda x: -x)
-            self.overview_archive_df = _df.groupby(by=["Ticker"])[
-                "Quantity", "TradeValue"
-            ].sum()
+            # running totals by ticker
+            _df = self.positions_index.to_frame(traded=True)
+            _df["TradeValue"] = _df["Invested"] - _df["Devested"]
+            self.overview_archive_df = _df[["Quantity", "TradeValue"]].copy()
 
             # check if sum over volume of a security is < 0
-            for index, row in self.overview_archive_df.iterrows():
-                if row["Quantity"] < 0.0:
-                    print(
-                        "Negative volume encountered: {0:5}\t{1}".format(
-                            index, row["Quantity"]
-                        )
-                    )
+            warn_negative(self.overview_archive_df["Quantity"])
 
             # restrict to securities with volume == 0 (if in portfolio)
             if len(
@@ -535,30 +723,25 @@ class Portfolio(Asset):
                     self.overview_archive_df.Quantity == 0
                 ]
 
-                for ticker in self.tickers_archive:
-                    self.overview_archive_df.loc[
-                        self.overview_archive_df.index == ticker, "LastPrice"
-                    ] = self.securities_archive[ticker].get_last_price()
-                    # calculate average security prices from deque of prices
-                    self.overview_archive_df.loc[
-                        self.overview_archive_df.index == ticker, "AvgPriceAll"
-                    ] = np.mean(self.prices[ticker])
+                # join in last prices, average prices of all purchases and names
+                self.overview_archive_df = join_scalars(
+                    self.overview_archive_df,
+                    report_scalars(
+                        self.securities_archive, self.lots, self.tickers_archive
+                    ),
+                    ("LastPrice", "AvgPriceAll", "Description"),
+                )
 
                 # sum up dividends by ticker
-                self.overview_archive_df["Dividends"] = self.dividends.groupby(
-                    by="Ticker"
-                )["Amount"].sum()
-                self.overview_archive_df.fillna(0.0, inplace=True)
+                self.overview_archive_df["Dividends"] = _df["Dividends"]
+                self.overview_archive_df = fill_numeric(self.overview_archive_df)
                 self.overview_archive_df["Return"] = (
                     -self.overview_archive_df["TradeValue"]
                     + self.overview_archive_df["Dividends"]
                 )
-
-                # join in names of securities
-                for ticker in self.tickers_archive:
-                    self.overview_archive_df.loc[
-                        self.overview_archive_df.index == ticker, "Description"
-                    ] = self.securities_archive[ticker].name
+                self.overview_archive_df[
+                    "Description"
+                ] = self.overview_archive_df.pop("Description")
 
             # make dummy df when no (more) securities are in portfolio archive that are not in portfolio
             else:
@@ -603,90 +786,40 @@ class Portfolio(Asset):
     def positions(self):
         # you have to have one security in the portfolio for meaningful output
         if len(self.securities) > 0:
-            # sum up by ticker
-
-            _df = self.transactions.loc[
-                self.transactions.Transaction.isin(("buy", "sell")), :
-            ].copy()
-            _df.loc[_df.Transaction == "sell", "Quantity"] = _df.loc[
-                _df.Transaction == "sell", "Quantity"
-            ].apply(lambda x: -x)
-            _df.loc[_df.Transaction == "sell", "TradeValue"] = _df.loc[
-                _df.Transaction == "sell", "TradeValue"
-            ].apply(lambda x: -x)
-            self.positions_df = _df.groupby(by=["Ticker"])[
-                "Quantity", "TradeValue"
-            ].sum()
+            # running totals by ticker
+            _df = self.positions_index.to_frame(traded=True)
+            _df["TradeValue"] = _df["Invested"] - _df["Devested"]
+            self.positions_df = _df[["Quantity", "TradeValue"]].copy()
 
             # sum up purchases
-            self.positions_df["Bought"] = (
-                _df.loc[_df.Transaction == "buy", :]
-                .groupby(by=["Ticker"])["Quantity"]
-                .sum()
-            )
-            self.positions_df["Invested"] = (
-                _df.loc[_df.Transaction == "buy", :]
-                .groupby(by=["Ticker"])["TradeValue"]
-                .sum()
-            )
+            self.positions_df["Bought"] = _df["Bought"]
+            self.positions_df["Invested"] = _df["Invested"]
 
-            # sum up sales
-            self.positions_df["Sold"] = (
-                _df.loc[_df.Transaction == "sell", :]
-                .groupby(by=["Ticker"])["Quantity"]
-                .sum()
-            )
-            self.positions_df["Devested"] = (
-                _df.loc[_df.Transaction == "sell", :]
-                .groupby(by=["Ticker"])["TradeValue"]
-                .sum()
-            )
+            # sum up sales (counted negative)
+            self.positions_df["Sold"] = 0.0 - _df["Sold"]
+            self.positions_df["Devested"] = 0.0 - _df["Devested"]
 
             # check if sum over volume of a security is < 0
-            for index, row in self.positions_df.iterrows():
-                if row["Quantity"] < 0.0:
-                    print(
-                        "Negative volume encountered: {0:5}\t{1}".format(
-                            index, row["Quantity"]
-                        )
-                    )
-
-            # join in last price and names of securities
-            for ticker in set(self.positions_df.index):
-                if ticker in self.tickers:
-                    self.positions_df.loc[
-                        self.positions_df.index == ticker, "LastPrice"
-                    ] = self.securities[ticker].get_last_price()
-                    self.positions_df.loc[
-                        self.positions_df.index == ticker, "Description"
-                    ] = self.securities[ticker].name
-                elif ticker in self.tickers_archive:
-                    self.positions_df.loc[
-                        self.positions_df.index == ticker, "LastPrice"
-                    ] = self.securities_archive[ticker].get_last_price()
-                    self.positions_df.loc[
-                        self.positions_df.index == ticker, "Description"
-                    ] = self.securities_archive[ticker].name
-                else:
-                    _security = Security(ticker)
-                    self.positions_df.loc[
-                        self.positions_df.index == ticker, "LastPrice"
-                    ] = _security.get_last_price()
-                    self.positions_df.loc[
-                        self.positions_df.index == ticker, "Description"
-                    ] = _security.name
+            warn_negative(self.positions_df["Quantity"])
+
+            # join in last price and names of securities that are loaded
+            _securities = dict(self.securities_archive)
+            _securities.update(self.securities)
+            self.positions_df = join_scalars(
+                self.positions_df,
+                report_scalars(_securities, self.lots, list(self.positions_df.index)),
+                ("LastPrice", "Description"),
+            )
 
             self.positions_df["CurrentValue"] = (
                 self.positions_df["LastPrice"] * self.positions_df["Quantity"]
             )
 
             # sum up dividends by ticker
-            self.positions_df["Dividends"] = self.dividends.groupby(by="Ticker")[
-                "Amount"
-            ].sum()
+            self.positions_df["Dividends"] = _df["Dividends"]
 
             # self.positions_df['AvgPrice'] = self.positions_df['TradeValue'] / (1.0*self.positions_df['Quantity'])
-            self.positions_df.fillna(0.0, inplace=True)
+            self.positions_df = fill_numeric(self.positions_df)
             self.positions_df["Return"] = (
                 self.positions_df["CurrentValue"]
                 - self.positions_df["TradeValue"]
@@ -726,61 +859,78 @@ class Portfolio(Asset):
         self.max_date = datetime.datetime.now()
 
         # make a list of days between min and max date as index for timeseries df
-        date_index = pd.date_range(self.min_date, self.max_date, freq="D")
-        _ts = pd.Series(range(len(date_index)), index=date_index)
-
-        # create timeseries df from date index and wallet entries
-        _df_ts = (
-            _ts.to_frame("Day")
-            .join(self.wallet[["Date", "Change"]].groupby(by="Date").sum(), how="left")
-            .fillna(method="ffill")
-        )
+        date_index = daily_index(self.min_date, self.max_date)
 
-        # join in daily price data for each security
-        for security in self.tickers_archive:
-            _series = self.securities_archive[security].data["Close"]
-            _series = _series.rename(str(_series.name) + "_" + security)
-            _df_ts = _df_ts.join(_series, how="left", rsuffix="").fillna(method="ffill")
-
-        for security in self.tickers_archive:
-            _df = self.transactions.loc[
-                (self.transactions.Ticker == self.securities_archive[security].ticker)
-                & (self.transactions.Transaction.isin(("buy", "sell"))),
-                :,
-            ].copy()
-            _df.loc[_df.Transaction == "sell", "Quantity"] = _df.loc[
-                _df.Transaction == "sell", "Quantity"
-            ].apply(lambda x: -x)
-            _df = _df[["Date", "Quantity"]].groupby(by=["Date"]).sum().cumsum()
-            _df.columns = _df.columns.map(lambda x: str(x) + "_" + security)
-            _df_ts = _df_ts.join(_df, how="left", rsuffix="").fillna(method="ffill")
-
-        # fill all values forward then calculate value in portfolio
-        _df_ts = _df_ts.fillna(method="ffill")
-        for security in self.tickers_archive:
-            _df_ts[security] = (
-                _df_ts["Close_" + security] * _df_ts["Quantity_" + security]
-            )
+        self.data, self.data_growth = self._timeseries(date_index)
+        self.ledger.mark_unchanged()
 
-        # calculate portfolio value
-        _df_ts = _df_ts.join(
-            self.wallet[["Date", "Change"]].groupby(by="Date").sum().cumsum(),
-            how="left",
-            rsuffix="_tot",
-        ).fillna(method="ffill")
-        _df_ts["Cash"] = _df_ts["Change_tot"]
-        _df_ts["Total"] = _df_ts["Change_tot"]
-        for security in self.tickers_archive:
-            _df_ts["Total"] = _df_ts["Total"] + _df_ts[security].fillna(0)
+    def _timeseries(self, date_index):
+        """
+        Compute portfolio values and growth for a range of days
+        """
+
+        # dates x tickers matrices of prices and held quantities
+        _prices = price_panel(self.securities_archive, self.tickers_archive, date_index)
+        _quantities = quantity_panel(
+            self.transactions, self.tickers_archive, date_index
+        )
+        _df_ts = value_panel(_prices, _quantities)
 
         # calculate portfolio value
-        _df = self.payments.groupby(by=["Date"]).sum().cumsum()
-        _df["Total_deposited"] = _df["In"] - _df["Out"]
-        _df_ts = _df_ts.join(_df, how="left", rsuffix="").fillna(method="ffill")
+        _df_ts["Cash"] = cumulative_series(self.wallet, ["Change"], date_index)[
+            "Change"
+        ]
+        _df_ts["Total"] = _df_ts["Cash"] + _df_ts[self.tickers_archive].fillna(0).sum(
+            axis=1
+        )
+
+        # calculate growth relative to the deposited money
+        _df = cumulative_series(self.payments, ["In", "Out"], date_index)
+        _df_ts["Total_deposited"] = _df["In"] - _df["Out"]
         _df_ts["Growth"] = _df_ts["Total"] / _df_ts["Total_deposited"]
 
-        self.data = _df_ts[self.tickers_archive + ["Cash", "Total"]]
-        self.data_growth = _df_ts[["Total", "Total_deposited", "Growth"]]
+        return (
+            _df_ts[self.tickers_archive + ["Cash", "Total"]],
+            _df_ts[["Total", "Total_deposited", "Growth"]].copy(),
+        )
+
+    def update_timeseries(self):
+        """
+        Extend data and data_growth up to today, only the days from the last
+        materialized day (or from the earliest transaction added since) are computed
+        """
+        try:
+            _last = self.data.index[-1]
+        except (AttributeError, IndexError):
+            return self.get_timeseries()
+
+        # new securities or transactions before the first day need a full recompute
+        _min_date = min(self.transactions.Date.min(), self.payments.Date.min())
+        if _min_date != self.min_date or list(self.data.columns[:-2]) != list(
+            self.tickers_archive
+        ):
+            return self.get_timeseries()
+
+        # the last day is recomputed as prices of that day may have been incomplete
+        _start = _last
+        if self.ledger.changed_from is not None:
+            _start = min(_start, pd.Timestamp(self.ledger.changed_from).normalize())
+        if _start <= self.data.index[0]:
+            return self.get_timeseries()
+
+        self.max_date = datetime.datetime.now()
+        _data, _growth = self._timeseries(daily_index(_start, self.max_date))
+
+        _before = self.data_growth.loc[self.data_growth.index < _start]
+        if "Return" in self.data_growth.columns:
+            _growth["Return"] = log_returns(
+                _growth[[self.returns_column]],
+                previous=_before[self.returns_column].values[-1:],
+            ).values[:, 0]
+
+        self.data = pd.concat([self.data.loc[self.data.index < _start], _data])
+        self.data_growth = pd.concat([_before, _growth])
+        self.ledger.mark_unchanged()
 
     def get_returns(self, column="Total"):
         try:
@@ -790,31 +940,60 @@ class Portfolio(Asset):
         else:
             pass
 
-        self.data_growth, _ = returns_column(df=self.data_growth, column=column)
+        self.returns_column = column
+        self.data_growth["Return"] = log_returns(self.data_growth[[column]]).values[
+            :, 0
+        ]
 
         # get date range from the transaction list
         self.min_date = min(self.transactions.Date.min(), self.payments.Date.min())
         self.max_date = datetime.datetime.now()
 
         # make a list of days between min and max date as index for timeseries df
-        date_index = pd.date_range(self.min_date, self.max_date, freq="D")
-        _ts = pd.Series(range(len(date_index)), index=date_index)
+        self.returns = self._returns(daily_index(self.min_date, self.max_date))
+
+    def _returns(self, date_index, previous=None):
+        """
+        Compute daily returns of the securities in the portfolio for a range of days,
+        previous are the prices of the day before the range
+        """
+        _df = log_returns(
+            price_panel(self.securities, self.tickers, date_index), previous=previous
+        )
+        _df.insert(0, "Day", (date_index - self.min_date).days)
 
-        # create timeseries df from date index and wallet entries
-        _df_ts = _ts.to_frame("Day")
-        #
+        return _df
 
-        # join in daily price change data for each security
-        cols = []
-        for security in self.tickers:
-            _series = self.securities[security].data["Close"]
-            _col_name = str(_series.name) + "_" + security
-            _series = _series.rename(_col_name)
-            _df_ts = _df_ts.join(_series, how="left", rsuffix="").fillna(method="ffill")
-            _df_ts, _ = returns_column(df=_df_ts, column=_col_name, outname=security)
-            cols.append(_col_name)
+    def update_returns(self, column="Total"):
+        """
+        Extend data, data_growth and returns up to today without recomputing
+        the days that are already materialized
+        """
+        self.update_timeseries()
 
-        self.returns = _df_ts.drop(cols, axis=1)
+        try:
+            _last = self.returns.index[-1]
+        except (AttributeError, IndexError):
+            return self.get_returns(column)
+
+        if (
+            column != self.returns_column
+            or "Return" not in self.data_growth.columns
+            or self.returns.index[0] != self.min_date
+            or list(self.returns.columns[1:]) != list(self.tickers)
+            or _last <= self.returns.index[0]
+        ):
+            return self.get_returns(column)
+
+        # prices of the day before the recomputed range give the first return
+        _dates = daily_index(_last - pd.Timedelta(days=1), self.max_date)
+        _previous = price_panel(self.securities, self.tickers, _dates[:1]).values[0]
+        self.returns = pd.concat(
+            [
+                self.returns.loc[self.returns.index < _last],
+                self._returns(_dates[1:], previous=_previous),
+            ]
+        )
 
     def get_benchmark(self, benchmark_ticker="^GSPC"):
 
@@ -823,15 +1002,29 @@ class Portfolio(Asset):
         else:
             _ticker = "^GSPC"  # S&P 500 as default
 
-        # create security class object for benchmark ticker
-        _benchmark = Security(_ticker, start=self.min_date, end=self.max_date)
+        # separate copy of the shared benchmark security, its data is modified below
+        _benchmark = shared_securities.view(
+            _ticker, start=self.min_date, end=self.max_date
+        )
 
         # calculate returns for the benchmark
         _benchmark.data, _ = returns_column(df=_benchmark.data, column="Close")
 
         self.benchmark = _benchmark
 
-    def get_performance(self):
+    def get_performance(self, freq="A"):
+        """
+        Growth (percentage points) and dollar return of the portfolio per period
+
+        Parameters
+        ==========
+        freq : "A" for years, "Q" for quarters or "M" for months
+
+        Returns
+        =======
+        df : dataframe with columns Year (Quarter, Month), Growth and Return
+
+        """
         try:
             self.data
         except AttributeError:
@@ -839,47 +1032,26 @@ class Portfolio(Asset):
         else:
             pass
 
-        years = []
-        growths = []
-        dollar_returns = []
-        for year in self.data_growth.index.year.unique():
-            # get first and last day of year
-            min_date = self.data_growth.loc[
-                self.data_growth.index.year == year, :
-            ].index.min()
-            max_date = self.data_growth.loc[
-                self.data_growth.index.year == year, :
-            ].index.max()
-
-            # compare growth (percentage and dollars) between end of year and beginning of year
-            growth = 100 * (
-                self.data_growth.loc[
-                    self.data_growth.index == max_date, "Growth"
-                ].values[0]
-                - self.data_growth.loc[
-                    self.data_growth.index == min_date, "Growth"
-                ].values[0]
-            )
-            dollar_return = (
-                self.data_growth.loc[
-                    self.data_growth.index == max_date, "Total"
-                ].values[0]
-                - self.data_growth.loc[
-                    self.data_growth.index == max_date, "Total_deposited"
-                ].values[0]
-            ) - (
-                self.data_growth.loc[
-                    self.data_growth.index == min_date, "Total"
-                ].values[0]
-                - self.data_growth.loc[
-                    self.data_growth.index == min_date, "Total_deposited"
-                ].values[0]
-            )
-            years.append(year)
-            growths.append(growth)
-            dollar_returns.append(dollar_return)
+        # compare growth (percentage and dollars) between end and beginning of period
+        _periods, _first, _last = period_bounds(self.data_growth.index, freq=freq)
+        _growth = self.data_growth["Growth"].values
+        _gain = (
+            self.data_growth["Total"].values
+            - self.data_growth["Total_deposited"].values
+        )
+
+        if freq == "A":
+            _periods = _periods.year
+        else:
+            _periods = _periods.astype(str)
 
-        _df = pd.DataFrame({"Year": years, "Growth": growths, "Return": dollar_returns})
+        _df = pd.DataFrame(
+            {
+                PERFORMANCE_PERIODS[freq]: _periods,
+                "Growth": 100 * (_growth[_last] - _growth[_first]),
+                "Return": _gain[_last] - _gain[_first],
+            }
+        )
 
         return _df
 
@@ -912,8 +1084,10 @@ class TotalPortfolioValue(object):
         else:
             _ticker = "^GSPC"  # S&P 500 as default
 
-        # create security class object for benchmark ticker
-        _benchmark = Security(_ticker, start=self.min_date, end=self.max_date)
+        # separate copy of the shared benchmark security, its data is modified below
+        _benchmark = shared_securities.view(
+            _ticker, start=self.min_date, end=self.max_date
+        )
 
         # calculate returns for the benchmark
         _benchmark.data, _ = returns_column(df=_benchmark.data, column="Close")
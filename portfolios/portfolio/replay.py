@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+# columns of the transaction type lookup tables
+_TYPE_COLUMNS = ["Priority", "Action", "PriceColumn", "QuantityColumn", "Sign"]
+
+# transaction types of the standard (csv, Robinhood) format
+# priority orders transactions on the same day, action is the portfolio event,
+# price and quantity are read from the given columns (price 1.0 if None)
+TRANSACTION_TYPES = pd.DataFrame.from_records(
+    [
+        ("deposit", 1, "deposit", "Price", "Quantity", 1.0),
+        ("Contribution", 1, None, None, None, 1.0),
+        ("Funds Received", 1, None, None, None, 1.0),
+        ("Conversion (incoming)", 1, None, None, None, 1.0),
+        ("buy", 2, "buy", "Price", "Quantity", 1.0),
+        ("Buy", 2, "buy", "Price", "Quantity", 1.0),
+        ("Reinvestment", 2, None, None, None, 1.0),
+        ("dividend", 3, "dividend", None, "Quantity", 1.0),
+        ("Dividend", 3, "dividend", None, "Dollars", 1.0),
+        ("sell", 4, "sell", "Price", "Quantity", 1.0),
+        ("Sell", 4, "sell", "Price", "Quantity", 1.0),
+        ("withdraw", 5, "withdraw", "Price", "Quantity", 1.0),
+        ("Distribution", 5, None, None, None, 1.0),
+    ],
+    columns=["Transaction"] + _TYPE_COLUMNS,
+    index="Transaction",
+)
+
+# transaction types of the Vanguard format, sales and withdrawals are negative
+TRANSACTION_TYPES_VANGUARD = pd.DataFrame.from_records(
+    [
+        ("deposit", 1, "deposit", None, "Dollars", 1.0),
+        ("Contribution", 1, "deposit", None, "Dollars", 1.0),
+        ("Funds Received", 1, "deposit", None, "Dollars", 1.0),
+        ("Conversion (incoming)", 1, "deposit", None, "Dollars", 1.0),
+        ("buy", 2, "buy", "Price", "Quantity", 1.0),
+        ("Buy", 2, "buy", "Price", "Quantity", 1.0),
+        ("Reinvestment", 2, "reinvest", "Price", "Quantity", 1.0),
+        ("Reinvestment (LT)", 2, "reinvest", "Price", "Quantity", 1.0),
+        ("Reinvestment (ST)", 2, "reinvest", "Price", "Quantity", 1.0),
+        ("dividend", 3, None, None, None, 1.0),
+        ("Dividend", 3, "dividend", None, "Dollars", 1.0),
+        ("Capital gain (LT)", 3, "dividend", None, "Dollars", 1.0),
+        ("Capital gain (ST)", 3, "dividend", None, "Dollars", 1.0),
+        ("sell", 4, "sell", "Price", "Quantity", -1.0),
+        ("Sell", 4, "sell", "Price", "Quantity", -1.0),
+        ("Withdrawal", 5, "withdraw", None, "Dollars", -1.0),
+        ("withdraw", 5, "withdraw", None, "Dollars", -1.0),
+        ("Distribution", 5, "withdraw", None, "Dollars", -1.0),
+    ],
+    columns=["Transaction"] + _TYPE_COLUMNS,
+    index="Transaction",
+)
+
+# actions that are matched case-insensitively in the standard format
+_LOWERCASE_ACTIONS = ("buy", "sell", "deposit", "withdraw")
+
+
+def lookup_transaction_types(transactions, table, lowercase=False):
+    """
+    Map a column of transaction types through a lookup table
+
+    Parameters
+    ==========
+    transactions : array or series of transaction types
+    table : lookup table (TRANSACTION_TYPES or TRANSACTION_TYPES_VANGUARD)
+    lowercase : match buy, sell, deposit, and withdraw regardless of case
+        (without a priority) if the type is not in the table
+
+    Returns
+    =======
+    df : dataframe with one row of the lookup table per transaction
+
+    """
+
+    # resolve each distinct transaction type once
+    _categories = pd.Categorical(np.asarray(transactions, dtype=object))
+    _types = table.reindex(_categories.categories)
+
+    if lowercase:
+        for transaction in _types.index[_types.Action.isnull()]:
+            _lower = str.lower(transaction)
+            if transaction not in table.index and _lower in _LOWERCASE_ACTIONS:
+                _types.loc[transaction, _TYPE_COLUMNS] = table.loc[
+                    _lower, _TYPE_COLUMNS
+                ]
+                _types.loc[transaction, "Priority"] = np.nan
+
+    # missing transaction types get code -1, which maps to an empty row
+    _types = pd.concat(
+        [_types, pd.DataFrame(index=[np.nan], columns=_TYPE_COLUMNS)], sort=False
+    )
+    _codes = np.where(_categories.codes < 0, len(_types) - 1, _categories.codes)
+
+    return _types.iloc[_codes].reset_index(drop=True)
+
+
+def assign_priorities(df, table):
+    """
+    Add a priority column to a dataframe of transactions and sort it
+    by date and priority (in place, like the row-wise parsers)
+    """
+    _types = lookup_transaction_types(df.Transaction, table)
+    df["Priority"] = _types["Priority"].values.astype(float)
+    df.sort_values(by=["Date", "Priority"], inplace=True)
+
+    return df
+
+
+def _values(df, column):
+    """
+    Return a column as float array, nan if the column does not exist
+    """
+    if column in df.columns:
+        return pd.to_numeric(df[column]).values.astype(float)
+    else:
+        return np.full(len(df), np.nan)
+
+
+def resolve_events(df, table, lowercase=False):
+    """
+    Turn a sorted dataframe of transactions into portfolio events
+
+    Parameters
+    ==========
+    df : input dataframe, sorted by date and priority
+    table : lookup table of transaction types
+    lowercase : see lookup_transaction_types
+
+    Returns
+    =======
+    events : dataframe with columns Date, Transaction, Ticker, Currency, Price, Quantity
+        before split adjustments, transactions without action are dropped
+
+    """
+
+    _types = lookup_transaction_types(df.Transaction, table, lowercase=lowercase)
+    _types.index = df.index
+
+    # read price and quantity from the columns given by the transaction type
+    _prices = np.ones(len(df))
+    for column in set(_types.PriceColumn.dropna()):
+        _rows = (_types.PriceColumn == column).values
+        _prices[_rows] = _values(df, column)[_rows]
+    _quantities = np.full(len(df), np.nan)
+    for column in set(_types.QuantityColumn.dropna()):
+        _rows = (_types.QuantityColumn == column).values
+        _quantities[_rows] = _values(df, column)[_rows]
+
+    events = pd.DataFrame(
+        {
+            "Date": df["Date"].values,
+            "Transaction": _types["Action"].values,
+            "Ticker": df["Ticker"].values,
+            "Currency": df["Currency"].values,
+            "Price": _prices,
+            "Quantity": _types["Sign"].values.astype(float) * _quantities,
+        }
+    )
+
+    # reinvestments are only purchases if securities were bought
+    _reinvest = events.Transaction == "reinvest"
+    events.loc[_reinvest, "Transaction"] = "buy"
+    events = events.loc[
+        events.Transaction.notnull()
+        & events.Date.notnull()
+        & ~(_reinvest & (events.Quantity == 0))
+    ]
+
+    return events.reset_index(drop=True)
+
+
+def adjust_events(events, p):
+    """
+    Apply stock split modifiers and fill in missing prices of purchases and sales
+    for all rows of a ticker at once
+    """
+    _trades = events.Transaction.isin(("buy", "sell")).values
+    _quantities = events["Quantity"].values.astype(float).copy()
+    _prices = events["Price"].values.astype(float).copy()
+    _dates = events["Date"].values
+
+    for ticker, _rows in events.loc[_trades].groupby(by="Ticker").indices.items():
+        _rows = np.flatnonzero(_trades)[_rows]
+
+        # securities that were not loaded upfront are added like in buy_security
+        if ticker not in p.securities_archive:
+            p.add_security_archive(ticker)
+        _security = p.securities_archive[ticker]
+
+        _quantities[_rows], _modifiers = _security.modify_quantities(
+            _dates[_rows], _quantities[_rows]
+        )
+        _missing = np.isnan(_prices[_rows])
+        _prices[_rows] = np.where(
+            _missing,
+            _security.get_prices_at(_dates[_rows]),
+            _prices[_rows] / _modifiers,
+        )
+
+    events = events.copy()
+    events["Quantity"] = _quantities
+    events["Price"] = _prices
+
+    return events
+
+
+def replay_transactions(dfs, p, table, lowercase=False):
+    """
+    Batch counterpart of the row-wise loops in parse_portfolio and
+    parse_portfolio_vanguard, performs all transactions of a list of dataframes
+    on a portfolio with a single bulk load
+
+    Parameters
+    ==========
+    dfs : list of input dataframes, each sorted by date and priority
+    p : portfolio (Portfolio class object)
+    table : lookup table of transaction types
+    lowercase : see lookup_transaction_types
+
+    Returns
+    =======
+    p : modified portfolio (Portfolio class object)
+
+    """
+
+    events = pd.concat(
+        [resolve_events(df, table, lowercase=lowercase) for df in dfs],
+        axis=0,
+        ignore_index=True,
+    )
+    if len(events):
+        p.load_events(adjust_events(events, p))
+
+    return p
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+# per-ticker values joined into the portfolio reports
+REPORT_SCALARS = (
+    "LastPrice",
+    "AvgPriceAll",
+    "AvgPriceFiFo",
+    "AvgPriceLiFo",
+    "Description",
+)
+
+
+def report_scalars(securities, lots, tickers):
+    """
+    Gather last prices, average prices and names of securities
+
+    Only securities and tax lots that are already loaded are used, tickers
+    without security or lots get missing values (no data is fetched)
+
+    Parameters
+    ==========
+    securities : dictionary of Security class objects by ticker
+    lots : dictionary of TaxLots class objects by ticker
+    tickers : list of tickers
+
+    Returns
+    =======
+    df : dataframe with one row per ticker and the columns in REPORT_SCALARS
+
+    """
+
+    _columns = {column: [] for column in REPORT_SCALARS}
+    for ticker in tickers:
+        _security = securities.get(ticker)
+        if _security is None:
+            _columns["LastPrice"].append(np.nan)
+            _columns["Description"].append(np.nan)
+        else:
+            _columns["LastPrice"].append(_security.get_last_price())
+            _columns["Description"].append(_security.name)
+
+        # average security prices from the running summaries of the tax lots
+        _summary = lots[ticker].summary() if ticker in lots else {}
+        for column in ("AvgPriceAll", "AvgPriceFiFo", "AvgPriceLiFo"):
+            _columns[column].append(_summary.get(column, np.nan))
+
+    return pd.DataFrame(
+        _columns,
+        index=pd.Index(tickers, name="Ticker", dtype=object),
+        columns=list(REPORT_SCALARS),
+    )
+
+
+def join_scalars(df, scalars, columns):
+    """
+    Join per-ticker values into a report in one operation, rows without values
+    get missing values
+    """
+    return df.join(scalars[list(columns)], how="left")
+
+
+def fill_numeric(df, value=0.0):
+    """
+    Fill missing values of all columns except the description
+    """
+    _columns = df.columns.drop("Description", errors="ignore")
+
+    return df.fillna(dict.fromkeys(_columns, value))
+
+
+def warn_negative(quantities, threshold=0.0):
+    """
+    Print the tickers with a quantity below threshold
+    """
+    for ticker, quantity in quantities.loc[quantities < threshold].items():
+        print("Negative volume encountered: {0:5}\t{1}".format(ticker, quantity))
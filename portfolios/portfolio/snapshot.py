@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import json
+import os
+from os import path
+
+import numpy as np
+import pandas as pd
+
+from portfolios.portfolio.holdings import HOLDING_FIELDS, PositionIndex
+from portfolios.portfolio.ledger import LEDGER_TABLES
+from portfolios.portfolio.lots import LOT_METHODS, TaxLots
+from portfolios.security.security import Security
+
+# version of the snapshot layout, increased on incompatible changes
+SNAPSHOT_VERSION = 3
+
+# columns of the event journal, see Portfolio.load_events
+JOURNAL_COLUMNS = [
+    "Date",
+    "Transaction",
+    "Ticker",
+    "Currency",
+    "Price",
+    "Quantity",
+    "Lot",
+]
+
+# missing tickers and currencies in the journal, empty tickers (e.g. of
+# interest) are kept apart from missing ones
+_MISSING = "<NA>"
+
+
+def journal_path(snapshot_path):
+    return "{}.journal".format(snapshot_path)
+
+
+class Journal(object):
+    """
+       Class that appends portfolio events to a csv file, dates are stored as
+       int64 nanoseconds and numbers with full precision
+
+       Events are numbered in sequence, the numbers continue after the journal
+       is truncated, so that a snapshot tells which events it includes
+    """
+
+    def __init__(self, filepath, truncate=False, sequence=0):
+        self.path = filepath
+        self.sequence = sequence
+        if truncate or not path.isfile(filepath):
+            open(filepath, "w").close()
+        else:
+            _sequences = self._read()["Sequence"].values
+            if len(_sequences):
+                self.sequence = max(sequence, int(_sequences.max()))
+
+    def _write(self, rows):
+        with open(self.path, "a", newline="") as f:
+            writer = csv.writer(f)
+            for row in rows:
+                self.sequence += 1
+                writer.writerow([self.sequence] + row)
+
+    def _row(self, date, action, ticker, currency, price, quantity, lot):
+        return [
+            pd.Timestamp(date).value,
+            action,
+            _MISSING if ticker is None or ticker != ticker else ticker,
+            _MISSING if currency is None or currency != currency else currency,
+            repr(float(price)),
+            repr(float(quantity)),
+            "" if lot is None else int(lot),
+        ]
+
+    def append(self, date, action, ticker, currency, price, quantity, lot=None):
+        self._write([self._row(date, action, ticker, currency, price, quantity, lot)])
+
+    def extend(self, events):
+        """
+        Append a dataframe of events with columns Date, Transaction, Ticker,
+        Currency, Price, Quantity and optionally Lot
+        """
+        if "Lot" in events.columns:
+            _lots = events["Lot"].values
+        else:
+            _lots = [None] * len(events)
+        self._write(
+            [
+                self._row(*row, lot=None if lot != lot else lot)
+                for row, lot in zip(
+                    events[JOURNAL_COLUMNS[:-1]].itertuples(index=False), _lots
+                )
+            ]
+        )
+
+    def _read(self):
+        _columns = ["Sequence"] + JOURNAL_COLUMNS
+        if path.getsize(self.path) == 0:
+            return pd.DataFrame(columns=_columns)
+
+        return pd.read_csv(
+            self.path,
+            header=None,
+            names=_columns,
+            dtype={
+                "Sequence": np.int64,
+                "Date": np.int64,
+                "Ticker": object,
+                "Currency": object,
+            },
+            keep_default_na=False,
+            na_values={
+                "Ticker": [_MISSING],
+                "Currency": [_MISSING],
+                "Price": ["nan"],
+                "Quantity": ["nan"],
+                "Lot": [""],
+            },
+            float_precision="round_trip",
+        )
+
+    def read(self, after=0):
+        """
+        Return the events journaled after the sequence number after as
+        dataframe in the format of load_events
+        """
+        _df = self._read()
+        _df = _df.loc[_df["Sequence"].values.astype(np.int64) > after]
+        _df = _df[JOURNAL_COLUMNS].reset_index(drop=True)
+        _df["Date"] = pd.to_datetime(_df["Date"].values.astype(np.int64))
+
+        return _df
+
+
+def _security_arrays(security):
+    _index = security.data.index.values.astype("datetime64[ns]")
+    _arrays = {"index": _index.view(np.int64)}
+    for column in security.data.columns:
+        _values = security.data[column].values
+        if _values.dtype == object:
+            _values = _values.astype(str)
+        _arrays[column] = _values
+
+    return _arrays
+
+
+def save_snapshot(p, filepath, sequence=0):
+    """
+    Store ledger, tax lots, running positions and price data of all securities
+    of a portfolio in a single npz file, the file is replaced at once
+
+    Parameters
+    ==========
+    p : portfolio (Portfolio class object)
+    filepath : path of the snapshot file
+    sequence : number of the last journaled event included in the snapshot
+
+    """
+
+    _arrays = {}
+    _meta = {
+        "version": SNAPSHOT_VERSION,
+        "name": p.name,
+        "check_consistency": p.check_consistency,
+        "tickers": list(p.tickers),
+        "tickers_archive": list(p.tickers_archive),
+        "returns_column": p.returns_column,
+        "sequence": int(sequence),
+    }
+
+    # ledger tables as raw column buffers plus the symbol table
+    _meta["symbols"] = [str(symbol) for symbol in p.ledger.symbols.symbols]
+    for table, layout in LEDGER_TABLES.items():
+        for name, _ in layout:
+            _arrays["ledger.{}.{}".format(table, name)] = p.ledger.column(table, name)
+
+    # remaining lots of every accounting method and their running summaries
+    _meta["lots"] = []
+    for i, (ticker, lots) in enumerate(sorted(p.lots.items())):
+        _arrays["lots.{}.dates".format(i)] = np.asarray(lots.dates, dtype=np.int64)
+        _arrays["lots.{}.quantities".format(i)] = np.asarray(lots.quantities)
+        _arrays["lots.{}.costs".format(i)] = np.asarray(lots.costs)
+        for method in LOT_METHODS:
+            _arrays["lots.{}.{}".format(i, method)] = np.asarray(lots.remaining[method])
+        _arrays["lots.{}.stack".format(i)] = np.asarray(lots._stack, dtype=np.int64)
+        _arrays["lots.{}.order".format(i)] = np.asarray(lots._order, dtype=np.int64)
+        _meta["lots"].append(
+            {
+                "ticker": ticker,
+                "total_quantity": lots.total_quantity,
+                "total_cost": lots.total_cost,
+                "quantity": lots.quantity,
+                "cost": lots.cost,
+                "head": lots._head,
+            }
+        )
+
+    # running positions
+    _tickers = sorted(p.positions_index.holdings)
+    _meta["positions"] = {"tickers": _tickers, "cash": p.positions_index.cash}
+    _arrays["positions"] = np.array(
+        [[p.positions_index.holdings[t][f] for f in HOLDING_FIELDS] for t in _tickers],
+        dtype=np.float64,
+    ).reshape(len(_tickers), len(HOLDING_FIELDS))
+
+    # price data of current and archived securities
+    _securities = dict(p.securities_archive)
+    _securities.update(p.securities)
+    _meta["securities"] = []
+    for i, (ticker, security) in enumerate(sorted(_securities.items())):
+        for name, values in _security_arrays(security).items():
+            _arrays["security.{}.{}".format(i, name)] = values
+        _meta["securities"].append(
+            {
+                "ticker": ticker,
+                "name": str(security.name),
+                "start": str(security.start),
+                "end": str(security.end),
+                "columns": [str(column) for column in security.data.columns],
+            }
+        )
+
+    _arrays["meta"] = np.array(json.dumps(_meta))
+    _temporary = "{}.tmp".format(filepath)
+    with open(_temporary, "wb") as f:
+        np.savez(f, **_arrays)
+    os.replace(_temporary, filepath)
+
+
+def load_snapshot(p, filepath):
+    """
+    Restore a portfolio from a snapshot written by save_snapshot
+
+    Parameters
+    ==========
+    p : empty portfolio (Portfolio class object)
+    filepath : path of the snapshot file
+
+    Returns
+    =======
+    p : restored portfolio (Portfolio class object)
+    sequence : number of the last journaled event included in the snapshot
+
+    """
+
+    with np.load(filepath, allow_pickle=False) as _arrays:
+        _meta = json.loads(str(_arrays["meta"]))
+        if _meta["version"] != SNAPSHOT_VERSION:
+            raise ValueError(
+                "Snapshot version {} is not supported".format(_meta["version"])
+            )
+
+        p.set_name(_meta["name"])
+        p.check_consistency = _meta["check_consistency"]
+        p.returns_column = _meta["returns_column"]
+
+        # ledger tables
+        for symbol in _meta["symbols"]:
+            p.ledger.symbols.code(symbol)
+        for table, layout in LEDGER_TABLES.items():
+            p.ledger.extend_encoded(
+                table,
+                {
+                    name: _arrays["ledger.{}.{}".format(table, name)]
+                    for name, _ in layout
+                },
+            )
+        p.ledger.mark_unchanged()
+
+        # tax lots
+        for i, _lots_meta in enumerate(_meta["lots"]):
+            lots = TaxLots()
+            lots.dates = _arrays["lots.{}.dates".format(i)].tolist()
+            lots.quantities = _arrays["lots.{}.quantities".format(i)].tolist()
+            lots.costs = _arrays["lots.{}.costs".format(i)].tolist()
+            for method in LOT_METHODS:
+                _remaining = _arrays["lots.{}.{}".format(i, method)]
+                lots.remaining[method] = _remaining.tolist()
+            lots._stack = _arrays["lots.{}.stack".format(i)].tolist()
+            lots._order = _arrays["lots.{}.order".format(i)].tolist()
+            lots._order_dates = [lots.dates[lot] for lot in lots._order]
+            lots.total_quantity = _lots_meta["total_quantity"]
+            lots.total_cost = _lots_meta["total_cost"]
+            lots.quantity = _lots_meta["quantity"]
+            lots.cost = _lots_meta["cost"]
+            lots._head = _lots_meta["head"]
+            p.lots[_lots_meta["ticker"]] = lots
+
+        # running positions
+        p.positions_index = PositionIndex()
+        for ticker, values in zip(_meta["positions"]["tickers"], _arrays["positions"]):
+            p.positions_index.holdings[ticker] = dict(
+                zip(HOLDING_FIELDS, values.tolist())
+            )
+        p.positions_index.cash = _meta["positions"]["cash"]
+
+        # securities
+        _securities = {}
+        for i, _security_meta in enumerate(_meta["securities"]):
+            _index = pd.DatetimeIndex(
+                _arrays["security.{}.index".format(i)].view("datetime64[ns]"),
+                name="Date",
+            )
+            _data = pd.DataFrame(
+                {
+                    column: _arrays["security.{}.{}".format(i, column)]
+                    for column in _security_meta["columns"]
+                },
+                index=_index,
+                columns=_security_meta["columns"],
+            )
+            _securities[_security_meta["ticker"]] = Security.from_data(
+                _security_meta["ticker"],
+                _data,
+                description=_security_meta["name"],
+                start=_security_meta["start"],
+                end=_security_meta["end"],
+            )
+
+    p.tickers = list(_meta["tickers"])
+    p.tickers_archive = list(_meta["tickers_archive"])
+    p.securities = {ticker: _securities[ticker] for ticker in p.tickers}
+    p.securities_archive = {ticker: _securities[ticker] for ticker in p.tickers_archive}
+
+    return p, _meta["sequence"]
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+
+def daily_index(min_date, max_date):
+    """
+    Daily date index between two dates (both included)
+    """
+    return pd.date_range(min_date, max_date, freq="D")
+
+
+def _as_of(df, dates):
+    """
+    Forward fill a dataframe with sorted index and read its values as of each date,
+    so that any range of dates can be materialized without the rows before it
+    """
+    return df.fillna(method="ffill").reindex(dates, method="ffill")
+
+
+def price_panel(securities, tickers, dates, column="Close"):
+    """
+    Build a dates x tickers matrix of prices, forward filled over days without data
+
+    Parameters
+    ==========
+    securities : dictionary of Security class objects by ticker
+    tickers : list of tickers (columns of the matrix)
+    dates : date index (rows of the matrix)
+    column : price column of the security data
+
+    Returns
+    =======
+    df : dataframe with one column per ticker
+
+    """
+
+    if len(tickers) == 0:
+        return pd.DataFrame(index=dates, columns=tickers, dtype=np.float64)
+
+    _series = []
+    for ticker in tickers:
+        _data = securities[ticker].data[column]
+        _series.append(_data.loc[~_data.index.duplicated(keep="last")])
+    _df = pd.concat(_series, axis=1, sort=True)
+    _df.columns = tickers
+
+    return _as_of(_df, dates).astype(np.float64)
+
+
+def quantity_panel(transactions, tickers, dates):
+    """
+    Build a dates x tickers matrix of held quantities from a transaction list,
+    missing before the first purchase of a ticker
+
+    Parameters
+    ==========
+    transactions : dataframe with columns Date, Transaction, Ticker and Quantity
+    tickers : list of tickers (columns of the matrix)
+    dates : date index (rows of the matrix)
+
+    Returns
+    =======
+    df : dataframe with one column per ticker
+
+    """
+
+    _df = transactions.loc[
+        transactions.Transaction.isin(("buy", "sell"))
+        & transactions.Ticker.isin(tickers)
+    ]
+    if len(_df) == 0:
+        return pd.DataFrame(index=dates, columns=tickers, dtype=np.float64)
+
+    _quantities = np.where(
+        _df.Transaction.values == "sell", -_df.Quantity.values, _df.Quantity.values
+    )
+    _df = (
+        pd.DataFrame(
+            {"Date": _df.Date.values, "Ticker": _df.Ticker.values, "Q": _quantities}
+        )
+        .groupby(by=["Date", "Ticker"])["Q"]
+        .sum()
+        .unstack("Ticker")
+        .cumsum()
+    )
+
+    return _as_of(_df.reindex(columns=tickers), dates).astype(np.float64)
+
+
+def cumulative_series(df, columns, dates):
+    """
+    Sum columns of a dataframe with a Date column per day, accumulate them over
+    time and forward fill them onto a date index
+    """
+    _df = df[["Date"] + columns].groupby(by="Date").sum().cumsum()
+
+    return _as_of(_df, dates)
+
+
+def value_panel(prices, quantities):
+    """
+    Value of each position per day as elementwise product of prices and quantities
+    """
+    return pd.DataFrame(
+        prices.values * quantities.values, index=prices.index, columns=prices.columns
+    )
+
+
+def period_bounds(index, freq="A"):
+    """
+    Find the first and last row of each period of a sorted date index
+
+    Parameters
+    ==========
+    index : sorted date index
+    freq : period frequency, "A" (years), "Q" (quarters) or "M" (months)
+
+    Returns
+    =======
+    periods : period of each group
+    first : position of the first row of each period
+    last : position of the last row of each period
+
+    """
+    _periods = index.to_period(freq)
+    _keys = _periods.asi8
+    first = np.flatnonzero(np.r_[True, _keys[1:] != _keys[:-1]])
+    last = np.r_[first[1:] - 1, len(_keys) - 1].astype(first.dtype)
+
+    return _periods[first], first, last
+
+
+def log_returns(df, previous=None):
+    """
+    Logarithmic day over day returns of each column
+
+    Parameters
+    ==========
+    df : dataframe of values
+    previous : row of values before the first row of df, the returns of the first
+        row are missing if not given
+
+    Returns
+    =======
+    df : dataframe of returns
+
+    """
+    if len(df) == 0:
+        return df.astype(np.float64)
+
+    _values = df.values.astype(np.float64)
+    _shifted = np.empty_like(_values)
+    _shifted[0] = np.nan if previous is None else previous
+    _shifted[1:] = _values[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        _returns = np.log(_values / _shifted)
+
+    return pd.DataFrame(_returns, index=df.index, columns=df.columns)
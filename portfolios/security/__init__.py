@@ -1 +1 @@
-__all__ = ["io", "security", "yqd"]
+__all__ = ["actions", "io", "registry", "security", "storage", "yqd"]
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+
+def _to_int64(dates):
+    return pd.DatetimeIndex(pd.to_datetime(dates)).asi8
+
+
+def split_ratios(splits):
+    """
+    Vectorized parsing of split strings in the format of Yahoo! (e.g. "2:1",
+    also "2/1"), invalid splits (e.g. division by zero) have ratio 1
+
+    Parameters
+    ==========
+    splits : array, list or series of split strings
+
+    Returns
+    =======
+    ratios : numpy array of floats
+
+    """
+
+    _splits = pd.Series(np.asarray(splits, dtype=object)).astype(str)
+    if len(_splits) == 0:
+        return np.array([], dtype=float)
+
+    _parts = _splits.str.split(r"[:/]", n=1, expand=True).reindex(columns=[0, 1])
+    _numerators = pd.to_numeric(_parts[0], errors="coerce").values.astype(float)
+    _denominators = pd.to_numeric(_parts[1], errors="coerce").values.astype(float)
+
+    _valid = (_denominators != 0) & ~np.isnan(_numerators) & ~np.isnan(_denominators)
+    if not _valid.all():
+        print("Split ratio invalid, division by zero")
+
+    return np.where(_valid, _numerators / np.where(_valid, _denominators, 1.0), 1.0)
+
+
+class CorporateActions(object):
+    """
+       Class that holds the split and dividend events of a security as sorted
+       event tables (dates as int64 nanoseconds) and derives adjustment
+       factors for any array of dates
+    """
+
+    def __init__(self):
+        self.split_dates, self.ratios = self._table(None, None, np.prod)
+        self.dividend_dates, self.amounts = self._table(None, None, np.sum)
+
+    @staticmethod
+    def _table(dates, values, combine):
+        """
+        Sorted event table with a single event per date
+        """
+        if dates is None or len(dates) == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=float)
+
+        _dates = _to_int64(dates)
+        _values = np.asarray(values)
+        _order = np.argsort(_dates, kind="mergesort")
+        _dates, _values = _dates[_order], _values[_order]
+
+        # events on the same date are combined
+        _unique, _first = np.unique(_dates, return_index=True)
+        if len(_unique) < len(_dates):
+            _values = np.array(
+                [combine(v) for v in np.split(_values, _first[1:])], dtype=_values.dtype
+            )
+
+        return _unique, _values
+
+    @classmethod
+    def from_yahoo(cls, dividends=None, splits=None):
+        """
+        Event tables from the dividend and split data of the Yahoo! Finance API
+        (see parse_yqd), with columns Dividends and Stock Splits
+        """
+        actions = cls()
+        if dividends is not None and len(dividends):
+            actions.dividend_dates, actions.amounts = cls._table(
+                dividends.index, dividends["Dividends"].values, np.sum
+            )
+        if splits is not None and len(splits):
+            actions.split_dates, actions.ratios = cls._table(
+                splits.index, split_ratios(splits["Stock Splits"]), np.prod
+            )
+
+        return actions
+
+    @classmethod
+    def from_data(cls, data):
+        """
+        Event tables recovered from price data with Dividends and Modifier
+        columns, e.g. stored data of a security
+        """
+        actions = cls()
+        _dates = data.index.values
+        if "Dividends" in data.columns:
+            _paid = data["Dividends"].values > 0
+            actions.dividend_dates, actions.amounts = cls._table(
+                _dates[_paid], data["Dividends"].values[_paid], np.sum
+            )
+        if "Modifier" in data.columns and len(data):
+            # modifiers hold the product of the ratios of splits on or after each
+            # date, a change between two rows is a split on the earlier date
+            _modifiers = data["Modifier"].values.astype(float)
+            _ratios = np.append(_modifiers[:-1] / _modifiers[1:], _modifiers[-1])
+            _split = ~np.isclose(_ratios, 1.0)
+            actions.split_dates, actions.ratios = cls._table(
+                _dates[_split], _ratios[_split], np.prod
+            )
+
+        return actions
+
+    def split_factors(self, dates):
+        """
+        Product of the ratios of all splits on or after each date, the
+        Modifier of Yahoo! data, 1 for dates after the last split
+        """
+        _after = np.append(np.cumprod(self.ratios[::-1])[::-1], 1.0)
+
+        return _after[np.searchsorted(self.split_dates, _to_int64(dates), side="left")]
+
+    def dividends(self, dates, dtype=None):
+        """
+        Dividend paid on each date, 0 for dates without dividend
+        """
+        _dates = _to_int64(dates)
+        _positions = np.searchsorted(self.dividend_dates, _dates, side="left")
+        _positions = np.minimum(_positions, len(self.dividend_dates) - 1)
+        _amounts = np.zeros(len(_dates), dtype=dtype or self.amounts.dtype)
+        if len(self.dividend_dates):
+            _paid = self.dividend_dates[_positions] == _dates
+            _amounts[_paid] = self.amounts[_positions[_paid]]
+
+        return _amounts
@@ -3,18 +3,20 @@
 import html
 import json
 import urllib.error
-import urllib.parse
-import urllib.request
+from io import BytesIO
 
 import numpy as np
 import pandas as pd
 
 from portfolios.security import yqd
+from portfolios.security.actions import CorporateActions, split_ratios
 from portfolios.utils.helpers import (
-    standard_date_format,
+    standard_date_array,
     todays_date,
     yahoo_date_format,
 )
+from portfolios.utils.metadata import get_metadata_cache
+from portfolios.utils.transport import get_transport
 
 
 def read_yahoo_csv(path=None, startdate="2000-01-01", enddate=None):
@@ -26,13 +28,13 @@ def read_yahoo_csv(path=None, startdate="2000-01-01", enddate=None):
     if enddate == None:
         enddate = todays_date()
 
-    # convert dates to pandas format
-    startdate = standard_date_format(startdate)
-    enddate = standard_date_format(enddate)
+    # convert dates to numpy format
+    startdate, enddate = standard_date_array([startdate, enddate])
 
     df = pd.read_csv(path, index_col="Date", parse_dates=True)
+    _days = df.index.values.astype("datetime64[D]")
 
-    return df.loc[(df.index >= startdate) & (df.index <= enddate)]
+    return df.loc[(_days >= startdate) & (_days <= enddate)]
 
 
 def call_yqd(ticker, startdate, enddate, info):
@@ -41,24 +43,34 @@ def call_yqd(ticker, startdate, enddate, info):
     """
 
     # Use load_yahoo_quote from yqd to request Yahoo! data
-    output = yqd.load_yahoo_quote(ticker, startdate, enddate, info)
+    return parse_yqd(yqd.load_yahoo_quote(ticker, startdate, enddate, info, raw=True))
 
-    # Break data into column headers, column data, and index
-    header = [sub.split(",") for sub in output[:1]]
-    columns = [column for column in header[0][1:]]
-    entries = [sub.split(",") for sub in output[1:]]
-    data = [data[1:] for data in entries]
-    indeces = [data[:1] for data in entries]
-    index = [index[0] for index in indeces]
 
-    # Turn into pandas dataframe
-    df = pd.DataFrame(data, columns=columns, index=index, dtype=np.float32)
-    df.replace("null", np.NaN, inplace=True)
+def parse_yqd(output):
+    """
+    Turn a Yahoo! Finance API response (bytes or list of lines) into a dataframe
+    indexed by date with float32 columns, null entries become NaN and columns
+    that are not numeric (e.g. stock splits) are kept as strings
+    """
 
-    # Convert index to datetime
-    df.index = pd.to_datetime(df.index)
+    if not isinstance(output, bytes):
+        output = "\n".join(output).encode("utf-8")
+
+    # parse the response in a single pass without intermediate python lists
+    try:
+        df = pd.read_csv(
+            BytesIO(output),
+            index_col=0,
+            parse_dates=[0],
+            na_values=["null"],
+            keep_default_na=False,
+        )
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame(index=pd.DatetimeIndex([]))
+    df.index.name = None
 
-    return df
+    _numeric = df.select_dtypes(include=[np.number]).columns
+    return df.astype({column: np.float32 for column in _numeric})
 
 
 def retrieve_yahoo_quote(ticker, startdate, enddate):
@@ -68,6 +80,10 @@ def retrieve_yahoo_quote(ticker, startdate, enddate):
 
     df = call_yqd(ticker=ticker, startdate=startdate, enddate=enddate, info="quote")
 
+    return _prepare_quote(df)
+
+
+def _prepare_quote(df):
     # Drop nulls
     col_list = ["Close", "Volume"]
     df = df.dropna(subset=col_list, how="any")
@@ -93,17 +109,13 @@ def retrieve_yahoo_splits(ticker, startdate, enddate):
     Downloads split data from Yahoo! Finance for a security.
     """
 
-    def get_split_ratio(split):
-        split = split.split(":")
-        if float(split[1]) != 0:
-            return float(split[0]) / float(split[1])
-        else:
-            print("Split ratio invalid, division by zero")
-            return 1.0
-
     df = call_yqd(ticker=ticker, startdate=startdate, enddate=enddate, info="split")
 
-    df["split_ratio"] = df.apply(lambda x: get_split_ratio(x["Stock Splits"]), axis=1)
+    return _prepare_splits(df)
+
+
+def _prepare_splits(df):
+    df = df.assign(split_ratio=split_ratios(df["Stock Splits"].values))
     df.sort_index(ascending=False, inplace=True)
     df["Modifier"] = df["split_ratio"].cumprod(axis=0)
 
@@ -122,48 +134,184 @@ def retrieve_yahoo_data(ticker=None, startdate="20000101", enddate=None):
     startdate = yahoo_date_format(startdate)
     enddate = yahoo_date_format(enddate)
 
-    df = retrieve_yahoo_quote(ticker=ticker, startdate=startdate, enddate=enddate)
-    df_dividend = retrieve_yahoo_dividends(
-        ticker=ticker, startdate=startdate, enddate=enddate
-    )
-    df_splits = retrieve_yahoo_splits(
-        ticker=ticker, startdate=startdate, enddate=enddate
+    # quotes, dividends and splits are requested in parallel
+    _outputs = yqd.load_yahoo_events(ticker, startdate, enddate, raw=True)
+    df = _prepare_quote(parse_yqd(_outputs["quote"]))
+    actions = CorporateActions.from_yahoo(
+        dividends=parse_yqd(_outputs["dividend"]), splits=parse_yqd(_outputs["split"])
     )
 
-    df = df.join(df_dividend, how="left").fillna(0.0)
-    df = df.join(df_splits["Modifier"], how="left").fillna(method="bfill").fillna(1.0)
+    # dividends on each date and the split modifiers of all later splits
+    df["Dividends"] = actions.dividends(df.index, dtype=np.float32)
+    df = df.fillna(0.0)
+    df["Modifier"] = actions.split_factors(df.index)
 
     return df
 
 
+# columns of Yahoo! data that hold split adjusted prices
+ADJUSTED_PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Dividends"]
+
+
+def _ratio(df, other, date, column):
+    """
+    Ratio of the values of column in df and other on date, 1 if a value is
+    missing and exactly 1 within the precision of stored prices
+    """
+    if column not in df.columns or column not in other.columns:
+        return 1.0
+    _ratio = float(df.at[date, column]) / float(other.at[date, column])
+    if not np.isfinite(_ratio) or np.isclose(_ratio, 1.0, rtol=1e-6, atol=0.0):
+        return 1.0
+
+    return _ratio
+
+
+def yahoo_adjustments(df, other):
+    """
+    Factors that rescale data downloaded earlier (df) to data downloaded now
+    (other), from the last date that both contain
+
+    Yahoo! adjusts the prices of a download for all splits up to the time of
+    the download, and the adjusted closes also for all dividends, whatever
+    dates are requested, the modifiers only hold the splits of the requested
+    dates, so data downloaded at different times differs by these factors
+
+    Returns
+    =======
+    price : factor dividing the prices and dividends, multiplying the volumes
+    adjusted : factor dividing the adjusted closes
+    modifier : factor multiplying the modifiers
+
+    """
+
+    if other is None or len(other) == 0 or len(df) == 0:
+        return 1.0, 1.0, 1.0
+
+    _shared = df.index.intersection(other.index)
+    if len(_shared) == 0:
+        print("No common date to rescale the data")
+        return 1.0, 1.0, 1.0
+    _date = _shared[-1]
+
+    return (
+        _ratio(df, other, _date, "Close"),
+        _ratio(df, other, _date, "Adj Close"),
+        _ratio(other, df, _date, "Modifier"),
+    )
+
+
+def merge_yahoo_data(df, head=None, tail=None):
+    """
+    Merge Yahoo! data downloaded for dates before (head) and after (tail) the
+    dates of df, head and tail include the first and last date of df
+    respectively, the data of df is rescaled to the later downloads (see
+    yahoo_adjustments)
+
+    Parameters
+    ==========
+    df : dataframe with data from Yahoo! Finance (e.g. read from storage)
+    head : dataframe with data up to the first date of df, or None
+    tail : dataframe with data from the last date of df, or None
+
+    Returns
+    =======
+    df : merged dataframe with the columns of df
+    adjustments : factors price, adjusted and modifier df was rescaled with
+
+    """
+
+    _columns = df.columns
+    df = df.copy()
+    _head = head is not None and len(head) > 0 and len(df) > 0
+    _tail = tail is not None and len(tail) > 0 and len(df) > 0
+
+    # prices are rescaled to the tail if there is one, modifiers only gain
+    # the splits after the last date of df
+    price, adjusted, modifier = yahoo_adjustments(df, tail)
+    if _head and not _tail:
+        price, adjusted, _ = yahoo_adjustments(df, head)
+
+    if price != 1.0:
+        for column in ADJUSTED_PRICE_COLUMNS:
+            if column in _columns:
+                df[column] = df[column] / price
+        if "Volume" in _columns:
+            df["Volume"] = (df["Volume"] * price).round().astype(df["Volume"].dtype)
+    if adjusted != 1.0 and "Adj Close" in _columns:
+        df["Adj Close"] = df["Adj Close"] / adjusted
+    if modifier != 1.0 and "Modifier" in _columns:
+        df["Modifier"] = df["Modifier"] * modifier
+
+    if _head:
+        # modifiers of the head only include the splits up to the first date
+        # of df, whose modifier holds the splits from then on
+        _first = df.index[0]
+        _splits = 1.0
+        if "Modifier" in _columns and _first in head.index:
+            _splits = float(head.at[_first, "Modifier"])
+        head = head.loc[head.index < _first].copy()
+        if "Modifier" in _columns:
+            head["Modifier"] = head["Modifier"] * (df["Modifier"].values[0] / _splits)
+    if _tail:
+        tail = tail.loc[tail.index > df.index[-1]]
+
+    _parts = [part for part in [head, df, tail] if part is not None and len(part)]
+    if not _parts:
+        return df, (price, adjusted, modifier)
+
+    return pd.concat(_parts)[_columns], (price, adjusted, modifier)
+
+
+# company names are cached for NAME_TTL seconds, tickers without a name
+# (or unknown to Yahoo!) for NAME_MISSING_TTL seconds
+NAME_TTL = 30 * 24 * 3600
+NAME_MISSING_TTL = 24 * 3600
+
+
 def get_company_name(ticker=""):
     """
-       Takes a ticker symbol and queries Yahoo! Finance for metadata
+       Takes a ticker symbol and queries Yahoo! Finance for metadata,
+       unless the metadata cache has the name
     """
     if ticker:
 
+        cache = get_metadata_cache()
+        _key = "yahoo.name.{}".format(ticker)
+        try:
+            name = cache.get(_key)
+            # default to ticker symbol
+            return ticker if name is None else name
+        except KeyError:
+            pass
+
         # Headers to fake a user agent
         _headers = {
             "User-Agent": "Mozilla/5.0 (X11; U; Linux i686) Gecko/20071127 Firefox/2.0.0.11"
         }
 
-        # use request to retrieve data
-        req = urllib.request.Request(
-            "https://query2.finance.yahoo.com/v7/finance/options/{}".format(ticker),
-            headers=_headers,
-        )
-        f = urllib.request.urlopen(req)
-        alines = f.read().decode("utf-8")
+        # use the transport of yqd to retrieve data
+        url = "https://query2.finance.yahoo.com/v7/finance/options/{}".format(ticker)
+        try:
+            alines = get_transport().get(url, headers=_headers).decode("utf-8")
+        except urllib.error.HTTPError:
+            # unknown tickers are answered with an error
+            cache.set(_key, None, NAME_MISSING_TTL)
+            raise
 
         # read json
         j = json.loads(alines)
         try:
             # return shortName variable
-            return html.unescape(j["optionChain"]["result"][0]["quote"]["longName"])
+            name = html.unescape(j["optionChain"]["result"][0]["quote"]["longName"])
 
         except:
             # default to ticker symbol
+            cache.set(_key, None, NAME_MISSING_TTL)
             return ticker
+
+        cache.set(_key, name, NAME_TTL)
+        return name
     else:
         print("Ticker symbol not specified")
         return ""
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from portfolios.utils.helpers import last_trading_day, standard_date_format, todays_date
+from portfolios.utils.throttle import RateLimiter
+
+
+def _date_range(start=None, end=None):
+    """
+    Normalize a date range the same way as Security does
+    """
+    if start is None:
+        start = "2000-01-01"
+    if end is None:
+        end = todays_date()
+
+    return (
+        standard_date_format(last_trading_day(start)),
+        standard_date_format(last_trading_day(end)),
+    )
+
+
+class SecurityRegistry(object):
+    """
+       Class that shares loaded securities by ticker within a process
+
+       Securities handed out are shared and must be treated as read-only,
+       a request for a range that is not covered yet loads the security again
+       for the union of both ranges, concurrent requests for the same ticker
+       wait for a single load
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.securities = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, ticker):
+        return ticker in self.securities
+
+    def __len__(self):
+        return len(self.securities)
+
+    def _covers(self, security, start, end):
+        return security.start <= start and security.end >= end
+
+    def get(self, ticker, start=None, end=None):
+        """
+        Return the shared security of a ticker covering at least start to end
+        """
+        return self._get(ticker, *_date_range(start, end))
+
+    def _get(self, ticker, start, end):
+        while True:
+            with self._lock:
+                security = self.securities.get(ticker)
+                if security is not None and self._covers(security, start, end):
+                    return security
+                loading = self._loading.get(ticker)
+                if loading is None:
+                    loading = threading.Event()
+                    self._loading[ticker] = loading
+                    if security is not None:
+                        start = min(start, security.start)
+                        end = max(end, security.end)
+                    break
+
+            # another thread loads the ticker, check its result afterwards
+            loading.wait()
+
+        try:
+            security = self.factory(ticker, start=start, end=end)
+            with self._lock:
+                self.securities[ticker] = security
+        finally:
+            with self._lock:
+                del self._loading[ticker]
+            loading.set()
+
+        return security
+
+    def prefetch(self, tickers, start=None, end=None, workers=8, rate=None):
+        """
+        Load the securities of many tickers concurrently, afterwards get returns
+        them without loading
+
+        Parameters
+        ==========
+        tickers : list of tickers, or dict of ticker to start date
+        start : start date of tickers given as list
+        end : end date of all tickers
+        workers : maximum number of securities loaded at the same time
+        rate : maximum number of securities loaded per second, None for no limit
+
+        Returns
+        =======
+        failed : dict of ticker to the exception raised while loading it
+
+        """
+
+        if not isinstance(tickers, dict):
+            tickers = {ticker: start for ticker in tickers}
+        limiter = None if rate is None else RateLimiter(rate)
+
+        def _load(ticker, start):
+            if limiter is not None:
+                limiter.wait()
+            self._get(ticker, *_date_range(start, end))
+
+        failed = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                ticker: executor.submit(_load, ticker, start)
+                for ticker, start in tickers.items()
+            }
+            for ticker, future in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    failed[ticker] = e
+
+        return failed
+
+    def view(self, ticker, start=None, end=None):
+        """
+        Return a separate security restricted to start to end, it shares nothing
+        with the registry and may be modified (e.g. returns added to data)
+        """
+        start, end = _date_range(start, end)
+        security = self._get(ticker, start, end)
+        data = security.data.loc[
+            (security.data.index >= start) & (security.data.index <= end)
+        ].copy()
+
+        return security.from_data(
+            ticker, data, description=security.name, start=start, end=end
+        )
+
+    def clear(self):
+        with self._lock:
+            self.securities.clear()
@@ -1,14 +1,36 @@
 # -*- coding: utf-8 -*-
 
 from datetime import datetime as dt
-from os import path
 
+import numpy as np
 import pandas as pd
 
 from portfolios import Asset
-from portfolios.security.io import get_company_name, read_yahoo_csv, retrieve_yahoo_data
+from portfolios.security.actions import CorporateActions
+from portfolios.security.io import (
+    get_company_name,
+    merge_yahoo_data,
+    retrieve_yahoo_data,
+)
+from portfolios.security.registry import SecurityRegistry
+from portfolios.security.storage import get_storage
 from portfolios.stats.basics import returns_column
-from portfolios.utils.helpers import last_trading_day, standard_date_format, todays_date
+from portfolios.utils.helpers import (
+    last_trading_day,
+    standard_date_array,
+    standard_date_format,
+    todays_date,
+)
+
+# descriptive statistics of a price column, computed on first access
+_STATISTICS = {
+    "last": lambda prices: prices[-1],
+    "max": lambda prices: prices.max(),
+    "min": lambda prices: prices.min(),
+    "median": lambda prices: prices.median(),
+    "mean": lambda prices: prices.mean(),
+    "std": lambda prices: prices.std(),
+}
 
 
 class Security(Asset):
@@ -16,7 +38,10 @@ class Security(Asset):
        Class that holds a single security and some useful functions
     """
 
-    def __init__(self, name, start=None, end=None):
+    def __init__(self, name, start=None, end=None, lazy=False):
+        self._data = None
+        self._statistics = {}
+        self._actions = None
         super().__init__(name)
         if start is None:
             self.start = standard_date_format(last_trading_day("2000-01-01"))
@@ -27,30 +52,115 @@ class Security(Asset):
         else:
             self.end = standard_date_format(last_trading_day(end))
         self.ticker = name
-        self.set_name(name)
-        self.load(start=self.start, end=self.end)
-        self.get_last_price()
-        self.get_max_price()
-        self.get_min_price()
-        self.get_median_price()
-        self.get_mean_price()
-        self.get_std_price()
         self.dividends = 0.0
         self.benchmark_ticker = "sp500"
         self.benchmark = None
 
+        # lazy securities resolve their name and load data on first access
+        if not lazy:
+            self.name
+            self.load(start=self.start, end=self.end)
+
+    @classmethod
+    def from_data(cls, name, data, description=None, start=None, end=None):
+        """
+        Create a security from price data that is already loaded,
+        neither files nor Yahoo! are accessed
+        """
+        security = cls.__new__(cls)
+        security.ticker = name
+        security.name = name if description is None else description
+        security.data = data
+        if start is None:
+            start = data.index.min()
+        if end is None:
+            end = data.index.max()
+        security.start = standard_date_format(start)
+        security.end = standard_date_format(end)
+        security.dividends = 0.0
+        security.benchmark_ticker = "sp500"
+        security.benchmark = None
+
+        return security
+
     def set_name(self, name):
+        # the company name is looked up on first access
+        self._name = None
+        self._name_lookup = name
+
+    @property
+    def name(self):
+        if self._name is None:
+            try:
+                self._name = get_company_name(ticker=self._name_lookup)
+            except:
+                self._name = self._name_lookup
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        self._name = name
+
+    @property
+    def data(self):
+        if self._data is None:
+            self.load(start=self.start, end=self.end)
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        # statistics and events are computed again for new data
+        self._data = data
+        self._statistics = {}
+        self._actions = None
+
+    @property
+    def actions(self):
+        """
+        Split and dividend events of the data (see CorporateActions)
+        """
+        if self._actions is None:
+            self._actions = CorporateActions.from_data(self.data)
+        return self._actions
+
+    def _statistic(self, statistic, column="Close"):
         try:
-            self.name = get_company_name(ticker=name)
-        except:
-            self.name = name
+            return self._statistics[(statistic, column)]
+        except KeyError:
+            value = _STATISTICS[statistic](self.data[column])
+            self._statistics[(statistic, column)] = value
+            return value
+
+    @property
+    def last_price(self):
+        return self.get_last_price()
+
+    @property
+    def max_price(self):
+        return self.get_max_price()
+
+    @property
+    def min_price(self):
+        return self.get_min_price()
+
+    @property
+    def median_price(self):
+        return self.get_median_price()
+
+    @property
+    def mean_price(self):
+        return self.get_mean_price()
+
+    @property
+    def std_price(self):
+        return self.get_std_price()
 
     def load(self, datadir="../data/", start=None, end=None):
         """
-        Tries to load from csv first, then pulls from Yahoo!
+        Tries to load from storage first, then pulls from Yahoo!
         """
-        filepath = "{0}{1}.csv".format(datadir, self.ticker)
-        print("Checking {}".format(filepath))
+        storage = get_storage(datadir)
+        print("Checking {}".format(storage.path(self.ticker)))
 
         if start is None:
             start = self.start
@@ -61,29 +171,37 @@ class Security(Asset):
         else:
             end = standard_date_format(last_trading_day(end))
 
-        if path.isfile(filepath):
-            self.data = read_yahoo_csv(path=filepath)
-            csv_start = standard_date_format(self.data.index.min())
-            csv_end = standard_date_format(self.data.index.max())
-            if (pd.to_datetime(csv_end) < pd.to_datetime(end)) | (
-                pd.to_datetime(csv_start) > pd.to_datetime(start)
+        if storage.exists(self.ticker):
+            stored_start, stored_end = storage.date_range(self.ticker)
+            stored_start = standard_date_format(stored_start)
+            stored_end = standard_date_format(stored_end)
+            if (pd.to_datetime(stored_end) < pd.to_datetime(end)) | (
+                pd.to_datetime(stored_start) > pd.to_datetime(start)
             ):
                 _refresh_success = self.refresh(
-                    datadir=datadir, start=min(start, csv_start), end=max(end, csv_end)
+                    datadir=datadir,
+                    start=min(start, stored_start),
+                    end=max(end, stored_end),
                 )
+                if _refresh_success:
+                    # the refreshed data is restricted instead of read again
+                    _days = self.data.index.values.astype("datetime64[D]")
+                    _start, _end = standard_date_array([start, end])
+                    self.data = self.data.loc[(_days >= _start) & (_days <= _end)]
+                else:
+                    self.data = storage.read(self.ticker)
             else:
-                _refresh_success = 1
-            if _refresh_success:
-                self.data = read_yahoo_csv(path=filepath, startdate=start, enddate=end)
+                self.data = storage.read(self.ticker, start=start, end=end)
         else:
             self.data = retrieve_yahoo_data(
                 ticker=self.ticker, startdate=start, enddate=end
             )
-            self.save(filename="{}.csv".format(self.ticker), datadir=datadir)
+            self.save(datadir=datadir)
 
     def refresh(self, datadir="../data/", start=None, end=None):
         """
-        Tries to load from csv first, then pulls from Yahoo!
+        Pulls the dates from Yahoo! that are not stored yet and merges them
+        into the stored data, rows after the stored dates are appended
         """
 
         if start is None:
@@ -95,50 +213,152 @@ class Security(Asset):
         else:
             end = standard_date_format(last_trading_day(end))
 
+        storage = get_storage(datadir)
         try:
-            self.data = retrieve_yahoo_data(
-                ticker=self.ticker, startdate=start, enddate=end
+            if not storage.exists(self.ticker):
+                self.data = retrieve_yahoo_data(
+                    ticker=self.ticker, startdate=start, enddate=end
+                )
+                self.save(datadir=datadir)
+                return 1
+
+            stored = storage.read(self.ticker)
+            stored_start, stored_end = stored.index.min(), stored.index.max()
+            head = None
+            tail = None
+            # the downloads include a stored date to compare the adjustments
+            if pd.to_datetime(start) < stored_start:
+                head = retrieve_yahoo_data(
+                    ticker=self.ticker, startdate=start, enddate=stored_start
+                )
+            if pd.to_datetime(end) > stored_end:
+                tail = retrieve_yahoo_data(
+                    ticker=self.ticker, startdate=stored_end, enddate=end
+                )
+            data, (price, adjusted, modifier) = merge_yahoo_data(
+                stored, head=head, tail=tail
             )
-            self.save(filename="{}.csv".format(self.ticker), datadir=datadir)
+
+            # stored rows only change for earlier dates or new splits and
+            # dividends, adjusted closes of dividends are rescaled in place
+            # where storage supports it
+            self.data = data
+            _earlier = len(data) > 0 and data.index[0] < stored_start
+            _rescale = adjusted == 1.0 or hasattr(storage, "rescale")
+            if not _earlier and price == 1.0 and modifier == 1.0 and _rescale:
+                if adjusted != 1.0:
+                    print("Rescaling {}".format(storage.path(self.ticker)))
+                    storage.rescale(self.ticker, "Adj Close", adjusted)
+                if len(data) > len(stored):
+                    print("Appending {}".format(storage.path(self.ticker)))
+                    storage.append(self.ticker, data.iloc[len(stored) :])
+            else:
+                self.save(datadir=datadir)
             return 1
         except:
             print("Refresh failed")
             return 0
 
+    def save(self, filename=None, datadir="../data/"):
+        """
+        Saves data to the storage of datadir
+        """
+        storage = get_storage(datadir)
+        try:
+            print("Saving {}".format(storage.path(self.ticker)))
+            storage.write(self.ticker, self.data)
+            return 1
+        except:
+            print("Saving data failed")
+            return 0
+
     def get_last_price(self, column="Close"):
-        self.last_price = self.data[column][-1]
-        return self.last_price
+        return self._statistic("last", column)
 
     def get_max_price(self, column="Close"):
-        self.max_price = self.data[column].max()
-        return self.max_price
+        return self._statistic("max", column)
 
     def get_min_price(self, column="Close"):
-        self.min_price = self.data[column].min()
-        return self.min_price
+        return self._statistic("min", column)
 
     def get_median_price(self, column="Close"):
-        self.median_price = self.data[column].median()
-        return self.median_price
+        return self._statistic("median", column)
 
     def get_mean_price(self, column="Close"):
-        self.mean_price = self.data[column].mean()
-        return self.mean_price
+        return self._statistic("mean", column)
 
     def get_std_price(self, column="Close"):
-        self.std_price = self.data[column].std()
-        return self.std_price
+        return self._statistic("std", column)
+
+    def _as_of(self, dates):
+        """
+        Positions of the last rows of data on or before each date (int64
+        nanoseconds), -1 for dates before the first row
+        """
+        try:
+            _index, _order = self._statistics["index"]
+        except KeyError:
+            _index = self.data.index.values.astype("datetime64[ns]").view(np.int64)
+            _order = None
+            if len(_index) and not (np.diff(_index) >= 0).all():
+                _order = np.argsort(_index, kind="mergesort")
+                _index = _index[_order]
+            self._statistics["index"] = (_index, _order)
+
+        _positions = np.searchsorted(_index, dates, side="right") - 1
+        if _order is not None:
+            _positions = np.where(_positions < 0, -1, _order[_positions])
+
+        return _positions
 
     def get_price_at(self, date, column="Close"):
-        date = last_trading_day(date)
-        return self.data.loc[self.data.index == date, column].values[0]
+        """
+        Price on the last trading day with data on or before date
+        """
+        _position = self._as_of(pd.Timestamp(date).value)
+        if _position < 0:
+            raise IndexError(
+                "No price of {0} on or before {1}".format(self.ticker, date)
+            )
+
+        return self.data[column].values[_position]
 
     def modify_quantity(self, date, quantity):
-        date = last_trading_day(date)
-        try:
-            return quantity * self.data.loc[self.data.index == date, "Modifier"].values[0], self.data.loc[self.data.index == date, "Modifier"].values[0]
-        except:
-            return quantity, 1.0
+        """
+        Adjust a quantity for subsequent stock splits with the modifier
+        of the last trading day on or before date
+        """
+        _quantities, _modifiers = self.modify_quantities([date], [quantity])
+
+        return _quantities[0], _modifiers[0]
+
+    def get_prices_at(self, dates, column="Close"):
+        """
+        Vectorized get_price_at, returns nan for dates before the first row of data
+        """
+        _positions = self._as_of(pd.DatetimeIndex(pd.to_datetime(dates)).asi8)
+        _prices = self.data[column].values[_positions].astype(float)
+        _prices[_positions < 0] = np.nan
+
+        return _prices
+
+    def modify_quantities(self, dates, quantities):
+        """
+        Vectorized modify_quantity, the modifiers are the split factors of the
+        corporate actions (see CorporateActions), 1 for dates before the first
+        row of data or without modifiers
+        """
+        _modifiers = np.ones(len(quantities))
+        if "Modifier" in self.data.columns:
+            # splits are dated on trading days, dates between trading days
+            # take the splits of the last trading day before them
+            _positions = self._as_of(pd.DatetimeIndex(pd.to_datetime(dates)).asi8)
+            _found = _positions >= 0
+            _modifiers[_found] = self.actions.split_factors(
+                self.data.index.values[_positions[_found]]
+            )
+
+        return np.asarray(quantities, dtype=float) * _modifiers, _modifiers
 
     def dividend(self, currency, price, quantity):
         self.dividends = self.dividends + price * quantity
@@ -158,8 +378,10 @@ class Security(Asset):
         else:
             _ticker = "^GSPC"  # S&P 500 as default
 
-        # create security class object for benchmark ticker
-        _benchmark = Security(_ticker, start=self.min_date, end=self.max_date)
+        # separate copy of the shared benchmark security, its data is modified below
+        _benchmark = shared_securities.view(
+            _ticker, start=self.min_date, end=self.max_date
+        )
 
         # calculate returns for the benchmark
         _benchmark.data, _ = returns_column(
@@ -167,3 +389,7 @@ class Security(Asset):
         )
 
         self.benchmark = _benchmark
+
+
+# securities shared by all portfolios of the process
+shared_securities = SecurityRegistry(Security)
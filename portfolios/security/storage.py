@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import os
+import shutil
+from contextlib import ExitStack
+from os import path
+
+import numpy as np
+import pandas as pd
+
+from portfolios.security.io import read_yahoo_csv
+from portfolios.utils.helpers import standard_date_array
+
+# file listing the stored columns of a ticker, written last
+_COLUMNS_FILE = "columns.json"
+
+
+def _load_array(filepath):
+    """
+    Memory map a stored array, empty arrays cannot be mapped and are read
+    """
+    try:
+        return np.load(filepath, mmap_mode="r")
+    except ValueError:
+        return np.load(filepath)
+
+
+def _append_header(f, rows, values):
+    """
+    Header of a stored array extended by values after its first rows, None if
+    the values cannot be stored in place (other type or header size)
+    """
+    _version = np.lib.format.read_magic(f)
+    if _version == (1, 0):
+        _shape, _fortran, _dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        _shape, _fortran, _dtype = np.lib.format.read_array_header_2_0(f)
+    if not np.can_cast(values.dtype, _dtype, casting="safe"):
+        return None
+
+    _header = io.BytesIO()
+    _fields = {
+        "descr": np.lib.format.dtype_to_descr(_dtype),
+        "fortran_order": _fortran,
+        "shape": (rows + len(values),),
+    }
+    if _version == (1, 0):
+        np.lib.format.write_array_header_1_0(_header, _fields)
+    else:
+        np.lib.format.write_array_header_2_0(_header, _fields)
+    if len(_header.getvalue()) != f.tell():
+        return None
+
+    return _header.getvalue(), f.tell() + rows * _dtype.itemsize, _dtype
+
+
+class CSVStorage(object):
+    """
+       Class that stores the price data of each ticker as csv file in datadir
+    """
+
+    def __init__(self, datadir="../data/"):
+        self.datadir = datadir
+
+    def path(self, ticker):
+        return "{0}{1}.csv".format(self.datadir, ticker)
+
+    def exists(self, ticker):
+        return path.isfile(self.path(ticker))
+
+    def date_range(self, ticker):
+        """
+        First and last date stored for a ticker
+        """
+        _dates = pd.read_csv(self.path(ticker), usecols=["Date"], parse_dates=["Date"])
+
+        return _dates["Date"].min(), _dates["Date"].max()
+
+    def read(self, ticker, start=None, end=None):
+        """
+        Price data of a ticker between start and end (both included)
+        """
+        if start is None and end is None:
+            return pd.read_csv(self.path(ticker), index_col="Date", parse_dates=True)
+
+        return read_yahoo_csv(
+            path=self.path(ticker),
+            startdate="1900-01-01" if start is None else start,
+            enddate="2100-01-01" if end is None else end,
+        )
+
+    def write(self, ticker, df):
+        df.to_csv(self.path(ticker), header=True, index=True, index_label="Date")
+
+    def append(self, ticker, df):
+        """
+        Append rows for dates after the last stored date
+        """
+        _columns = pd.read_csv(self.path(ticker), index_col="Date", nrows=0).columns
+        df[_columns].to_csv(self.path(ticker), mode="a", header=False, index=True)
+
+
+class NpyStorage(object):
+    """
+       Class that stores the price data of each ticker as directory of numpy
+       files (one per column plus the dates) in datadir, the files are memory
+       mapped so that a date range is read without loading the whole history
+
+       Tickers that are only stored as csv file are converted on first access
+    """
+
+    def __init__(self, datadir="../data/"):
+        self.datadir = datadir
+        self.csv = CSVStorage(datadir)
+
+    def path(self, ticker):
+        return "{0}{1}/".format(self.datadir, ticker)
+
+    def _file(self, ticker, name):
+        return "{0}{1}.npy".format(self.path(ticker), name)
+
+    def _stored(self, ticker):
+        return path.isfile(self.path(ticker) + _COLUMNS_FILE)
+
+    def exists(self, ticker):
+        return self._stored(ticker) or self.csv.exists(ticker)
+
+    def _migrate(self, ticker):
+        if not self._stored(ticker):
+            print("Converting {}".format(self.csv.path(ticker)))
+            self.write(ticker, self.csv.read(ticker))
+
+    def _columns(self, ticker):
+        with open(self.path(ticker) + _COLUMNS_FILE) as f:
+            return json.load(f)
+
+    def _index(self, ticker):
+        self._migrate(ticker)
+        return _load_array(self._file(ticker, "index"))
+
+    def date_range(self, ticker):
+        """
+        First and last date stored for a ticker
+        """
+        _index = self._index(ticker)
+
+        return pd.Timestamp(_index[0]), pd.Timestamp(_index[-1])
+
+    def read(self, ticker, start=None, end=None):
+        """
+        Price data of a ticker between start and end (both included),
+        only the rows of the range are read from disk
+        """
+        _index = self._index(ticker)
+
+        # positions of the range in the sorted dates
+        _first, _last = 0, len(_index)
+        if start is not None:
+            _start = standard_date_array([start])[0].astype("datetime64[ns]")
+            _first = np.searchsorted(_index, _start, side="left")
+        if end is not None:
+            _end = standard_date_array([end])[0] + np.timedelta64(1, "D")
+            _last = np.searchsorted(_index, _end.astype("datetime64[ns]"), side="left")
+
+        _columns = self._columns(ticker)
+        df = pd.DataFrame(
+            {
+                column: np.array(_load_array(self._file(ticker, i))[_first:_last])
+                for i, column in enumerate(_columns)
+            },
+            index=pd.DatetimeIndex(np.array(_index[_first:_last]), name="Date"),
+            columns=_columns,
+        )
+
+        return df
+
+    def write(self, ticker, df):
+        """
+        Replace the stored data of a ticker, the files are written to a new
+        directory first so that readers never see a partial write
+        """
+        df = df.sort_index(kind="mergesort")
+        _target = self.path(ticker).rstrip("/")
+        _temporary = "{0}.{1}.tmp".format(_target, os.getpid())
+        if path.isdir(_temporary):
+            shutil.rmtree(_temporary)
+        os.makedirs(_temporary)
+
+        np.save(
+            "{}/index.npy".format(_temporary),
+            df.index.values.astype("datetime64[ns]"),
+        )
+        for i, column in enumerate(df.columns):
+            _values = df[column].values
+            if _values.dtype == object:
+                _values = _values.astype(str)
+            np.save("{0}/{1}.npy".format(_temporary, i), _values)
+        with open("{0}/{1}".format(_temporary, _COLUMNS_FILE), "w") as f:
+            json.dump([str(column) for column in df.columns], f)
+
+        # swap the directories, the old one is removed afterwards
+        _previous = "{0}.{1}.old".format(_target, os.getpid())
+        if path.isdir(_target):
+            os.rename(_target, _previous)
+        os.rename(_temporary, _target)
+        if path.isdir(_previous):
+            shutil.rmtree(_previous)
+
+    def append(self, ticker, df):
+        """
+        Append rows for dates after the last stored date, the stored arrays are
+        extended in place (the dates last) and only rewritten when the new
+        values do not fit their types
+        """
+        _index = self._index(ticker)
+        _rows = len(_index)
+        _last = _index[-1] if _rows else None
+        del _index
+        _columns = self._columns(ticker)
+
+        _dates = df.index.values.astype("datetime64[ns]")
+        if [str(column) for column in df.columns] != _columns:
+            raise ValueError("Columns do not match the stored columns")
+        if _last is not None and len(_dates) and _dates.min() <= _last:
+            raise ValueError("Appended dates must follow the stored dates")
+
+        _arrays = [
+            (self._file(ticker, i), df[column].values)
+            for i, column in enumerate(_columns)
+        ]
+        _arrays.append((self._file(ticker, "index"), _dates))
+
+        with ExitStack() as stack:
+            _files = [stack.enter_context(open(f, "r+b")) for f, _ in _arrays]
+            _appends = [
+                _append_header(f, _rows, values)
+                for f, (_, values) in zip(_files, _arrays)
+            ]
+            if None not in _appends:
+                # the dates are extended last, readers see the previous rows until then
+                for f, (_, values), (header, offset, dtype) in zip(
+                    _files, _arrays, _appends
+                ):
+                    f.seek(offset)
+                    f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+                    f.truncate()
+                    f.seek(0)
+                    f.write(header)
+                return
+
+        self.write(ticker, pd.concat([self.read(ticker), df]))
+
+    def rescale(self, ticker, column, factor):
+        """
+        Divide the stored values of a column by factor in place, e.g. the
+        adjusted closes after a new dividend
+        """
+        self._migrate(ticker)
+        _file = self._file(ticker, self._columns(ticker).index(column))
+        try:
+            _values = np.load(_file, mmap_mode="r+")
+        except ValueError:
+            # empty arrays cannot be mapped and have nothing to rescale
+            return
+        np.divide(_values, factor, out=_values, casting="unsafe")
+        _values.flush()
+        del _values
+
+
+STORAGE_BACKENDS = {"csv": CSVStorage, "npy": NpyStorage}
+
+_storage = {"backend": "csv"}
+
+
+def set_storage_backend(backend):
+    """
+    Select the storage backend used by securities, one of STORAGE_BACKENDS,
+    csv files by default
+
+    With "npy" tickers stored as csv file are converted on first access (or
+    all at once with migrate_csv), the csv files are kept but no longer
+    updated, set_storage_backend("csv") returns to them
+    """
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError("Storage backend {} is not supported".format(backend))
+    _storage["backend"] = backend
+
+
+def get_storage(datadir="../data/"):
+    return STORAGE_BACKENDS[_storage["backend"]](datadir)
+
+
+def migrate_csv(datadir="../data/", tickers=None):
+    """
+    Convert stored csv files of securities to the selected storage backend,
+    by default all csv files in datadir with Yahoo! price data
+
+    Returns
+    =======
+    tickers : list of converted tickers
+
+    """
+    storage = get_storage(datadir)
+    legacy = CSVStorage(datadir)
+
+    if tickers is None:
+        tickers = []
+        for filename in sorted(os.listdir(datadir)):
+            if not filename.endswith(".csv"):
+                continue
+            with open(path.join(datadir, filename)) as f:
+                _header = f.readline().strip().split(",")
+            if _header[0] == "Date" and "Close" in _header:
+                tickers.append(filename[: -len(".csv")])
+
+    converted = []
+    for ticker in tickers:
+        if legacy.exists(ticker):
+            storage.write(ticker, legacy.read(ticker))
+            converted.append(ticker)
+
+    return converted
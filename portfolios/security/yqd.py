@@ -12,15 +12,14 @@ Created on Thu May 18 22:58:12 2017
 # To make print working for Python2/3
 from __future__ import print_function
 
+import threading
 import time
 import urllib.error
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 
-# Use six to import urllib so it is working for Python2/3
-# from six.moves import urllib
-# If you don't want to use six, please comment out the line above
-# and use the line below instead (for Python3 only).
-import urllib.request
+from portfolios.utils.metadata import get_metadata_cache
+from portfolios.utils.transport import get_transport
 
 """
 Starting on May 2017, Yahoo financial has terminated its service on
@@ -31,14 +30,15 @@ These download links uses a "crumb" for authentication with a cookie "B".
 This code is provided to obtain such matching cookie and crumb.
 """
 
-# Build the cookie handler
-cookier = urllib.request.HTTPCookieProcessor()
-opener = urllib.request.build_opener(cookier)
-urllib.request.install_opener(opener)
+# Requests go through the transport of portfolios.utils.transport, which keeps
+# connections alive and handles the cookie (see set_transport for stand-ins)
 
-# Cookie and corresponding crumb
+# Cookie and corresponding crumb, kept in the metadata cache for CRUMB_TTL seconds
 _cookie = None
 _crumb = None
+_crumb_lock = threading.Lock()
+CRUMB_KEY = "yahoo.crumb"
+CRUMB_TTL = 24 * 3600
 
 # Headers to fake a user agent
 _headers = {
@@ -52,11 +52,10 @@ def _get_cookie_crumb():
    """
 
     # Perform a Yahoo financial lookup on SP500
-    req = urllib.request.Request(
+    transport = get_transport()
+    alines = transport.get(
         "https://finance.yahoo.com/quote/^GSPC", headers=_headers
-    )
-    f = urllib.request.urlopen(req)
-    alines = f.read().decode("utf-8")
+    ).decode("utf-8")
 
     # Extract the crumb from the response
     global _crumb
@@ -68,29 +67,52 @@ def _get_cookie_crumb():
     crumb = alines[q1 + 1 : q2]
     _crumb = crumb
 
-    # Extract the cookie from cookiejar
-    global cookier, _cookie
-    for c in cookier.cookiejar:
-        if c.domain != ".yahoo.com":
-            continue
-        if c.name != "B":
-            continue
-        _cookie = c.value
+    # Extract the cookie from the transport
+    global _cookie
+    _cookie = transport.cookie(".yahoo.com", "B")
 
     # Print the cookie and crumb
     # print('Cookie:', _cookie)
     # print('Crumb:', _crumb)
 
 
-def load_yahoo_quote(ticker, begindate, enddate, info="quote"):
+def _ensure_cookie_crumb():
     """
-   This function load the corresponding history/divident/split from Yahoo.
+   This function makes sure that the cookie and crumb are loaded, they are
+   taken from the metadata cache while they have not expired.
    """
-    # Check to make sure that the cookie and crumb has been loaded
     global _cookie, _crumb
     if _cookie == None or _crumb == None:
-        _get_cookie_crumb()
+        # concurrent first requests wait for a single lookup
+        with _crumb_lock:
+            if _cookie == None or _crumb == None:
+                cache = get_metadata_cache()
+                try:
+                    _cookie, _crumb = cache.get(CRUMB_KEY)
+                    get_transport().set_cookie(".yahoo.com", "B", _cookie)
+                except (KeyError, AttributeError, TypeError, ValueError):
+                    _get_cookie_crumb()
+                    if _cookie != None and _crumb:
+                        cache.set(CRUMB_KEY, [_cookie, _crumb], CRUMB_TTL)
+
+
+def _reset_cookie_crumb(crumb):
+    """
+   This function drops a crumb that Yahoo rejected, also from the cache.
+   """
+    global _cookie, _crumb
+    with _crumb_lock:
+        if _crumb == crumb:
+            _cookie = None
+            _crumb = None
+            get_metadata_cache().delete(CRUMB_KEY)
+
 
+def load_yahoo_quote(ticker, begindate, enddate, info="quote", raw=False):
+    """
+   This function load the corresponding history/divident/split from Yahoo.
+   With raw the response is returned as bytes instead of a list of lines.
+   """
     # Prepare the parameters and the URL
     tb = time.mktime(
         (
@@ -119,17 +141,51 @@ def load_yahoo_quote(ticker, begindate, enddate, info="quote"):
         param["events"] = "div"
     elif info == "split":
         param["events"] = "split"
-    param["crumb"] = _crumb
-    params = urllib.parse.urlencode(param)
-    url = "https://query1.finance.yahoo.com/v7/finance/download/{}?{}".format(
-        ticker, params
-    )
-    # print(url)
-    req = urllib.request.Request(url, headers=_headers)
 
-    # Perform the query
-    # There is no need to enter the cookie here, as it is automatically handled by opener
-    f = urllib.request.urlopen(req)
-    alines = f.read().decode("utf-8")
+    for attempt in range(2):
+        # Check to make sure that the cookie and crumb has been loaded
+        _ensure_cookie_crumb()
+        crumb = _crumb
+        param["crumb"] = crumb
+        params = urllib.parse.urlencode(param)
+        url = "https://query1.finance.yahoo.com/v7/finance/download/{}?{}".format(
+            ticker, params
+        )
+        # print(url)
+
+        # Perform the query
+        # There is no need to enter the cookie here, as it is automatically handled
+        # by the transport
+        try:
+            body = get_transport().get(url, headers=_headers)
+            break
+        except urllib.error.HTTPError as e:
+            # An expired crumb is rejected, get a new one and try once more
+            if e.code != 401 or attempt:
+                raise
+            _reset_cookie_crumb(crumb)
+    if raw:
+        return body
+    alines = body.decode("utf-8")
     # print(alines)
     return alines.split("\n")
+
+
+def load_yahoo_events(
+    ticker, begindate, enddate, infos=("quote", "dividend", "split"), raw=False
+):
+    """
+   This function loads several of history/dividend/split from Yahoo in parallel,
+   returns a dict of info to the result of load_yahoo_quote.
+   """
+    # The crumb is shared by all requests, get it once first
+    _ensure_cookie_crumb()
+
+    with ThreadPoolExecutor(max_workers=len(infos)) as executor:
+        futures = {
+            info: executor.submit(
+                load_yahoo_quote, ticker, begindate, enddate, info, raw
+            )
+            for info in infos
+        }
+        return {info: future.result() for info, future in futures.items()}
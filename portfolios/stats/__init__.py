@@ -1 +1 @@
-__all__ = ["basics"]
+__all__ = ["basics", "riskfree"]
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import numpy as np
+import pandas as pd
 from scipy.stats import linregress
 
 from portfolios.utils.helpers import restrict_to_trading_days
@@ -210,14 +211,50 @@ def beta(sec1=None, sec2=None, col1="Return", col2="Return"):
     return _cov / _var
 
 
+def excess_returns(returns=None, risk_free_rate=0.004484):
+    """
+    Returns in excess of the risk-free rate, for a series or for all columns of
+    a dataframe at once, risk_free_rate is a constant or a series of daily
+    rates (see RiskFreeRates) that is aligned to the dates of returns
+    """
+
+    if isinstance(risk_free_rate, pd.Series):
+        _rates = risk_free_rate.sort_index().reindex(returns.index, method="ffill")
+        if isinstance(returns, pd.DataFrame):
+            return returns.sub(_rates, axis=0)
+        return returns - _rates
+
+    return returns - risk_free_rate
+
+
+def _average_excess_return(returns, risk_free_rate):
+    if isinstance(risk_free_rate, pd.Series):
+        return excess_returns(returns, risk_free_rate).mean()
+
+    return returns.mean() - risk_free_rate
+
+
 def alpha(sec1=None, sec2=None, col1="Return", col2="Return", risk_free_rate=0.004484):
     """
     Calculates alpha of a security
-    Risk-free daily rate (from 3-mo. U.S. Treasury bills) = .004484 as of 8/13/18
+    Risk-free daily rate (from 3-mo. U.S. Treasury bills) = .004484 as of 8/13/18,
+    or a series of daily rates from Treasury data (see RiskFreeRates)
     """
 
     _beta = beta(sec1=sec1, sec2=sec2, col1=col1, col2=col2)
-    _avg_return1 = sec1.data[col1].mean()
-    _avg_return2 = sec2.data[col2].mean()
+    _avg_excess1 = _average_excess_return(sec1.data[col1], risk_free_rate)
+    _avg_excess2 = _average_excess_return(sec2.data[col2], risk_free_rate)
+
+    return _avg_excess1 - _beta * _avg_excess2
+
+
+def sharpe_ratio(sec1=None, col1="Return", risk_free_rate=0.004484, periods=1):
+    """
+    Calculates the Sharpe ratio of a security, the average excess return over
+    its standard deviation, annualized with periods per year (e.g. 252 for
+    daily returns), risk_free_rate as for alpha
+    """
+
+    _excess = excess_returns(sec1.data[col1], risk_free_rate)
 
-    return _avg_return1 - risk_free_rate - _beta * (_avg_return2 - risk_free_rate)
+    return _excess.mean() / _excess.std() * np.sqrt(periods)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from portfolios.treasury.curve import interpolate_linear, tenor_columns, tenor_years
+
+# trading days per year over which annual yields are compounded
+TRADING_DAYS = 252
+
+# rate series kept per maturity and date index, the least recently used are
+# dropped
+RATES_CACHE_SIZE = 64
+
+
+def treasury_yields(data=None, maturity="3 mo"):
+    """
+    Annual yields in percent per date of a tenor column of Treasury data, or
+    of a maturity in years interpolated linearly between the tenors
+    """
+    if maturity in data.columns:
+        return data[maturity].astype(float)
+
+    _columns, _years = tenor_columns(data)
+    return pd.Series(
+        interpolate_linear(data[_columns].values, _years, tenor_years(maturity)),
+        index=data.index,
+        name=maturity,
+    )
+
+
+def daily_rates(yields=None, uselogs=True, periods=TRADING_DAYS):
+    """
+    Daily risk-free rates from annual yields in percent, compounded over
+    periods per year, as log returns (like returns_column) or relative returns
+    """
+    _growth = 1.0 + np.asarray(yields, dtype=float) / 100.0
+    if uselogs:
+        return np.log(_growth) / periods
+
+    return _growth ** (1.0 / periods) - 1.0
+
+
+class RiskFreeRates(object):
+    """
+       Class that derives daily risk-free rates from Treasury yield curves
+       for the dates of any return series, e.g. of a security or portfolio
+
+       Each date takes the yield of the last Treasury date on or before it,
+       the rates of the RATES_CACHE_SIZE most recent maturities and date
+       indexes are kept, callers receive copies
+    """
+
+    def __init__(self, treasury=None):
+        self.data = getattr(treasury, "data", treasury).sort_index()
+        self._dates = pd.DatetimeIndex(self.data.index).asi8
+        self._yields = {}
+        self._rates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def yields(self, maturity="3 mo"):
+        """
+        Annual yields in percent of a maturity, missing yields are taken from
+        the previous date
+        """
+        with self._lock:
+            if maturity not in self._yields:
+                self._yields[maturity] = (
+                    treasury_yields(self.data, maturity).ffill().values
+                )
+            return self._yields[maturity]
+
+    def rates(self, index=None, maturity="3 mo", uselogs=True):
+        """
+        Daily risk-free rates for the dates of index
+
+        Parameters
+        ==========
+        index : dates, e.g. index of the data of a security
+        maturity : tenor column (e.g. "3 mo") or maturity in years
+        uselogs : log returns (like returns_column) or relative returns
+
+        Returns
+        =======
+        rates : series indexed by index, NaN before the first Treasury date
+
+        """
+
+        _index = pd.DatetimeIndex(index)
+        _key = (maturity, uselogs, _index.asi8.tobytes())
+        with self._lock:
+            if _key in self._rates:
+                self._rates.move_to_end(_key)
+                return self._rates[_key].copy()
+
+        _daily = daily_rates(self.yields(maturity), uselogs=uselogs)
+        _positions = np.searchsorted(self._dates, _index.asi8, side="right") - 1
+        _rates = pd.Series(
+            np.where(_positions >= 0, _daily[np.maximum(_positions, 0)], np.nan),
+            index=_index,
+            name="Risk-free",
+        )
+        with self._lock:
+            self._rates[_key] = _rates
+            while len(self._rates) > RATES_CACHE_SIZE:
+                self._rates.popitem(last=False)
+
+        return _rates.copy()
@@ -1 +1 @@
-__all__ = ["io", "treasury"]
+__all__ = ["curve", "io", "treasury"]
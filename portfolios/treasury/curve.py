@@ -0,0 +1,405 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+# years per unit of the tenor columns of Treasury data (e.g. "3 mo", "10 yr")
+TENOR_UNITS = {"mo": 1.0 / 12.0, "yr": 1.0}
+
+
+def tenor_years(tenor):
+    """
+    Maturity in years of a tenor like "3 mo" or "10 yr", numbers are taken as
+    maturities in years, raises ValueError for other names
+    """
+    if isinstance(tenor, (int, float, np.number)):
+        return float(tenor)
+
+    try:
+        _number, _unit = str(tenor).split()
+        return float(_number) * TENOR_UNITS[_unit.lower()[:2]]
+    except (KeyError, ValueError):
+        raise ValueError("{} is not a tenor".format(tenor))
+
+
+def tenor_columns(data):
+    """
+    Tenor columns of Treasury data sorted by maturity, and their maturities
+    in years
+    """
+    _tenors = []
+    for column in data.columns:
+        try:
+            _tenors.append((tenor_years(column), column))
+        except ValueError:
+            pass
+    _tenors.sort()
+
+    return [c for _, c in _tenors], np.array([y for y, _ in _tenors], dtype=float)
+
+
+def _per_curve(maturities, curves):
+    """
+    Maturities as 2d array with a row per curve, and whether a single maturity
+    per curve was given
+    """
+    _maturities = np.asarray(maturities, dtype=float)
+    if _maturities.ndim < 2:
+        return np.broadcast_to(_maturities, (curves,)).reshape(curves, 1), True
+
+    return np.broadcast_to(_maturities, (curves, _maturities.shape[1])), False
+
+
+def interpolate_linear(rates, years, maturities, curves=None):
+    """
+    Linear interpolation of yield curves, missing rates are skipped and rates
+    are flat beyond the shortest and the longest maturity of a curve
+
+    Parameters
+    ==========
+    rates : 2d array of rates, a curve per row and a maturity per column
+    years : sorted maturities of the columns in years
+    maturities : maturity in years per curve, a single maturity, or a 2d
+                 array with a row of maturities per curve
+    curves : row of rates of each maturity (or row of maturities), by default
+             the rows in order
+
+    Returns
+    =======
+    rates : numpy array with the interpolated rates (a row per curve for a 2d
+            array of maturities), NaN for curves without rates
+
+    """
+
+    _rates = np.asarray(rates, dtype=float)
+    _years = np.asarray(years, dtype=float)
+    _curves = np.arange(len(_rates)) if curves is None else np.asarray(curves)
+    _maturities, _single = _per_curve(maturities, len(_curves))
+    _rows = _curves[:, None]
+
+    # nearest available rate (and its maturity) on or before and on or after
+    # each column
+    _known = np.where(np.isnan(_rates), np.nan, _years)
+    _before = pd.DataFrame(_rates).ffill(axis=1).values
+    _before_years = pd.DataFrame(_known).ffill(axis=1).values
+    _after = pd.DataFrame(_rates).bfill(axis=1).values
+    _after_years = pd.DataFrame(_known).bfill(axis=1).values
+
+    _column = np.searchsorted(_years, _maturities, side="right") - 1
+    _lower = np.clip(_column, 0, len(_years) - 1)
+    _upper = np.clip(_column + 1, 0, len(_years) - 1)
+    _low = np.where(_column >= 0, _before[_rows, _lower], np.nan)
+    _low_years = np.where(_column >= 0, _before_years[_rows, _lower], np.nan)
+    _high = np.where(_column + 1 < len(_years), _after[_rows, _upper], np.nan)
+    _high_years = np.where(
+        _column + 1 < len(_years), _after_years[_rows, _upper], np.nan
+    )
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        _weights = (_maturities - _low_years) / (_high_years - _low_years)
+    _interpolated = np.where(
+        np.isnan(_low),
+        _high,
+        np.where(np.isnan(_high), _low, _low + _weights * (_high - _low)),
+    )
+
+    return _interpolated[:, 0] if _single else _interpolated
+
+
+def _edge_slopes(h0, h1, delta0, delta1):
+    """
+    Slopes at the first or last maturity of monotone cubic curves, three
+    point estimates limited to preserve the shape
+    """
+    _slopes = ((2.0 * h0 + h1) * delta0 - h0 * delta1) / (h0 + h1)
+    _slopes = np.where(np.sign(_slopes) != np.sign(delta0), 0.0, _slopes)
+    _limit = (np.sign(delta0) != np.sign(delta1)) & (
+        np.abs(_slopes) > 3.0 * np.abs(delta0)
+    )
+
+    return np.where(_limit, 3.0 * delta0, _slopes)
+
+
+def _monotone_slopes(years, rates):
+    """
+    Slopes of monotone cubic (Fritsch-Carlson) curves through rates, a curve
+    per row, at least two maturities
+    """
+    _h = np.diff(years)
+    _delta = np.diff(rates, axis=1) / _h
+    if len(years) == 2:
+        return np.concatenate([_delta, _delta], axis=1)
+
+    # weighted harmonic mean of the secants, zero at local extrema
+    _w1 = 2.0 * _h[1:] + _h[:-1]
+    _w2 = _h[1:] + 2.0 * _h[:-1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        _mean = (_w1 + _w2) / (_w1 / _delta[:, :-1] + _w2 / _delta[:, 1:])
+    _monotone = np.sign(_delta[:, :-1]) * np.sign(_delta[:, 1:]) > 0
+
+    _slopes = np.empty_like(rates)
+    _slopes[:, 1:-1] = np.where(_monotone, _mean, 0.0)
+    _slopes[:, 0] = _edge_slopes(_h[0], _h[1], _delta[:, 0], _delta[:, 1])
+    _slopes[:, -1] = _edge_slopes(_h[-1], _h[-2], _delta[:, -1], _delta[:, -2])
+
+    return _slopes
+
+
+def interpolate_monotone(rates, years, maturities, curves=None):
+    """
+    Monotone cubic (Fritsch-Carlson) interpolation of yield curves, the
+    curves do not overshoot the rates, missing rates are skipped and rates
+    are flat beyond the shortest and the longest maturity of a curve
+
+    The slopes are computed once per curve, together for curves with the same
+    missing rates, arguments and result as for interpolate_linear
+    """
+
+    _rates = np.asarray(rates, dtype=float)
+    _years = np.asarray(years, dtype=float)
+    _curves = np.arange(len(_rates)) if curves is None else np.asarray(curves)
+    _maturities, _single = _per_curve(maturities, len(_curves))
+    _interpolated = np.full(_maturities.shape, np.nan)
+
+    # masks of the available rates packed to bits are grouped much faster
+    _patterns, _groups = np.unique(
+        np.packbits(~np.isnan(_rates), axis=1), axis=0, return_inverse=True
+    )
+    _groups = _groups.ravel()
+    _local = np.empty(len(_rates), dtype=int)
+    for group, pattern in enumerate(_patterns):
+        known = np.unpackbits(pattern)[: len(_years)].astype(bool)
+        _queries = np.flatnonzero(_groups[_curves] == group)
+        _x = _years[known]
+        if len(_queries) == 0 or len(_x) == 0:
+            continue
+
+        _group_rows = np.flatnonzero(_groups == group)
+        _local[_group_rows] = np.arange(len(_group_rows))
+        _y = _rates[_group_rows][:, known]
+        _curve = _local[_curves[_queries]][:, None]
+        if len(_x) == 1:
+            _interpolated[_queries] = _y[_curve, 0]
+            continue
+
+        _slopes = _monotone_slopes(_x, _y)
+        _m = np.clip(_maturities[_queries], _x[0], _x[-1])
+        _segment = np.clip(np.searchsorted(_x, _m, side="right") - 1, 0, len(_x) - 2)
+        _h = (_x[1:] - _x[:-1])[_segment]
+        _t = (_m - _x[_segment]) / _h
+
+        # cubic Hermite polynomial of the segment
+        _interpolated[_queries] = (
+            _y[_curve, _segment] * (1.0 + _t * _t * (2.0 * _t - 3.0))
+            + _y[_curve, _segment + 1] * _t * _t * (3.0 - 2.0 * _t)
+            + _slopes[_curve, _segment] * _h * _t * (1.0 - _t) ** 2
+            - _slopes[_curve, _segment + 1] * _h * _t * _t * (1.0 - _t)
+        )
+
+    return _interpolated[:, 0] if _single else _interpolated
+
+
+INTERPOLATIONS = {"linear": interpolate_linear, "monotone": interpolate_monotone}
+
+
+def _to_int64(dates):
+    """
+    Dates as int64 nanoseconds, in the shape of dates
+    """
+    return pd.DatetimeIndex(pd.to_datetime(np.ravel(dates))).asi8.reshape(
+        np.shape(dates)
+    )
+
+
+class YieldCurve(object):
+    """
+       Class that holds the daily yield curves of Treasury data as arrays, a
+       curve of par yields per date with a column per tenor, and bootstraps
+       zero rates from them
+
+       Queries take any number of (date, maturity) pairs as arrays that are
+       broadcast against each other, each date takes the curve of the last
+       Treasury date on or before it, rates are in percent like Treasury data
+
+       Parameters
+       ==========
+       treasury : Treasury, or dataframe with tenor columns (e.g. "3 mo")
+       method : interpolation between tenors, one of INTERPOLATIONS
+    """
+
+    def __init__(self, treasury=None, method="linear"):
+        if method not in INTERPOLATIONS:
+            raise ValueError("Interpolation {} is not supported".format(method))
+
+        _data = getattr(treasury, "data", treasury)
+        self.columns, self.years = tenor_columns(_data)
+        _data = _data[self.columns].astype(float).dropna(how="all").sort_index()
+        self.dates = pd.DatetimeIndex(_data.index)
+        self.par = _data.values
+        self.method = method
+        self._dates = self.dates.asi8
+        self._zeros = {}
+
+    def _interpolate(self, method):
+        return INTERPOLATIONS[method or self.method]
+
+    def _query(self, table, years, dates, maturities, method):
+        """
+        Rates of table interpolated at pairs of dates and maturities
+        """
+        _dates, _maturities = np.broadcast_arrays(
+            _to_int64(dates), np.asarray(maturities, dtype=float)
+        )
+        _positions = np.searchsorted(self._dates, _dates.ravel(), side="right") - 1
+        _rates = self._interpolate(method)(
+            table, years, _maturities.ravel(), curves=np.maximum(_positions, 0)
+        )
+
+        return np.where(_positions >= 0, _rates, np.nan).reshape(_dates.shape)
+
+    def curves(self, maturities, zero=False, method=None):
+        """
+        Par yield (or zero rate) curves of all dates at maturities in years,
+        as dataframe with a row per date and a column per maturity
+        """
+        _maturities = np.atleast_1d(np.asarray(maturities, dtype=float))
+        if zero:
+            _years, _table = self.zero_table(method)
+        else:
+            _years, _table = self.years, self.par
+
+        return pd.DataFrame(
+            self._interpolate(method)(_table, _years, _maturities[None, :]),
+            index=self.dates,
+            columns=_maturities,
+        )
+
+    def par_yields(self, dates, maturities, method=None):
+        """
+        Par yields in percent at pairs of dates and maturities in years
+        """
+        return self._query(self.par, self.years, dates, maturities, method)
+
+    def zero_table(self, method=None):
+        """
+        Zero rates in percent of all dates at the tenors below half a year and
+        every half year up to the longest tenor, bootstrapped once per method
+
+        Yields below half a year are bills without coupon and taken as zero
+        rates, longer par yields are taken as bonds paying semiannual coupons
+
+        Returns
+        =======
+        years : maturities of the columns
+        zeros : 2d array with a row per date
+
+        """
+
+        _method = method or self.method
+        if _method not in self._zeros:
+            _short = self.years < 0.5
+            _grid = np.arange(1, int(round(self.years.max() * 2.0)) + 1) / 2.0
+            _coupons = (
+                self._interpolate(_method)(self.par, self.years, _grid[None, :])
+                / 200.0
+            )
+
+            # discount factor of each coupon date from the par bonds maturing
+            # on it and the discount factors of the coupon dates before
+            _factors = np.empty_like(_coupons)
+            _annuity = np.zeros(len(_coupons))
+            for i in range(len(_grid)):
+                _factors[:, i] = (1.0 - _coupons[:, i] * _annuity) / (
+                    1.0 + _coupons[:, i]
+                )
+                _annuity += _factors[:, i]
+
+            _zeros = 200.0 * (_factors ** (-0.5 / _grid) - 1.0)
+            self._zeros[_method] = (
+                np.concatenate([self.years[_short], _grid]),
+                np.concatenate([self.par[:, _short], _zeros], axis=1),
+            )
+
+        return self._zeros[_method]
+
+    def zero_rates(self, dates, maturities, method=None):
+        """
+        Zero rates in percent (semiannual compounding) at pairs of dates and
+        maturities in years
+        """
+        _years, _zeros = self.zero_table(method)
+
+        return self._query(_zeros, _years, dates, maturities, method)
+
+    def discount_factors(self, dates, maturities, method=None):
+        """
+        Discount factors at pairs of dates and maturities in years
+        """
+        _maturities = np.asarray(maturities, dtype=float)
+        _zeros = self.zero_rates(dates, _maturities, method)
+
+        return (1.0 + _zeros / 200.0) ** (-2.0 * _maturities)
+
+    def discount(self, dates, times, cashflows, method=None):
+        """
+        Present value on each date of cashflows paid after it
+
+        Parameters
+        ==========
+        dates : dates of the valuation
+        times : years from each date to the cashflows, an array with a row per
+                date or the same times for all dates
+        cashflows : cashflows in the shape of times, or a row for all dates
+
+        Returns
+        =======
+        values : series of present values indexed by dates, cashflows at
+                 negative times are paid before the date and left out
+
+        """
+
+        _dates = pd.DatetimeIndex(pd.to_datetime(np.ravel(dates)))
+        _times, _cashflows = np.broadcast_arrays(
+            np.atleast_2d(np.asarray(times, dtype=float)),
+            np.atleast_2d(np.asarray(cashflows, dtype=float)),
+        )
+        _times = np.broadcast_to(_times, (len(_dates), _times.shape[1]))
+        _cashflows = np.broadcast_to(_cashflows, _times.shape)
+
+        _paid = _times >= 0.0
+        _factors = self.discount_factors(
+            _dates.asi8[:, None], np.where(_paid, _times, 0.0), method
+        )
+
+        return pd.Series(
+            np.where(_paid, _cashflows * _factors, 0.0).sum(axis=1), index=_dates
+        )
+
+    def bond_prices(self, dates, maturities, coupons, frequency=2, method=None):
+        """
+        Prices per 100 face value (including accrued coupon) of bonds on
+        dates, with maturities in years and annual coupons in percent
+
+        Returns
+        =======
+        prices : series of prices indexed by dates
+
+        """
+
+        _maturities, _coupons = np.broadcast_arrays(
+            np.ravel(np.asarray(maturities, dtype=float)),
+            np.ravel(np.asarray(coupons, dtype=float)),
+        )
+        if len(_maturities) == 1:
+            _maturities = np.repeat(_maturities, len(np.ravel(dates)))
+            _coupons = np.repeat(_coupons, len(_maturities))
+
+        # coupon dates counted back from maturity, a row per bond
+        _count = int(np.ceil(np.nanmax(_maturities) * frequency))
+        _times = _maturities[:, None] - np.arange(_count) / float(frequency)
+        _cashflows = np.where(_times > 0.0, _coupons[:, None] / frequency, 0.0)
+        _cashflows[:, 0] += 100.0
+
+        return self.discount(
+            dates, np.where(_times > 0.0, _times, -1.0), _cashflows, method
+        )
@@ -1,13 +1,14 @@
 # -*- coding: utf-8 -*-
 
-import urllib.error
-import urllib.parse
-import urllib.request
+from datetime import datetime as dt
+from html.parser import HTMLParser
+from os import path
 
+import numpy as np
 import pandas as pd
-from bs4 import BeautifulSoup
 
 from portfolios.utils.helpers import standard_date_format, todays_date
+from portfolios.utils.transport import get_transport
 
 
 def read_treasury_csv(path=None, startdate="2000-01-01", enddate=None):
@@ -27,10 +28,108 @@ def read_treasury_csv(path=None, startdate="2000-01-01", enddate=None):
     return _df.loc[(_df.index >= startdate) & (_df.index <= enddate)]
 
 
+# pages of the Treasury with daily yield curve rates of all years and of a year
+TREASURY_URL = "https://www.treasury.gov/resource-center/data-chart-center/interest-rates/Pages/TextView.aspx?data=yieldAll"
+TREASURY_YEAR_URL = "https://www.treasury.gov/resource-center/data-chart-center/interest-rates/Pages/TextView.aspx?data=yieldYear&year={}"
+
+# first year with yield curve rates, years are cached once this many days of
+# the next year have passed
+TREASURY_FIRST_YEAR = 1990
+YEAR_COMPLETE_AFTER = 7
+
+# Headers to fake a user agent
+_headers = {
+    "User-Agent": "Mozilla/5.0 (X11; U; Linux i686) Gecko/20071127 Firefox/2.0.0.11"
+}
+
+
+class YieldTableParser(HTMLParser):
+    """
+       Class that collects the cells of the yield curve table (class t-chart)
+       of a Treasury page while the page is parsed, without building a document
+       tree, the first row holds the column names
+    """
+
+    def __init__(self, table_class="t-chart"):
+        super().__init__()
+        self.table_class = table_class
+        self.rows = []
+        self._depth = 0
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            if self._depth or self.table_class in (dict(attrs).get("class") or ""):
+                self._depth += 1
+        elif self._depth == 1:
+            if tag == "tr":
+                self._row = []
+            elif tag in ("td", "th") and self._row is not None:
+                self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag == "table" and self._depth:
+            self._depth -= 1
+        elif self._depth == 1:
+            if tag in ("td", "th") and self._cell is not None:
+                self._row.append("".join(self._cell).strip())
+                self._cell = None
+            elif tag == "tr" and self._row is not None:
+                if self._row:
+                    self.rows.append(self._row)
+                self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def dataframe(self):
+        """
+        Table as dataframe indexed by date with float columns, cells that are
+        not numbers (e.g. N/A) become NaN
+        """
+        if not self.rows:
+            raise ValueError("No yield curve table found")
+        _columns = self.rows[0][1:]
+        _body = [row for row in self.rows[1:] if len(row) == len(_columns) + 1]
+
+        _dates = [row[0] for row in _body]
+        try:
+            _index = pd.to_datetime(_dates, format="%m/%d/%y")
+        except ValueError:
+            _index = pd.to_datetime(_dates)
+
+        return pd.DataFrame(
+            {
+                column: pd.to_numeric(
+                    [row[i + 1] for row in _body], errors="coerce"
+                ).astype(float)
+                for i, column in enumerate(_columns)
+            },
+            index=pd.DatetimeIndex(_index, name="Date"),
+            columns=_columns,
+        )
+
+
+def parse_treasury_table(html_data, chunksize=1 << 16):
+    """
+    Parse the yield curve table of a Treasury page (bytes or string),
+    the page is fed to the parser in chunks
+    """
+    if isinstance(html_data, bytes):
+        html_data = html_data.decode("utf-8")
+
+    parser = YieldTableParser()
+    for i in range(0, len(html_data), chunksize):
+        parser.feed(html_data[i : i + chunksize])
+    parser.close()
+
+    return parser.dataframe()
+
+
 def retrieve_treasury_yield_curve_rates(
-    url="https://www.treasury.gov/resource-center/data-chart-center/interest-rates/Pages/TextView.aspx?data=yieldAll",
-    startdate="20000101",
-    enddate=None,
+    url=TREASURY_URL, startdate="20000101", enddate=None
 ):
     """
     Download yield curve rates data from  US Deparment of the Treasury.
@@ -44,18 +143,83 @@ def retrieve_treasury_yield_curve_rates(
     startdate = standard_date_format(startdate)
     enddate = standard_date_format(enddate)
 
-    _headers = {
-        "User-Agent": "Mozilla/5.0 (X11; U; Linux i686) Gecko/20071127 Firefox/2.0.0.11"
-    }
+    # use the shared transport to retrieve data
+    _df = parse_treasury_table(get_transport().get(url, headers=_headers))
+
+    return _df.loc[(_df.index >= startdate) & (_df.index <= enddate)]
+
+
+def _year_cachefile(cachedir, year):
+    return "{0}treasury_{1}.npz".format(cachedir, year)
 
-    # use request to retrieve data
-    req = urllib.request.Request(url, headers=_headers)
-    f = urllib.request.urlopen(req)
-    html_data = f.read().decode("utf-8")
 
-    soup = BeautifulSoup(html_data, "lxml")
-    table = soup.find("table", {"class": "t-chart"})
+def retrieve_treasury_year(year, url=TREASURY_YEAR_URL, cachedir=None):
+    """
+    Yield curve rates of a single year, years that are complete are stored in
+    cachedir once and read from there afterwards, the current year is always
+    downloaded
+
+    Parameters
+    ==========
+    year : year (int)
+    url : url of the page of a year, with {} for the year
+    cachedir : directory of the cached years, None for no cache
+
+    Returns
+    =======
+    df : dataframe indexed by date with a float column per maturity
+
+    """
+
+    if cachedir is not None and path.isfile(_year_cachefile(cachedir, year)):
+        with np.load(_year_cachefile(cachedir, year)) as _arrays:
+            return pd.DataFrame(
+                _arrays["rates"],
+                index=pd.DatetimeIndex(_arrays["dates"], name="Date"),
+                columns=_arrays["columns"].tolist(),
+            )
+
+    _df = parse_treasury_table(get_transport().get(url.format(year), headers=_headers))
+
+    _complete = pd.Timestamp(year + 1, 1, 1) + pd.Timedelta(days=YEAR_COMPLETE_AFTER)
+    if cachedir is not None and pd.Timestamp(dt.now()) >= _complete:
+        try:
+            np.savez(
+                _year_cachefile(cachedir, year),
+                dates=_df.index.values.astype("datetime64[ns]"),
+                rates=_df.values.astype(float),
+                columns=np.array(_df.columns, dtype=str),
+            )
+        except:
+            print("Saving treasury year {} failed".format(year))
+
+    return _df
+
+
+def retrieve_treasury_yield_curve_years(
+    url=TREASURY_YEAR_URL, startdate="20000101", enddate=None, cachedir=None
+):
+    """
+    Download yield curve rates data from US Deparment of the Treasury
+    year by year (see retrieve_treasury_year), only the years between
+    startdate and enddate are requested
+    """
+
+    if enddate == None:
+        enddate = todays_date()
+
+    # convert dates to pandas format
+    startdate = standard_date_format(startdate)
+    enddate = standard_date_format(enddate)
 
-    _df = pd.read_html(str(table), header=0, index_col="Date", parse_dates=True)[0]
+    _first = max(pd.Timestamp(startdate).year, TREASURY_FIRST_YEAR)
+    _last = min(pd.Timestamp(enddate).year, dt.now().year)
+    _years = [
+        retrieve_treasury_year(year, url=url, cachedir=cachedir)
+        for year in range(_first, _last + 1)
+    ]
+    if not _years:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name="Date"))
+    _df = pd.concat(_years, sort=False)
 
     return _df.loc[(_df.index >= startdate) & (_df.index <= enddate)]
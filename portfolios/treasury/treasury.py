@@ -1,12 +1,16 @@
 # -*- coding: utf-8 -*-
 
-from datetime import datetime as dt
+import http.client
 from os import path
 
+import pandas as pd
+
 from portfolios import Asset
+from portfolios.security.storage import CSVStorage
 from portfolios.treasury.io import (
+    TREASURY_YEAR_URL,
     read_treasury_csv,
-    retrieve_treasury_yield_curve_rates,
+    retrieve_treasury_yield_curve_years,
 )
 from portfolios.utils.helpers import standard_date_format
 
@@ -18,12 +22,12 @@ class Treasury(Asset):
 
     def __init__(self, name, start="2000-01-01", end="2100-01-01"):
         super().__init__(name)
-        self.url = "https://www.treasury.gov/resource-center/data-chart-center/interest-rates/Pages/TextView.aspx?data=yieldAll"
+        self.url = TREASURY_YEAR_URL
         self.load(start=start, end=end)
 
     def load(self, datadir="../data/", start="2000-01-01", end="2100-01-01"):
         """
-        Tries to load from csv first, then pulls from Yahoo!
+        Tries to load from csv first, then pulls from the Treasury
         """
 
         start = standard_date_format(start)
@@ -33,40 +37,81 @@ class Treasury(Asset):
         print("Checking {}".format(filepath))
 
         if path.isfile(filepath):
-            self.data = read_treasury_csv(path=filepath, startdate=start, enddate=end)
+            self.data = read_treasury_csv(
+                path=filepath, startdate="1900-01-01", enddate="2100-01-01"
+            )
             csv_start = standard_date_format(self.data.index.min())
             csv_end = standard_date_format(self.data.index.max())
             if (csv_end < end) | (csv_start > start):
-                _refresh_success = self.refresh(
+                self.refresh(
                     url=self.url,
                     datadir=datadir,
                     start=min(start, csv_start),
                     end=max(end, csv_end),
                 )
-                if _refresh_success:
-                    self.data = read_treasury_csv(
-                        path=filepath, startdate=start, enddate=end
-                    )
+            self.data = self.data.loc[
+                (self.data.index >= start) & (self.data.index <= end)
+            ]
         else:
-            self.data = retrieve_treasury_yield_curve_rates(
-                url=self.url, startdate=start, enddate=end
+            self.data = retrieve_treasury_yield_curve_years(
+                url=self.url, startdate=start, enddate=end, cachedir=datadir
             )
             self.save(filename="{}.csv".format(self.name), datadir=datadir)
 
     def refresh(self, url, datadir="../data/", start="1900-01-01", end="2100-01-01"):
         """
-        Tries to load from csv first, then pulls from Yahoo!
+        Pulls the dates from the Treasury that are not stored yet and merges
+        them into the stored data, rows after the stored dates are appended
         """
 
         start = standard_date_format(start)
         end = standard_date_format(end)
 
+        filepath = "{0}{1}.csv".format(datadir, self.name)
+        storage = CSVStorage(datadir)
         try:
-            self.data = retrieve_treasury_yield_curve_rates(
-                url=url, startdate=start, enddate=end
+            if not path.isfile(filepath):
+                data = retrieve_treasury_yield_curve_years(
+                    url=url, startdate=start, enddate=end, cachedir=datadir
+                )
+                print("Saving {}".format(filepath))
+                storage.write(self.name, data)
+                self.data = data
+                return 1
+
+            stored = read_treasury_csv(
+                path=filepath, startdate="1900-01-01", enddate="2100-01-01"
             )
-            self.save(filename="{}.csv".format(self.name), datadir=datadir)
+            stored_start, stored_end = stored.index.min(), stored.index.max()
+            head = stored.iloc[:0]
+            tail = stored.iloc[:0]
+            if start < standard_date_format(stored_start):
+                head = retrieve_treasury_yield_curve_years(
+                    url=url,
+                    startdate=start,
+                    enddate=stored_start - pd.Timedelta(days=1),
+                    cachedir=datadir,
+                )
+            if end > standard_date_format(stored_end):
+                tail = retrieve_treasury_yield_curve_years(
+                    url=url,
+                    startdate=stored_end + pd.Timedelta(days=1),
+                    enddate=end,
+                    cachedir=datadir,
+                )
+            data = pd.concat([head, stored, tail])
+
+            # tenors added or retired by the Treasury change the columns, the
+            # file is rewritten then
+            _columns = len(tail) == 0 or tail.columns.equals(stored.columns)
+            if len(head) or not _columns:
+                print("Saving {}".format(filepath))
+                storage.write(self.name, data)
+            elif len(tail):
+                print("Appending {}".format(filepath))
+                storage.append(self.name, tail)
+            self.data = data
             return 1
-        except:
+        except (OSError, ValueError, KeyError, http.client.HTTPException):
             print("Refresh failed")
             return 0
@@ -1 +1 @@
-__all__ = ["helpers"]
+__all__ = ["helpers", "metadata", "throttle", "trading_calendar", "transport"]
@@ -1,11 +1,11 @@
 # -*- coding: utf-8 -*-
 
 from datetime import datetime as dt
-from datetime import timedelta
 
 import numpy as np
 import pandas as pd
-import pandas_market_calendars as mcal
+
+from portfolios.utils.trading_calendar import get_trading_calendar
 
 
 def todays_date():
@@ -13,17 +13,22 @@ def todays_date():
 
 
 def last_trading_day(date=None, exchange="NYSE"):
-    trading_cal = mcal.get_calendar(exchange)
+    trading_cal = get_trading_calendar(exchange)
 
     if date:
-        today = pd.to_datetime(date)
+        return pd.Timestamp(trading_cal.previous_trading_day(date))
     else:
-        today = dt.now()
-    last_week = today - timedelta(weeks=1)
+        return pd.Timestamp(trading_cal.previous_trading_day(dt.now()))
 
-    return pd.to_datetime(
-        max(trading_cal.valid_days(start_date=last_week, end_date=today).values)
-    )
+
+def last_trading_days(dates=None, exchange="NYSE"):
+    """
+    Vectorized last_trading_day, snaps an array of dates to the
+    last trading day on or before each date
+    """
+    trading_cal = get_trading_calendar(exchange)
+
+    return pd.DatetimeIndex(trading_cal.previous_trading_day(dates))
 
 
 def restrict_to_trading_days(df=None, exchange="NYSE"):
@@ -33,8 +38,8 @@ def restrict_to_trading_days(df=None, exchange="NYSE"):
 
     min_date = np.datetime64(df.index.min())
     max_date = np.datetime64(df.index.max())
-    trading_cal = mcal.get_calendar(exchange)
-    schedule = trading_cal.schedule(start_date=min_date, end_date=max_date)
+    trading_cal = get_trading_calendar(exchange)
+    schedule = trading_cal.schedule(start=min_date, end=max_date)
 
     return df.join(schedule, how="inner")
 
@@ -64,6 +69,90 @@ def standard_date_format(input_date):
     return input_date
 
 
+def _standard_date_strings(strings):
+    """
+    Vectorized string part of standard_date_format
+    """
+    _strings = pd.Series(strings, dtype=object).str.strip()
+
+    # in case input date is in format YYYY/MM/DD or YYYY MM DD
+    _strings = _strings.str.replace("/", "-", regex=False).str.replace(
+        " ", "-", regex=False
+    )
+
+    # in case input date is in format YYYYMMDD or DDMMYYYY
+    _compact = (_strings.str.len() == 8) & ~_strings.str.contains("-", regex=False)
+    _ymd = _compact & _strings.str.startswith(("20", "19"))
+    _dmy = _compact & ~_ymd
+    _strings[_ymd] = (
+        _strings[_ymd].str[:4]
+        + "-"
+        + _strings[_ymd].str[4:6]
+        + "-"
+        + _strings[_ymd].str[6:]
+    )
+    _strings[_dmy] = (
+        _strings[_dmy].str[4:]
+        + "-"
+        + _strings[_dmy].str[2:4]
+        + "-"
+        + _strings[_dmy].str[:2]
+    )
+
+    return _strings.values
+
+
+def standard_date_array(input_dates):
+    """
+    Vectorized standard_date_format, converts an array of dates (strings in the
+    formats of standard_date_format, datetimes, pandas timestamps) to datetime64[D]
+
+    Parameters
+    ==========
+    input_dates : array, list, series or index of dates, missing values become NaT
+
+    Returns
+    =======
+    dates : numpy array of datetime64[D]
+
+    """
+
+    # fast path for arrays of dates
+    if isinstance(input_dates, (pd.Series, pd.Index)):
+        if getattr(input_dates.dtype, "tz", None) is not None:
+            input_dates = pd.DatetimeIndex(input_dates).tz_localize(None)
+        input_dates = input_dates.values
+    _dates = np.asarray(input_dates)
+    if np.issubdtype(_dates.dtype, np.datetime64):
+        return _dates.astype("datetime64[D]", copy=False)
+
+    # each distinct value is converted once
+    _codes, _uniques = pd.factorize(_dates.astype(object).ravel())
+    _days = np.empty(len(_uniques) + 1, dtype="datetime64[D]")
+    _days[-1] = np.datetime64("NaT")
+
+    _strings = np.array([isinstance(u, str) for u in _uniques], dtype=bool)
+    if _strings.any():
+        # strings that are not dates become NaT
+        _days[:-1][_strings] = pd.to_datetime(
+            _standard_date_strings(_uniques[_strings]), errors="coerce"
+        ).values.astype("datetime64[D]")
+    for i in np.flatnonzero(~_strings):
+        # timestamps with time zone keep their local date
+        _days[i] = np.datetime64(pd.Timestamp(_uniques[i]).tz_localize(None), "D")
+
+    return _days[_codes].reshape(_dates.shape)
+
+
+def yahoo_date_array(input_dates):
+    """
+    Vectorized yahoo_date_format, returns an array of strings YYYYMMDD
+    """
+    return np.char.replace(
+        np.datetime_as_string(standard_date_array(input_dates), unit="D"), "-", ""
+    )
+
+
 def yahoo_date_format(input_date):
     """
     Convert input date into yahoo finance format
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+import atexit
+import json
+import os
+import threading
+import time
+from os import path
+
+# default file of the metadata cache, next to the stored price data
+METADATA_PATH = "../data/metadata.json"
+
+# changes are written at most this often (seconds) and at exit
+FLUSH_INTERVAL = 10.0
+
+
+class MetadataCache(object):
+    """
+       Class that keeps small values (e.g. company names, the Yahoo! crumb)
+       in a json file, every entry expires after its time to live
+
+       None is a valid value, it caches that a lookup found nothing
+
+       The path is resolved when the cache is created, so later changes of the
+       working directory do not move the file, nothing is saved if its
+       directory does not exist
+    """
+
+    def __init__(self, filepath=METADATA_PATH):
+        self.path = None if filepath is None else path.abspath(filepath)
+        self._entries = None
+        self._changed = False
+        self._saved = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            if self.path is not None and path.isfile(self.path):
+                try:
+                    with open(self.path) as f:
+                        self._entries = json.load(f)
+                except (OSError, ValueError):
+                    print("Reading metadata failed")
+        return self._entries
+
+    def get(self, key):
+        """
+        Value cached for key, raises KeyError if there is none or it has expired
+        """
+        with self._lock:
+            expires, value = self._load()[key]
+        if expires < time.time():
+            raise KeyError(key)
+        return value
+
+    def set(self, key, value, ttl):
+        """
+        Cache value for key during ttl seconds
+        """
+        with self._lock:
+            self._load()[key] = [time.time() + ttl, value]
+            self._changed = True
+            if time.monotonic() - self._saved > FLUSH_INTERVAL:
+                self._save()
+
+    def delete(self, key):
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._changed = True
+                self._save()
+
+    def flush(self):
+        with self._lock:
+            if self._changed:
+                self._save()
+
+    def _save(self):
+        self._saved = time.monotonic()
+        self._changed = False
+        if self.path is None or not path.isdir(path.dirname(self.path)):
+            return
+
+        # expired entries are dropped, the file is replaced at once
+        _now = time.time()
+        _entries = {k: v for k, v in self._entries.items() if v[0] >= _now}
+        try:
+            _temporary = "{0}.{1}.tmp".format(self.path, os.getpid())
+            with open(_temporary, "w") as f:
+                json.dump(_entries, f)
+            os.replace(_temporary, self.path)
+        except (OSError, ValueError):
+            print("Saving metadata failed")
+
+
+_cache = {"metadata": None}
+_cache_lock = threading.Lock()
+
+
+def set_metadata_cache(cache):
+    """
+    Replace the metadata cache, MetadataCache(None) keeps metadata in memory only
+    """
+    with _cache_lock:
+        if _cache["metadata"] is not None:
+            _cache["metadata"].flush()
+        _cache["metadata"] = cache
+
+
+def get_metadata_cache():
+    """
+    Return the metadata cache, stored in METADATA_PATH by default
+    """
+    with _cache_lock:
+        if _cache["metadata"] is None:
+            _cache["metadata"] = MetadataCache(METADATA_PATH)
+        return _cache["metadata"]
+
+
+@atexit.register
+def _flush_metadata_cache():
+    if _cache["metadata"] is not None:
+        _cache["metadata"].flush()
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+
+class RateLimiter(object):
+    """
+       Class that spaces calls to at most rate calls per second, bursts of up to
+       burst calls pass without waiting, it is shared by any number of threads
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """
+        Block until the next call is allowed, returns the time waited in seconds
+        """
+        with self._lock:
+            _now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (_now - self._last) * self.rate
+            )
+            self._last = _now
+
+            # calls without a token reserve the next one and wait for it
+            self._tokens -= 1.0
+            if self._tokens >= 0.0:
+                return 0.0
+            _delay = -self._tokens / self.rate
+
+        time.sleep(_delay)
+        return _delay
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from datetime import datetime as dt
+from os import path
+
+import numpy as np
+import pandas as pd
+import pandas_market_calendars as mcal
+
+# range of trading days built initially, widened when dates outside are queried
+CALENDAR_START = "1980-01-01"
+CALENDAR_YEARS_AHEAD = 2
+
+# margin (days) kept around queried dates so that previous and next trading days
+# of dates close to the range boundaries are found
+_MARGIN = np.timedelta64(31, "D")
+
+
+def to_days(dates):
+    """
+    Convert a date or an array of dates to datetime64[D]
+    """
+    if dates is None:
+        dates = dt.now()
+    if np.ndim(dates) == 0:
+        return np.datetime64(pd.Timestamp(dates).tz_localize(None), "D")
+    _dates = pd.DatetimeIndex(pd.to_datetime(np.asarray(dates)))
+    if _dates.tz is not None:
+        _dates = _dates.tz_localize(None)
+
+    return _dates.values.astype("datetime64[D]")
+
+
+class TradingCalendar(object):
+    """
+       Class that holds the trading days of an exchange as sorted datetime64 array
+       and answers trading day queries by binary search
+
+       The trading days and their range are replaced together as one tuple,
+       queries take it once so that they never see days of another range
+    """
+
+    def __init__(self, exchange="NYSE", cachedir=None):
+        self.exchange = exchange
+        self.cachedir = cachedir
+        self._schedule = None
+        self._lock = threading.Lock()
+
+        _end = np.datetime64(dt.now(), "D") + np.timedelta64(
+            366 * CALENDAR_YEARS_AHEAD, "D"
+        )
+        _state = self._load()
+        if _state is None:
+            _state = self._build(np.datetime64(CALENDAR_START, "D"), _end)
+        with self._lock:
+            self._state = _state
+
+    @property
+    def days(self):
+        return self._state[0]
+
+    @property
+    def start(self):
+        return self._state[1]
+
+    @property
+    def end(self):
+        return self._state[2]
+
+    def _cachefile(self):
+        return path.join(self.cachedir, "calendar_{}.npz".format(self.exchange))
+
+    def _load(self):
+        """
+        Trading days and range stored by a previous process, None if there are none
+        """
+        if self.cachedir is None or not path.isfile(self._cachefile()):
+            return None
+        try:
+            with np.load(self._cachefile()) as _arrays:
+                _days = _arrays["days"]
+                _start, _end = _arrays["range"]
+        except:
+            return None
+
+        return _days, _start, _end
+
+    def _build(self, start, end):
+        """
+        Trading days between start and end with their range
+        """
+        _calendar = mcal.get_calendar(self.exchange)
+        _days = to_days(_calendar.valid_days(start_date=str(start), end_date=str(end)))
+
+        if self.cachedir is not None:
+            try:
+                np.savez(
+                    self._cachefile(),
+                    days=_days,
+                    range=np.array([start, end], dtype="datetime64[D]"),
+                )
+            except:
+                print("Saving trading calendar failed")
+
+        return _days, start, end
+
+    def _cover(self, days):
+        """
+        Trading days with their range, widened to cover all days (with margin)
+        """
+        _state = self._state
+        if np.size(days) == 0:
+            return _state
+        _min = np.min(days) - _MARGIN
+        _max = np.max(days) + _MARGIN
+        if _min < _state[1] or _max > _state[2]:
+            with self._lock:
+                _state = self._state
+                if _min < _state[1] or _max > _state[2]:
+                    _state = self._build(min(_min, _state[1]), max(_max, _state[2]))
+                    self._state = _state
+
+        return _state
+
+    def previous_trading_day(self, dates=None):
+        """
+        Last trading day on or before each date (today if dates is None)
+        """
+        _days = to_days(dates)
+        _trading_days = self._cover(_days)[0]
+
+        return _trading_days[np.searchsorted(_trading_days, _days, side="right") - 1]
+
+    def next_trading_day(self, dates=None):
+        """
+        First trading day on or after each date (today if dates is None)
+        """
+        _days = to_days(dates)
+        _trading_days = self._cover(_days)[0]
+
+        return _trading_days[np.searchsorted(_trading_days, _days, side="left")]
+
+    def is_trading_day(self, dates=None):
+        """
+        True for dates that are trading days
+        """
+        _days = to_days(dates)
+        _trading_days = self._cover(_days)[0]
+        _positions = np.searchsorted(_trading_days, _days, side="left")
+
+        return _trading_days[np.minimum(_positions, len(_trading_days) - 1)] == _days
+
+    def valid_days(self, start, end):
+        """
+        Trading days between start and end (both included)
+        """
+        _start, _end = to_days(start), to_days(end)
+        _trading_days = self._cover([_start, _end])[0]
+
+        return _trading_days[
+            np.searchsorted(_trading_days, _start, side="left") : np.searchsorted(
+                _trading_days, _end, side="right"
+            )
+        ]
+
+    def schedule(self, start, end):
+        """
+        Market open and close times of the trading days between start and end
+        """
+        _start, _end = to_days(start), to_days(end)
+        _days, _first, _last = self._cover([_start, _end])
+
+        # the schedule is kept for the range of trading days it was built for
+        _schedule = self._schedule
+        if _schedule is None or _schedule[0] != (_first, _last):
+            _schedule = (
+                (_first, _last),
+                mcal.get_calendar(self.exchange).schedule(
+                    start_date=str(_first), end_date=str(_last)
+                ),
+            )
+            self._schedule = _schedule
+
+        return _schedule[1].loc[str(_start) : str(_end)]
+
+
+_calendars = {}
+_calendars_lock = threading.Lock()
+
+
+def get_trading_calendar(exchange="NYSE", cachedir=None):
+    """
+    Return the trading calendar of an exchange, built once per process
+    (and read from cachedir if given)
+    """
+    with _calendars_lock:
+        try:
+            return _calendars[exchange]
+        except KeyError:
+            _calendars[exchange] = TradingCalendar(exchange=exchange, cachedir=cachedir)
+            return _calendars[exchange]
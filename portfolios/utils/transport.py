@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+import http.client
+import http.cookiejar
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# responses that are requested again after a pause
+RETRY_STATUS = (429, 500, 502, 503, 504)
+REDIRECT_STATUS = (301, 302, 303, 307, 308)
+
+
+class HTTPTransport(object):
+    """
+       Class that performs GET requests over persistent keep-alive connections,
+       idle connections are pooled per host and shared by all threads
+
+       Failed connections and responses in RETRY_STATUS are retried with
+       exponential backoff, other failed responses raise urllib.error.HTTPError
+       like urllib.request.urlopen, cookies are kept in cookiejar
+
+       Any object with the methods get, cookie and set_cookie can replace it as
+       client of yqd (see set_transport)
+    """
+
+    def __init__(self, timeout=30, retries=3, backoff=0.5, pool_size=16):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.cookiejar = http.cookiejar.CookieJar()
+        self._pool = {}
+        self._lock = threading.Lock()
+
+    def _connection(self, scheme, host, fresh=False):
+        """
+        Idle connection to host if there is one, else a new connection,
+        returns the connection and whether it was used before
+        """
+        if not fresh:
+            with self._lock:
+                _idle = self._pool.get((scheme, host))
+                if _idle:
+                    return _idle.pop(), True
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, timeout=self.timeout), False
+        return http.client.HTTPConnection(host, timeout=self.timeout), False
+
+    def _release(self, scheme, host, connection):
+        with self._lock:
+            _idle = self._pool.setdefault((scheme, host), [])
+            if len(_idle) < self.pool_size:
+                _idle.append(connection)
+                return
+        connection.close()
+
+    def _request(self, url, headers, fresh=False):
+        """
+        Single request over a pooled connection, returns status, headers and body
+        """
+        _request = urllib.request.Request(url, headers=headers)
+        self.cookiejar.add_cookie_header(_request)
+        _url = urllib.parse.urlsplit(url)
+        _path = _url.path or "/"
+        if _url.query:
+            _path = "{0}?{1}".format(_path, _url.query)
+
+        connection, reused = self._connection(_url.scheme, _url.netloc, fresh)
+        try:
+            connection.request("GET", _path, headers=dict(_request.header_items()))
+            response = connection.getresponse()
+            body = response.read()
+        except (ConnectionError, http.client.RemoteDisconnected):
+            # idle connections may have been closed by the server meanwhile
+            connection.close()
+            if not reused:
+                raise
+            return self._request(url, headers, fresh=True)
+        except:
+            connection.close()
+            raise
+        self.cookiejar.extract_cookies(response, _request)
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(_url.scheme, _url.netloc, connection)
+
+        return response.status, response.msg, body
+
+    def get(self, url, headers=None):
+        """
+        Body of the response to a GET request (following redirects)
+        """
+        if headers is None:
+            headers = {}
+
+        for attempt in range(self.retries + 1):
+            _last = attempt == self.retries
+            try:
+                status, response_headers, body = self._request(url, headers)
+                for _ in range(10):
+                    if status not in REDIRECT_STATUS:
+                        break
+                    url = urllib.parse.urljoin(url, response_headers["Location"])
+                    status, response_headers, body = self._request(url, headers)
+            except (OSError, http.client.HTTPException):
+                if _last:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+
+            if status == 200:
+                return body
+            if status not in RETRY_STATUS or _last:
+                _reason = http.client.responses.get(status, "")
+                raise urllib.error.HTTPError(
+                    url, status, _reason, response_headers, None
+                )
+
+            # servers that throttle may tell how long to wait
+            try:
+                _delay = float(response_headers.get("Retry-After"))
+            except (TypeError, ValueError):
+                _delay = self.backoff * 2 ** attempt
+            time.sleep(_delay)
+
+    def cookie(self, domain, name):
+        """
+        Value of a cookie received from domain, None if there is none
+        """
+        for c in self.cookiejar:
+            if c.domain == domain and c.name == name:
+                return c.value
+        return None
+
+    def set_cookie(self, domain, name, value):
+        """
+        Add a cookie for domain, e.g. one received in an earlier process
+        """
+        self.cookiejar.set_cookie(
+            http.cookiejar.Cookie(
+                version=0,
+                name=name,
+                value=value,
+                port=None,
+                port_specified=False,
+                domain=domain,
+                domain_specified=True,
+                domain_initial_dot=domain.startswith("."),
+                path="/",
+                path_specified=True,
+                secure=False,
+                expires=None,
+                discard=False,
+                comment=None,
+                comment_url=None,
+                rest={},
+            )
+        )
+
+    def close(self):
+        with self._lock:
+            _pool, self._pool = self._pool, {}
+        for _idle in _pool.values():
+            for connection in _idle:
+                connection.close()
+
+
+_transport = {"client": None}
+_transport_lock = threading.Lock()
+
+
+def set_transport(client):
+    """
+    Replace the client used for downloads, e.g. by a local stand-in
+    """
+    with _transport_lock:
+        _transport["client"] = client
+
+
+def get_transport():
+    """
+    Return the client used for downloads, an HTTPTransport by default
+    """
+    with _transport_lock:
+        if _transport["client"] is None:
+            _transport["client"] = HTTPTransport()
+        return _transport["client"]
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from tests.helpers import ACCOUNT_SPLITS
+from tests.standin import standin
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """
+    Working directory next to an empty data directory, securities are stored
+    in ../data/ by default
+    """
+    (tmp_path / "data").mkdir()
+    (tmp_path / "notebooks").mkdir()
+    monkeypatch.chdir(str(tmp_path / "notebooks"))
+
+    return tmp_path
+
+
+@pytest.fixture
+def transport(workdir):
+    """
+    StandInTransport with the splits of the synthetic account
+    """
+    with standin(splits=ACCOUNT_SPLITS) as transport:
+        yield transport
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+# splits of the stand-in tickers of the synthetic account
+ACCOUNT_SPLITS = {"AAA": {"2018-06-01": "2:1"}, "BBB": {"2020-08-31": "4:1"}}
+
+
+def synthetic_account():
+    """
+    Transactions of an account with buys and sells of three tickers (one of
+    them at a price looked up from the data), deposits, withdrawals and
+    dividends of securities and of interest (without ticker)
+    """
+    rows = [
+        ("2016-01-04", "deposit", None, 1.0, 10000.0),
+        ("2016-01-05", "buy", "AAA", np.nan, 10.0),
+        ("2016-01-05", "buy", "BBB", 30.0, 20.5),
+        ("2016-03-01", "dividend", "AAA", 1.0, 12.5),
+        ("2016-06-01", "buy", "AAA", 55.0, 5.0),
+        ("2017-02-01", "sell", "AAA", np.nan, 7.0),
+        ("2017-05-01", "dividend", None, 1.0, 3.0),
+        ("2018-01-02", "buy", "CCC", np.nan, 12.25),
+        ("2018-06-01", "sell", "CCC", 60.0, 12.25),
+        ("2019-01-02", "deposit", None, 1.0, 2000.0),
+        ("2019-08-01", "sell", "BBB", np.nan, 10.0),
+        ("2020-01-02", "withdraw", None, 1.0, 500.0),
+        ("2020-03-02", "buy", "CCC", np.nan, 3.0),
+        ("2021-01-04", "sell", "AAA", np.nan, 8.0),
+        ("2021-02-01", "dividend", "BBB", 1.0, 4.0),
+    ]
+    df = pd.DataFrame(
+        rows, columns=["Date", "Transaction", "Ticker", "Price", "Quantity"]
+    )
+    df["Date"] = pd.to_datetime(df["Date"])
+    df["Currency"] = "USD"
+
+    return df
+
+
+def assert_same_portfolio(p, q):
+    """
+    Assert that two portfolios hold the same ledger, positions, tax lots and
+    cash
+    """
+    for table in ["transactions", "wallet", "payments", "dividends"]:
+        pd.testing.assert_frame_equal(
+            getattr(p, table).reset_index(drop=True),
+            getattr(q, table).reset_index(drop=True),
+        )
+    assert p.positions_index.equals(q.positions_index)
+    assert sorted(p.tickers) == sorted(q.tickers)
+    assert sorted(p.tickers_archive) == sorted(q.tickers_archive)
+    assert sorted(p.lots) == sorted(q.lots)
+    for ticker in p.lots:
+        assert p.lots[ticker].summary() == q.lots[ticker].summary()
+    assert np.isclose(p.cash, q.cash)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+import tempfile
+
+import numpy as np
+
+from portfolios.security.io import retrieve_yahoo_data
+from portfolios.security.security import Security
+from portfolios.security.storage import get_storage
+from tests.standin import standin
+
+# splits of the checked ticker, on the first stored date, between the stored
+# dates and in the dates of later refreshes
+REFRESH_SPLITS = {"2014-12-31": "2:1", "2019-06-03": "3:1", "2021-06-01": "2:1"}
+
+# ranges loaded one after the other, the stored data is refreshed with earlier
+# and later dates (with splits), a dividend and a single day
+REFRESH_RANGES = [
+    ("2015-01-01", "2020-12-31"),
+    ("2012-01-01", "2022-06-30"),
+    ("2012-01-01", "2022-09-01"),
+    ("2012-01-01", "2022-09-02"),
+]
+
+
+def check_refresh(ticker="ZZZ", ranges=REFRESH_RANGES, splits=REFRESH_SPLITS):
+    """
+    Load a security of StandInTransport over consecutive ranges in a
+    temporary directory, so that each load refreshes the stored data, and
+    compare the stored data with a full download of each range, with the
+    selected storage backend
+
+    Returns
+    =======
+    mismatches : list of (start, end, column) that differ from the full
+                 download, "Date" if the dates differ
+
+    """
+
+    datadir = tempfile.mkdtemp() + "/"
+
+    mismatches = []
+    try:
+        with standin(splits={ticker: splits}):
+            for start, end in ranges:
+                security = Security(ticker, start=start, end=end, lazy=True)
+                security.load(datadir=datadir, start=start, end=end)
+
+                stored = get_storage(datadir).read(ticker, security.start, security.end)
+                full = retrieve_yahoo_data(
+                    ticker=ticker, startdate=security.start, enddate=security.end
+                )
+                if not stored.index.equals(full.index):
+                    mismatches.append((start, end, "Date"))
+                    continue
+                for column in full.columns:
+                    # csv files hold the prices as text, equal to float precision
+                    if not np.allclose(
+                        stored[column].values.astype(float),
+                        full[column].values.astype(float),
+                        rtol=1e-6,
+                        atol=0.0,
+                    ):
+                        mismatches.append((start, end, column))
+    finally:
+        shutil.rmtree(datadir)
+
+    return mismatches
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+import time
+import urllib.parse
+import zlib
+from collections import Counter, deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import portfolios.security.yqd as yqd
+from portfolios.security.security import shared_securities
+from portfolios.utils.metadata import (
+    MetadataCache,
+    get_metadata_cache,
+    set_metadata_cache,
+)
+from portfolios.utils.transport import HTTPTransport, get_transport, set_transport
+
+# first date of synthetic price and yield data
+STANDIN_START = "1990-01-01"
+
+# maturities of the synthetic Treasury yield curve
+TREASURY_COLUMNS = [
+    "1 mo",
+    "2 mo",
+    "3 mo",
+    "6 mo",
+    "1 yr",
+    "2 yr",
+    "3 yr",
+    "5 yr",
+    "7 yr",
+    "10 yr",
+    "20 yr",
+    "30 yr",
+]
+
+
+def route(url):
+    """
+    Kind and key of a request of yqd, get_company_name or the Treasury
+    ingestion, e.g. ("history", "AAPL") or ("treasury", "2020")
+    """
+    _url = urllib.parse.urlsplit(url)
+    _query = dict(urllib.parse.parse_qsl(_url.query))
+    _path = urllib.parse.unquote(_url.path)
+
+    if "treasury.gov" in _url.netloc:
+        return "treasury", _query.get("year", "all")
+    if _path.startswith("/quote/"):
+        return "crumb", _path[len("/quote/") :]
+    if _path.startswith("/v7/finance/download/"):
+        _events = {"history": "history", "div": "div", "split": "split"}
+        return (
+            _events.get(_query.get("events"), "history"),
+            _path[len("/v7/finance/download/") :],
+        )
+    if _path.startswith("/v7/finance/options/"):
+        return "name", _path[len("/v7/finance/options/") :]
+
+    return None, None
+
+
+class StandInTransport(HTTPTransport):
+    """
+       Class that answers the requests of yqd, get_company_name and the
+       Treasury ingestion offline, with recorded responses where available and
+       deterministic synthetic data otherwise
+
+       Latency, random errors and throttling are injected per request, the
+       retries and backoff of HTTPTransport apply, so the download pipeline can
+       be benchmarked without network (see set_transport)
+
+       Parameters
+       ==========
+       latency : seconds per request, or (low, high) for uniform random latency
+       error_rate : fraction of requests answered with 503
+       rate : requests per second answered before 429 is returned, None for
+              no limit
+       retry_after : Retry-After (seconds) sent with 429
+       splits : dict of ticker to dict of date to split string (e.g. "2:1")
+       recordings : dict of (kind, key) to response bytes, see route
+       seed : seed of latency and errors
+    """
+
+    def __init__(
+        self,
+        latency=0.0,
+        error_rate=0.0,
+        rate=None,
+        retry_after=0,
+        splits=None,
+        recordings=None,
+        seed=0,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate = rate
+        self.retry_after = retry_after
+        self.splits = {} if splits is None else splits
+        self.recordings = {} if recordings is None else recordings
+        self.requests = Counter()
+        self.errors = Counter()
+        self._random = np.random.RandomState(seed)
+        self._answered = deque()
+        self._prices = {}
+        self._stats_lock = threading.Lock()
+
+    def _draw(self):
+        """
+        Latency and whether to fail of the next request
+        """
+        with self._stats_lock:
+            if isinstance(self.latency, tuple):
+                _latency = self._random.uniform(*self.latency)
+            else:
+                _latency = self.latency
+            return _latency, self._random.random_sample() < self.error_rate
+
+    def _throttled(self):
+        if self.rate is None:
+            return False
+        with self._stats_lock:
+            _now = time.monotonic()
+            while self._answered and self._answered[0] <= _now - 1.0:
+                self._answered.popleft()
+            if len(self._answered) >= self.rate:
+                return True
+            self._answered.append(_now)
+            return False
+
+    def _request(self, url, headers, fresh=False):
+        kind, key = route(url)
+        _latency, _fail = self._draw()
+        time.sleep(_latency)
+        with self._stats_lock:
+            self.requests[kind] += 1
+
+        if self._throttled():
+            with self._stats_lock:
+                self.errors[429] += 1
+            return 429, {"Retry-After": str(self.retry_after)}, b""
+        if _fail:
+            with self._stats_lock:
+                self.errors[503] += 1
+            return 503, {}, b""
+        if kind is None:
+            return 404, {}, b""
+
+        try:
+            body = self.recordings[(kind, key)]
+        except KeyError:
+            body = getattr(self, "_{}".format(kind))(key, url)
+
+        return 200, {}, body
+
+    def cookie(self, domain, name):
+        return "standin"
+
+    def set_cookie(self, domain, name, value):
+        pass
+
+    def _crumb(self, key, url):
+        return b'<html>"CrumbStore":{"crumb":"standin"}</html>'
+
+    def _name(self, ticker, url):
+        _quote = {"longName": "{} Stand-In Inc.".format(ticker)}
+        return json.dumps({"optionChain": {"result": [{"quote": _quote}]}}).encode()
+
+    def _period(self, url):
+        _query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query))
+        return (
+            pd.Timestamp(int(_query["period1"]), unit="s").normalize(),
+            pd.Timestamp(int(_query["period2"]), unit="s").normalize(),
+        )
+
+    def _closes(self, ticker):
+        """
+        Deterministic random walk of a ticker on business days
+        """
+        with self._stats_lock:
+            if ticker not in self._prices:
+                _dates = pd.bdate_range(STANDIN_START, pd.Timestamp.now().normalize())
+                _random = np.random.RandomState(zlib.crc32(ticker.encode()))
+                _returns = _random.normal(0.0003, 0.015, len(_dates))
+                self._prices[ticker] = pd.Series(
+                    20.0 * np.exp(np.cumsum(_returns)), index=_dates
+                )
+            return self._prices[ticker]
+
+    def _history(self, ticker, url):
+        _start, _end = self._period(url)
+        _closes = self._closes(ticker).loc[_start:_end]
+        _volumes = (zlib.crc32(ticker.encode()) % 1000 + 1) * 1000
+        _lines = ["Date,Open,High,Low,Close,Adj Close,Volume"]
+        for date, close in _closes.items():
+            _lines.append(
+                "{0:%Y-%m-%d},{1!r},{2!r},{3!r},{1!r},{1!r},{4}".format(
+                    date, close, close * 1.01, close * 0.99, _volumes
+                )
+            )
+        return "\n".join(_lines).encode()
+
+    def _div(self, ticker, url):
+        # quarterly dividends on the first business day of the quarter's last month
+        _start, _end = self._period(url)
+        _closes = self._closes(ticker)
+        _first = ~_closes.index.to_period("M").duplicated() & np.isin(
+            _closes.index.month, [3, 6, 9, 12]
+        )
+        _lines = ["Date,Dividends"]
+        for date, close in _closes[_first].loc[_start:_end].items():
+            _lines.append("{0:%Y-%m-%d},{1!r}".format(date, round(close * 0.005, 4)))
+        return "\n".join(_lines).encode()
+
+    def _split(self, ticker, url):
+        _start, _end = self._period(url)
+        _lines = ["Date,Stock Splits"]
+        for date, split in sorted(self.splits.get(ticker, {}).items()):
+            if _start <= pd.Timestamp(date) <= _end:
+                _lines.append("{0:%Y-%m-%d},{1}".format(pd.Timestamp(date), split))
+        return "\n".join(_lines).encode()
+
+    def _treasury(self, year, url):
+        """
+        Html page with a table of yield curve rates like the Treasury's, for a
+        single year or all years
+        """
+        _dates = pd.bdate_range(STANDIN_START, pd.Timestamp.now().normalize())
+        if year != "all":
+            _dates = _dates[_dates.year == int(year)]
+        _days = (_dates - pd.Timestamp(STANDIN_START)).days.values
+        _level = 4.0 + 2.0 * np.sin(_days / 1500.0)
+
+        _rows = [
+            "<tr><th>Date</th>{}</tr>".format(
+                "".join("<th>{}</th>".format(c) for c in TREASURY_COLUMNS)
+            )
+        ]
+        for date, level in zip(_dates, _level):
+            _rates = [level + 0.25 * np.log1p(i) for i in range(len(TREASURY_COLUMNS))]
+            _rows.append(
+                "<tr><td>{0:%m/%d/%y}</td>{1}</tr>".format(
+                    date, "".join("<td>{:.2f}</td>".format(r) for r in _rates)
+                )
+            )
+        return (
+            '<html><body><table class="t-chart">{}</table></body></html>'.format(
+                "".join(_rows)
+            ).encode()
+        )
+
+
+class RecordingTransport(object):
+    """
+       Class that passes requests to a client (e.g. HTTPTransport) and keeps
+       the responses as recordings for StandInTransport
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.recordings = {}
+
+    def get(self, url, headers=None):
+        body = self.client.get(url, headers=headers)
+        self.recordings[route(url)] = body
+        return body
+
+    def cookie(self, domain, name):
+        return self.client.cookie(domain, name)
+
+    def set_cookie(self, domain, name, value):
+        self.client.set_cookie(domain, name, value)
+
+
+@contextmanager
+def standin(transport=None, **kwargs):
+    """
+    Install a StandInTransport (built from kwargs unless transport is given)
+    with an in-memory metadata cache, no Yahoo! crumb and no shared
+    securities, so that nothing is taken from or left in the process state of
+    real downloads, the previous state is restored on exit
+
+    Yields
+    ======
+    transport : installed transport
+
+    """
+
+    transport = StandInTransport(**kwargs) if transport is None else transport
+    _transport = get_transport()
+    _cache = get_metadata_cache()
+    with yqd._crumb_lock:
+        _crumb = yqd._cookie, yqd._crumb
+        yqd._cookie, yqd._crumb = None, None
+    set_transport(transport)
+    set_metadata_cache(MetadataCache(None))
+    shared_securities.clear()
+
+    try:
+        yield transport
+    finally:
+        shared_securities.clear()
+        set_metadata_cache(_cache)
+        set_transport(_transport)
+        with yqd._crumb_lock:
+            yqd._cookie, yqd._crumb = _crumb
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolios.treasury.curve import YieldCurve
+from tests.standin import TREASURY_COLUMNS
+
+
+def treasury_curves():
+    """
+    Yield curves of business days that rise, fall and have gaps
+    """
+    dates = pd.bdate_range("2019-01-01", "2019-12-31")
+    years = np.array([1, 2, 3, 6, 12, 24, 36, 60, 84, 120, 240, 360]) / 12.0
+    level = 2.0 + np.sin(np.arange(len(dates)) / 40.0)[:, None]
+    slope = np.cos(np.arange(len(dates)) / 25.0)[:, None]
+    data = pd.DataFrame(
+        level + slope * np.log1p(years)[None, :],
+        index=dates,
+        columns=TREASURY_COLUMNS,
+    )
+    data.iloc[10:30, :2] = np.nan
+    data.iloc[50:60, 10] = np.nan
+
+    return data
+
+
+@pytest.mark.parametrize("method", ["linear", "monotone"])
+def test_par_bonds(method):
+    curve = YieldCurve(treasury_curves(), method=method)
+    dates = curve.dates[::7]
+
+    for maturity in [0.5, 1.0, 2.0, 5.0, 7.5, 10.0, 30.0]:
+        coupons = curve.par_yields(dates, maturity)
+        prices = curve.bond_prices(dates, maturity, coupons)
+        assert np.allclose(prices.values, 100.0, atol=1e-8)
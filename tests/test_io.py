@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+
+from portfolios import Portfolio
+from portfolios.portfolio.io import parse_portfolio
+from tests.helpers import assert_same_portfolio, synthetic_account
+
+
+def test_parse_portfolio_batch(transport):
+    p = parse_portfolio(synthetic_account(), Portfolio("batch"), batch=True)
+    q = parse_portfolio(synthetic_account(), Portfolio("rows"), batch=False)
+
+    assert_same_portfolio(p, q)
+    assert len(p.transactions) == len(synthetic_account())
+    assert p.dividends["Ticker"].isnull().sum() == 1
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+from portfolios.portfolio.lots import TaxLots
+
+
+def take(remaining, dates, quantity, last=False):
+    """
+    Take quantity from the remaining lots with the oldest (or last) dates
+    """
+    order = sorted(range(len(dates)), key=lambda lot: (dates[lot], lot))
+    for lot in reversed(order) if last else order:
+        taken = min(remaining[lot], quantity)
+        remaining[lot] = remaining[lot] - taken
+        quantity = quantity - taken
+
+
+def test_lots_in_date_order():
+    random = np.random.RandomState(0)
+    lots = TaxLots()
+    dates, fifo, lifo = [], [], []
+    for i in range(200):
+        if i % 3 == 2:
+            quantity = random.uniform(0.0, lots.quantity["fifo"])
+            lots.sell(quantity)
+            take(fifo, dates, quantity)
+            take(lifo, dates, quantity, last=True)
+        else:
+            # purchases are dated in random order
+            date = pd.Timestamp("2020-01-01") + pd.Timedelta(
+                days=int(random.randint(0, 400))
+            )
+            lots.buy(date, 10.0, 1.0 + i)
+            dates.append(date.value)
+            fifo.append(10.0)
+            lifo.append(10.0)
+
+        assert np.allclose(lots.remaining["fifo"], fifo, atol=1e-9)
+        assert np.allclose(lots.remaining["lifo"], lifo, atol=1e-9)
+        assert np.allclose(lots.remaining["specific"], fifo, atol=1e-9)
+
+    first = min(range(len(dates)), key=lambda lot: (dates[lot], lot))
+    assert lots.find_lot("1999-01-01") == first
+    assert lots.find_lot("2030-01-01") is None
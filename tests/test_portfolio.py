@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from portfolios import Portfolio
+from portfolios.portfolio.io import parse_portfolio
+from tests.helpers import synthetic_account
+
+
+def test_replace_ledger(transport):
+    p = parse_portfolio(synthetic_account(), Portfolio("parsed"))
+    q = Portfolio("replaced")
+    for table in ["transactions", "wallet", "payments", "dividends"]:
+        setattr(q, table, getattr(p, table))
+
+    assert q.positions_index.equals(p.positions_index)
+    assert np.isclose(q.cash, p.cash)
+    for ticker in p.lots:
+        assert q.lots[ticker].summary() == p.lots[ticker].summary()
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from portfolios.security import storage
+from tests.refresh import check_refresh
+
+
+@pytest.mark.parametrize("backend", sorted(storage.STORAGE_BACKENDS))
+def test_refresh(backend, monkeypatch):
+    monkeypatch.setitem(storage._storage, "backend", backend)
+
+    assert check_refresh() == []
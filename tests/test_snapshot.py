@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from portfolios import Portfolio
+from portfolios.portfolio.io import parse_portfolio
+from portfolios.portfolio.snapshot import Journal, journal_path
+from tests.helpers import assert_same_portfolio, synthetic_account
+
+
+def test_journal_tickers(tmp_path):
+    journal = Journal(str(tmp_path / "journal"))
+    journal.append("2021-03-01", "dividend", "", "USD", 1.0, 2.0, None)
+    journal.append("2021-03-02", "dividend", None, "USD", 1.0, 3.0, None)
+    journal.append("2021-03-03", "dividend", "NA", "USD", 1.0, 4.0, None)
+    journal.append("2021-03-04", "sell", "AAA", "USD", 0.1 + 0.2, 5.0, 7)
+
+    events = Journal(str(tmp_path / "journal")).read()
+
+    assert events["Ticker"].iloc[0] == ""
+    assert np.isnan(events["Ticker"].iloc[1])
+    assert events["Ticker"].iloc[2] == "NA"
+    assert events["Price"].iloc[3] == 0.1 + 0.2
+    assert events["Lot"].iloc[3] == 7 and events["Lot"].iloc[:3].isnull().all()
+    assert events["Date"].iloc[0] == pd.Timestamp("2021-03-01")
+
+
+def test_snapshot_roundtrip(transport, workdir):
+    filepath = str(workdir / "snapshot.npz")
+    p = parse_portfolio(synthetic_account(), Portfolio("snapshot"))
+    p.save_snapshot(filepath)
+
+    p.buy_security("2021-06-01", "AAA", quantity=3.0)
+    p.sell_security("2021-07-01", "AAA", quantity=1.0, lot="2021-06-01")
+    p.deposit_cash("2021-08-02", quantity=50.0)
+    p.dividend("2021-08-03", ticker="", quantity=2.0)
+    p.dividend("2021-08-04", ticker="BBB", quantity=1.5)
+    p.journal = None
+
+    q = Portfolio.load_snapshot(filepath)
+    assert_same_portfolio(p, q)
+    assert q.dividends["Ticker"].iloc[-2] == ""
+
+    # the journal is left over from a snapshot that was replaced afterwards
+    shutil.copy(journal_path(filepath), str(workdir / "journal"))
+    q.withdraw_cash("2021-09-01", quantity=20.0)
+    p.withdraw_cash("2021-09-01", quantity=20.0)
+    q.save_snapshot(filepath)
+    shutil.copy(str(workdir / "journal"), journal_path(filepath))
+
+    assert_same_portfolio(p, Portfolio.load_snapshot(filepath))